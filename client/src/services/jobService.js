@@ -0,0 +1,21 @@
+import { get } from './apiService';
+
+/**
+ * Poll a background job until it finishes
+ * @param {string} statusUrl - Job status URL returned by the 202 response
+ * @param {number} intervalMs - Delay between polls in milliseconds
+ * @returns {Promise} Promise resolving to the parsed job result
+ */
+export const waitForJob = async (statusUrl, intervalMs = 2000) => {
+  // eslint-disable-next-line no-constant-condition
+  while (true) {
+    const job = await get(statusUrl);
+    if (job.status === 'succeeded') {
+      return job.result ? JSON.parse(job.result) : null;
+    }
+    if (job.status === 'failed') {
+      throw new Error(job.error || 'Background job failed');
+    }
+    await new Promise(resolve => setTimeout(resolve, intervalMs));
+  }
+};
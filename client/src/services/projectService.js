@@ -1,4 +1,5 @@
 import { post, get } from './apiService';
+import { waitForJob } from './jobService';
 
 /**
  * Create a new project
@@ -9,9 +10,11 @@ import { post, get } from './apiService';
 export const createProject = async (projectData, isFileUpload = false) => {
   try {
     if (isFileUpload) {
-      // For file upload method, send FormData directly to the file upload endpoint
-      const response = await post('/api/projects/', projectData, true);
-      return response;
+      // For file upload method, send FormData directly to the file upload endpoint.
+      // Generation runs as a background job, so wait for it and fetch the project
+      const accepted = await post('/api/projects/', projectData, true);
+      const result = await waitForJob(accepted.status_url);
+      return await get(`/api/projects/${result.project_id}`);
     } else {
       // For manual method, transform data and send to the old endpoint
       const transformedData = {
@@ -1,4 +1,5 @@
 import { get } from './apiService';
+import { waitForJob } from './jobService';
 
 let baseURL = import.meta.env.VITE_BASE_URL;
 /**
@@ -51,7 +52,10 @@ export const submitSkillAssessment = async (projectId, userId, answers) => {
       throw new Error(errorData.detail || 'Failed to submit skill assessment');
     }
 
-    return await response.json();
+    // The learning path is generated as a background job
+    const accepted = await response.json();
+    await waitForJob(accepted.status_url);
+    return await get('/api/learning_paths/me');
   } catch (error) {
     console.error('Error submitting skill assessment:', error);
     throw error;
@@ -1,4 +1,14 @@
+import os
+from utils.token_budget import truncate_text
+
+# Largest knowledge context (commit details, digests, transcripts) put into a voice agent's instructions
+AGENT_CONTEXT_TOKEN_BUDGET = int(os.getenv("AGENT_CONTEXT_TOKEN_BUDGET", "8000"))
+
+def fit_agent_context(context):
+    return truncate_text(str(context), AGENT_CONTEXT_TOKEN_BUDGET)
+
 def get_github_kt_give_prompt(commit_info):
+    commit_info = fit_agent_context(commit_info)
     return(
         f"""
         You have been provided with the following commit details:
@@ -22,6 +32,7 @@ def get_github_kt_give_prompt(commit_info):
     )
 
 def get_github_kt_recieve_prompt(given_kt_digest):
+    given_kt_digest = fit_agent_context(given_kt_digest)
     return(
         f"""
         You are conducting a knowledge transfer session with a person who is joining a new project and you are given a digest of the knowledge that you need to transfer to the newcomer . 
@@ -45,6 +56,7 @@ def get_study_prompt(subject_name, topic_name):
             """)
 
 def get_kt_give_prompt(transcript):
+    transcript = fit_agent_context(transcript)
     return(
         f"""
         You are a subject matter expert a voice based AI agent. Your responsibility is to conduct a comprehensive knowledge transfer session with a beginner who is new to this project.
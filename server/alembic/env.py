@@ -17,7 +17,8 @@ from database import SQLALCHEMY_DATABASE_URL
 config = context.config
 
 # Set the SQLAlchemy URL in the alembic config
-config.set_main_option("sqlalchemy.url", SQLALCHEMY_DATABASE_URL)
+# ConfigParser treats % as interpolation, so escape it (passwords may contain it)
+config.set_main_option("sqlalchemy.url", SQLALCHEMY_DATABASE_URL.replace("%", "%%"))
 
 # Interpret the config file for Python logging.
 # This line sets up loggers basically.
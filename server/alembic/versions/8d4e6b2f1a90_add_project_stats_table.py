@@ -0,0 +1,40 @@
+"""Add project_stats table
+
+Revision ID: 8d4e6b2f1a90
+Revises: 3f2a9c1d7e45
+Create Date: 2026-10-18 11:03:52.118640
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d4e6b2f1a90'
+down_revision: Union[str, None] = '3f2a9c1d7e45'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # main.py may already have created the table on startup
+    if 'project_stats' in sa.inspect(op.get_bind()).get_table_names():
+        return
+
+    op.create_table('project_stats',
+    sa.Column('project_id', sa.Integer(), nullable=False),
+    sa.Column('learning_paths', sa.Integer(), nullable=False),
+    sa.Column('completion_total', sa.Float(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.ForeignKeyConstraint(['project_id'], ['projects.id'], ),
+    sa.PrimaryKeyConstraint('project_id')
+    )
+    # Filled from learning_paths on startup when PROJECT_STATS_MATERIALIZED is enabled
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('project_stats')
@@ -0,0 +1,77 @@
+"""Store JSON columns as JSONB on PostgreSQL
+
+Revision ID: c4e8a2d6f0b3
+Revises: 8d4e6b2f1a90
+Create Date: 2026-10-18 12:20:44.530917
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e8a2d6f0b3'
+down_revision: Union[str, None] = '8d4e6b2f1a90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+JSON_COLUMNS = [
+    ('projects', 'skill_assessment_quiz'),
+    ('learning_paths', 'learning_path'),
+    ('kt_info', 'original_transcripts'),
+    ('kt_info_new', 'original_commits'),
+    ('jobs', 'payload'),
+    ('jobs', 'result'),
+]
+
+
+def _json_columns(bind, data_type):
+    """The JSON columns that exist and do not have data_type yet"""
+    inspector = sa.inspect(bind)
+    tables = inspector.get_table_names()
+    columns = []
+    for table, column in JSON_COLUMNS:
+        if table not in tables:
+            continue
+        current = {info['name']: info['type'] for info in inspector.get_columns(table)}
+        if column in current and isinstance(current[column], postgresql.JSONB) != (data_type == 'jsonb'):
+            columns.append((table, column))
+    return columns
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # SQLite keeps these columns as text; only PostgreSQL gets a JSON type
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return
+
+    # Rows written before this revision are not guaranteed to be valid JSON;
+    # keep those as JSON strings instead of failing the whole migration
+    op.execute("""
+    CREATE FUNCTION pg_temp.text_to_jsonb(value text) RETURNS jsonb AS $$
+    BEGIN
+        RETURN value::jsonb;
+    EXCEPTION WHEN others THEN
+        RETURN to_jsonb(value);
+    END;
+    $$ LANGUAGE plpgsql IMMUTABLE
+    """)
+    for table, column in _json_columns(bind, 'jsonb'):
+        op.alter_column(
+            table, column, type_=postgresql.JSONB(),
+            postgresql_using=f'pg_temp.text_to_jsonb({column}::text)'
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return
+
+    for table, column in _json_columns(bind, 'text'):
+        op.alter_column(table, column, type_=sa.String(), postgresql_using=f'{column}::text')
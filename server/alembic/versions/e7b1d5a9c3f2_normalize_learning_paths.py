@@ -0,0 +1,216 @@
+"""Store learning path subjects and topics as rows
+
+Revision ID: e7b1d5a9c3f2
+Revises: c4e8a2d6f0b3
+Create Date: 2026-10-18 14:02:17.604381
+
+"""
+from typing import Sequence, Union
+import json
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7b1d5a9c3f2'
+down_revision: Union[str, None] = 'c4e8a2d6f0b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SUBJECT_FIELDS = ('subject_name', 'is_completed', 'is_started', 'topics')
+TOPIC_FIELDS = ('topic_name', 'is_completed')
+
+
+def _json_type(bind):
+    return postgresql.JSONB() if bind.dialect.name == 'postgresql' else sa.Text()
+
+
+def _dump(bind, document):
+    """A JSON column value: the document itself on PostgreSQL, its text elsewhere"""
+    return document if bind.dialect.name == 'postgresql' else json.dumps(document)
+
+
+def _load(value):
+    if isinstance(value, str):
+        try:
+            return json.loads(value)
+        except json.JSONDecodeError:
+            return None
+    return value
+
+
+def _flag(value):
+    return value is True or str(value).lower() == 'true'
+
+
+def _flag_value(flag):
+    return 'true' if flag else 'false'
+
+
+def _tables(bind):
+    json_type = _json_type(bind)
+    learning_paths = sa.table(
+        'learning_paths',
+        sa.column('id', sa.Integer()),
+        sa.column('learning_path', json_type),
+    )
+    subjects = sa.table(
+        'learning_path_subject',
+        sa.column('id', sa.Integer()),
+        sa.column('learning_path_id', sa.Integer()),
+        sa.column('position', sa.Integer()),
+        sa.column('name', sa.String()),
+        sa.column('is_completed', sa.Boolean()),
+        sa.column('is_started', sa.Boolean()),
+        sa.column('details', json_type),
+    )
+    topics = sa.table(
+        'learning_path_topic',
+        sa.column('subject_id', sa.Integer()),
+        sa.column('learning_path_id', sa.Integer()),
+        sa.column('subject_position', sa.Integer()),
+        sa.column('position', sa.Integer()),
+        sa.column('name', sa.String()),
+        sa.column('is_completed', sa.Boolean()),
+        sa.column('details', json_type),
+    )
+    return learning_paths, subjects, topics
+
+
+def _is_outline(document):
+    return (
+        isinstance(document, dict)
+        and isinstance(document.get('subjects'), list)
+        and all(
+            isinstance(subject, dict)
+            and isinstance(subject.get('topics', []), list)
+            and all(isinstance(topic, dict) for topic in subject.get('topics', []))
+            for subject in document['subjects']
+        )
+    )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    tables = inspector.get_table_names()
+    json_type = _json_type(bind)
+
+    # main.py may already have created the tables and index on startup
+    if 'learning_path_subject' not in tables:
+        op.create_table('learning_path_subject',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('learning_path_id', sa.Integer(), nullable=False),
+        sa.Column('position', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('is_completed', sa.Boolean(), nullable=False),
+        sa.Column('is_started', sa.Boolean(), nullable=False),
+        sa.Column('details', json_type, nullable=True),
+        sa.ForeignKeyConstraint(['learning_path_id'], ['learning_paths.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('learning_path_id', 'position', name='uq_learning_path_subject_position')
+        )
+    if 'learning_path_topic' not in tables:
+        op.create_table('learning_path_topic',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('subject_id', sa.Integer(), nullable=False),
+        sa.Column('learning_path_id', sa.Integer(), nullable=False),
+        sa.Column('subject_position', sa.Integer(), nullable=False),
+        sa.Column('position', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('is_completed', sa.Boolean(), nullable=False),
+        sa.Column('details', json_type, nullable=True),
+        sa.ForeignKeyConstraint(['learning_path_id'], ['learning_paths.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['subject_id'], ['learning_path_subject.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('learning_path_id', 'subject_position', 'position', name='uq_learning_path_topic_position')
+        )
+        op.create_index(
+            'ix_learning_path_topic_next_incomplete', 'learning_path_topic',
+            ['learning_path_id', 'is_completed', 'subject_position', 'position']
+        )
+    indexes = {index['name'] for index in inspector.get_indexes('learning_paths')}
+    if 'ix_learning_paths_user_id_created_at' not in indexes:
+        op.create_index('ix_learning_paths_user_id_created_at', 'learning_paths', ['user_id', 'created_at'])
+
+    # Split every blob that still holds its subjects into rows. Blobs that are not
+    # a learning path document are left alone; the model returns them as stored.
+    learning_paths, subjects, topics = _tables(bind)
+    for path_id, value in bind.execute(sa.select(learning_paths.c.id, learning_paths.c.learning_path)).all():
+        document = _load(value)
+        if not _is_outline(document):
+            continue
+        for position, subject in enumerate(document.pop('subjects')):
+            subject_id = bind.execute(subjects.insert().values(
+                learning_path_id=path_id,
+                position=position,
+                name=str(subject.get('subject_name', '')),
+                is_completed=_flag(subject.get('is_completed')),
+                is_started=_flag(subject.get('is_started')),
+                details=_dump(bind, {key: item for key, item in subject.items() if key not in SUBJECT_FIELDS}),
+            ).returning(subjects.c.id)).scalar_one()
+            topic_rows = [
+                {
+                    'subject_id': subject_id,
+                    'learning_path_id': path_id,
+                    'subject_position': position,
+                    'position': topic_position,
+                    'name': str(topic.get('topic_name', '')),
+                    'is_completed': _flag(topic.get('is_completed')),
+                    'details': _dump(bind, {key: item for key, item in topic.items() if key not in TOPIC_FIELDS}),
+                }
+                for topic_position, topic in enumerate(subject.get('topics', []))
+            ]
+            if topic_rows:
+                bind.execute(topics.insert(), topic_rows)
+        bind.execute(
+            learning_paths.update().where(learning_paths.c.id == path_id).values(learning_path=_dump(bind, document))
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    learning_paths, subjects, topics = _tables(bind)
+
+    # Fold the rows back into the blobs before dropping them
+    topics_by_subject = {}
+    for row in bind.execute(
+        sa.select(topics.c.subject_id, topics.c.name, topics.c.is_completed, topics.c.details)
+        .order_by(topics.c.subject_id, topics.c.position)
+    ).all():
+        topics_by_subject.setdefault(row.subject_id, []).append({
+            'topic_name': row.name,
+            'is_completed': _flag_value(row.is_completed),
+            **(_load(row.details) or {}),
+        })
+    subjects_by_path = {}
+    for row in bind.execute(
+        sa.select(
+            subjects.c.id, subjects.c.learning_path_id, subjects.c.name,
+            subjects.c.is_completed, subjects.c.is_started, subjects.c.details
+        ).order_by(subjects.c.learning_path_id, subjects.c.position)
+    ).all():
+        subjects_by_path.setdefault(row.learning_path_id, []).append({
+            'subject_name': row.name,
+            'is_completed': _flag_value(row.is_completed),
+            'is_started': _flag_value(row.is_started),
+            **(_load(row.details) or {}),
+            'topics': topics_by_subject.get(row.id, []),
+        })
+    for path_id, value in bind.execute(sa.select(learning_paths.c.id, learning_paths.c.learning_path)).all():
+        document = _load(value)
+        if not isinstance(document, dict) or 'subjects' in document:
+            continue
+        document['subjects'] = subjects_by_path.get(path_id, [])
+        bind.execute(
+            learning_paths.update().where(learning_paths.c.id == path_id).values(learning_path=_dump(bind, document))
+        )
+
+    op.drop_index('ix_learning_paths_user_id_created_at', table_name='learning_paths')
+    op.drop_index('ix_learning_path_topic_next_incomplete', table_name='learning_path_topic')
+    op.drop_table('learning_path_topic')
+    op.drop_table('learning_path_subject')
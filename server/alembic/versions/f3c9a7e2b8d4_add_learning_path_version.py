@@ -0,0 +1,30 @@
+"""Add learning_paths.version
+
+Revision ID: f3c9a7e2b8d4
+Revises: e7b1d5a9c3f2
+Create Date: 2026-10-18 15:26:48.913052
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3c9a7e2b8d4'
+down_revision: Union[str, None] = 'e7b1d5a9c3f2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Existing paths start at version 1, as new ones do
+    op.add_column('learning_paths', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('learning_paths') as batch_op:
+        batch_op.drop_column('version')
@@ -0,0 +1,151 @@
+"""
+Benchmark GET /api/users/employees against a SQLite database of 10k employees.
+
+Compares the single-query endpoint with the previous per-employee (N+1) lookups.
+Run from the server directory:
+
+    python benchmarks/employees_benchmark.py [--employees 10000] [--runs 5]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, insert, event
+from sqlalchemy.orm import sessionmaker
+
+import models
+import auth
+from database import Base, get_db
+from routers import users
+
+
+def seed(session_factory, employee_count, project_count=20):
+    with session_factory() as db:
+        db.execute(insert(models.Project), [
+            {"name": f"Project {index}", "description": "Benchmark project"} for index in range(1, project_count + 1)
+        ])
+        db.execute(insert(models.User), [
+            {
+                "username": f"employee{index:05d}",
+                "email": f"employee{index:05d}@learnpro.com",
+                "hashed_password": "not-a-real-hash",
+                "user_type": models.UserType.EMPLOYEE,
+                # Every tenth employee has no project yet
+                "assigned_project_id": None if index % 10 == 0 else index % project_count + 1,
+            }
+            for index in range(1, employee_count + 1)
+        ])
+        paths = []
+        for index in range(1, employee_count + 1):
+            if index % 10 == 0:
+                continue
+            for attempt in range(2):
+                paths.append({
+                    "user_id": index,
+                    "project_id": index % project_count + 1,
+                    "total_topics": 20,
+                    "completed_topics": (index + attempt) % 21,
+                    "details": "{}",
+                    "updated_at": datetime(2024, 1, 1) + timedelta(minutes=index + attempt),
+                })
+        db.execute(insert(models.LearningPath), paths)
+        db.commit()
+
+
+def list_employees_n_plus_one(db):
+    """The previous implementation: one query for employees, then two more per employee"""
+    employees = db.query(models.User).filter(models.User.user_type == models.UserType.EMPLOYEE).all()
+    result = []
+    for employee in employees:
+        progress = 0.0
+        if employee.assigned_project_id:
+            project = db.query(models.Project).filter(models.Project.id == employee.assigned_project_id).first()
+            if project:
+                learning_path = db.query(models.LearningPath).filter(
+                    models.LearningPath.user_id == employee.id,
+                    models.LearningPath.project_id == project.id
+                ).first()
+                if learning_path and learning_path.total_topics > 0:
+                    progress = learning_path.completed_topics / learning_path.total_topics * 100
+        result.append((employee.id, progress))
+    return result
+
+
+def timed(function, runs):
+    durations = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - started)
+    return statistics.median(durations) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--employees", type=int, default=10000)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(
+            f"sqlite:///{os.path.join(directory, 'benchmark.db')}", connect_args={"check_same_thread": False}
+        )
+        Base.metadata.create_all(bind=engine)
+        SessionLocal = sessionmaker(bind=engine)
+        seed(SessionLocal, args.employees)
+
+        queries = []
+        event.listen(engine, "before_cursor_execute", lambda *event_args: queries.append(1))
+
+        app = FastAPI()
+        app.include_router(users.router)
+
+        def override_get_db():
+            db = SessionLocal()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        app.dependency_overrides[get_db] = override_get_db
+        app.dependency_overrides[auth.get_current_active_user] = lambda: models.User(
+            id=0, username="admin", email="admin@learnpro.com", user_type=models.UserType.ADMIN
+        )
+        client = TestClient(app)
+
+        cases = [
+            ("all employees", "/api/users/employees"),
+            ("page of 50 by progress", "/api/users/employees?limit=50&sort_by=progress&order=desc"),
+            ("search + page of 50", "/api/users/employees?search=employee01&limit=50&sort_by=name"),
+        ]
+        print(f"{args.employees} employees, median of {args.runs} runs")
+        for name, url in cases:
+            queries.clear()
+            assert client.get(url).status_code == 200
+            query_count = len(queries)
+            milliseconds = timed(lambda: client.get(url), args.runs)
+            print(f"  {name:<28} {milliseconds:9.1f} ms  {query_count:6d} queries")
+
+        def run_n_plus_one():
+            with SessionLocal() as db:
+                list_employees_n_plus_one(db)
+
+        queries.clear()
+        run_n_plus_one()
+        query_count = len(queries)
+        milliseconds = timed(run_n_plus_one, max(1, args.runs // 2))
+        print(f"  {'previous N+1 (no HTTP)':<28} {milliseconds:9.1f} ms  {query_count:6d} queries")
+
+
+if __name__ == "__main__":
+    main()
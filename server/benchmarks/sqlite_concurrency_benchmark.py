@@ -0,0 +1,122 @@
+"""
+Benchmark concurrent reads and writes against SQLite with and without the tuning profile.
+
+Each worker process stands in for a uvicorn worker: it opens its own engine and,
+for a fixed time, reads an employee's learning path or records a progress tick
+(a single-row UPDATE and commit). The untuned engine is created the way
+database.py used to create it; each profile gets its own database file.
+Run from the server directory:
+
+    python benchmarks/sqlite_concurrency_benchmark.py [--workers 4] [--seconds 5] [--write-ratio 0.2]
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from sqlalchemy import create_engine, insert, select, update
+from sqlalchemy.exc import OperationalError
+
+import models
+from database import Base, create_db_engine
+
+EMPLOYEES = 2000
+
+
+def make_engine(url, tuned):
+    if tuned:
+        return create_db_engine(url, tuned=True)
+    # The engine database.py created before the tuning profile
+    return create_engine(url, connect_args={"check_same_thread": False})
+
+
+def seed(url, tuned):
+    engine = make_engine(url, tuned)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(models.Project), [{"name": "Benchmark project", "description": ""}])
+        conn.execute(insert(models.User), [
+            {"username": f"employee{index}", "email": f"employee{index}@learnpro.com", "hashed_password": "x"}
+            for index in range(1, EMPLOYEES + 1)
+        ])
+        conn.execute(insert(models.LearningPath), [
+            {"user_id": index, "project_id": 1, "total_topics": 20, "completed_topics": 0, "learning_path": "{}" * 200}
+            for index in range(1, EMPLOYEES + 1)
+        ])
+    engine.dispose()
+
+
+def worker(url, tuned, seconds, write_ratio, seed_value):
+    engine = make_engine(url, tuned)
+    rng = random.Random(seed_value)
+    reads = writes = errors = 0
+    write_latencies = []
+    paths = models.LearningPath.__table__
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        user_id = rng.randint(1, EMPLOYEES)
+        try:
+            if rng.random() < write_ratio:
+                started = time.perf_counter()
+                with engine.begin() as conn:
+                    conn.execute(
+                        update(paths)
+                        .where(paths.c.user_id == user_id)
+                        .values(completed_topics=(paths.c.completed_topics + 1) % 21)
+                    )
+                write_latencies.append(time.perf_counter() - started)
+                writes += 1
+            else:
+                with engine.connect() as conn:
+                    conn.execute(select(paths).where(paths.c.user_id == user_id)).fetchall()
+                reads += 1
+        except OperationalError:
+            # "database is locked" once the lock wait gives up
+            errors += 1
+    engine.dispose()
+    return reads, writes, errors, write_latencies
+
+
+def run_profile(directory, tuned, args):
+    url = f"sqlite:///{os.path.join(directory, 'tuned.db' if tuned else 'default.db')}"
+    seed(url, tuned)
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        results = list(executor.map(
+            worker,
+            [url] * args.workers, [tuned] * args.workers, [args.seconds] * args.workers,
+            [args.write_ratio] * args.workers, range(args.workers)
+        ))
+    reads = sum(result[0] for result in results)
+    writes = sum(result[1] for result in results)
+    errors = sum(result[2] for result in results)
+    latencies = sorted(latency for result in results for latency in result[3])
+    p99 = latencies[int(len(latencies) * 0.99)] * 1000 if latencies else 0.0
+    name = "tuned (WAL profile)" if tuned else "default"
+    print(
+        f"  {name:<20} {reads / args.seconds:9.0f} reads/s {writes / args.seconds:8.0f} writes/s"
+        f"  p99 write {p99:7.1f} ms  {errors:5d} lock errors"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    args = parser.parse_args()
+
+    print(f"{args.workers} worker processes, {args.seconds:g}s each, {args.write_ratio:.0%} writes")
+    with tempfile.TemporaryDirectory() as directory:
+        for tuned in (False, True):
+            run_profile(directory, tuned, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,11 +6,16 @@ from sqlalchemy.orm import Session
 
 from pydantic import BaseModel
 import models
-from database import engine, SessionLocal,get_db
-from routers import auth, users, projects, learning_paths, skill_assessments, livekit, give_kt, take_kt, give_kt_new, take_kt_new
+from database import engine, SessionLocal,get_db, async_engine
+from routers import auth, users, projects, learning_paths, skill_assessments, livekit, give_kt, take_kt, give_kt_new, take_kt_new, jobs, llm
 from fastapi.staticfiles import StaticFiles
 from utils.calendar_utils import create_calendar_event
+from utils.job_queue import resume_pending_jobs, shutdown as shutdown_job_workers
+from utils import project_stats
 import subprocess
+import logging
+
+logger = logging.getLogger(__name__)
 
 # Create database tables
 models.Base.metadata.create_all(bind=engine)
@@ -71,6 +76,31 @@ def create_default_admin():
 # Create default admin user on startup
 create_default_admin()
 
+@app.on_event("startup")
+def resume_jobs():
+    # Pick up jobs that were queued or running when the server last stopped
+    resumed = resume_pending_jobs()
+    if resumed:
+        logger.info("Resumed %d pending background jobs", resumed)
+
+@app.on_event("startup")
+def refresh_project_stats():
+    # The stats table only tracks changes made while the flag is on, so start from a full rebuild
+    if project_stats.PROJECT_STATS_MATERIALIZED:
+        db = SessionLocal()
+        try:
+            project_stats.rebuild_project_stats(db)
+        finally:
+            db.close()
+
+@app.on_event("shutdown")
+def stop_job_workers():
+    shutdown_job_workers(wait=False)
+
+@app.on_event("shutdown")
+async def close_async_engine():
+    await async_engine.dispose()
+
 # @app.on_event("startup")
 # def startup_event():
 #     subprocess.Popen(["python", "agent.py","start"])
@@ -86,6 +116,8 @@ app.include_router(give_kt.router)
 app.include_router(take_kt.router)
 app.include_router(give_kt_new.router)
 app.include_router(take_kt_new.router)
+app.include_router(jobs.router)
+app.include_router(llm.router)
 
 @app.get("/", response_class=HTMLResponse)
 async def serve_home():
@@ -1,10 +1,62 @@
-from sqlalchemy import Boolean, Column, Integer, String, Enum, ForeignKey, Table, DateTime, ARRAY
-from sqlalchemy.orm import relationship
+from sqlalchemy import Boolean, Column, Integer, Float, String, Text, Enum, ForeignKey, Table, DateTime, ARRAY, UniqueConstraint, Index, event
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import relationship, column_property
 from sqlalchemy.sql import func
+from sqlalchemy.types import TypeDecorator
+from datetime import timezone
 import enum
+import json
 
 from database import Base
 
+class UTCDateTime(TypeDecorator):
+    """
+    Timezone-aware timestamp, stored in UTC (timestamptz on PostgreSQL).
+    Naive values are taken to be UTC, and values are always read back with tzinfo=UTC,
+    including from SQLite, which keeps no offset.
+    """
+    impl = DateTime(timezone=True)
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is not None:
+            if value.tzinfo is None:
+                value = value.replace(tzinfo=timezone.utc)
+            value = value.astimezone(timezone.utc)
+        return value
+
+    def process_result_value(self, value, dialect):
+        if value is not None:
+            value = value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+        return value
+
+class JSONText(TypeDecorator):
+    """
+    JSON document that the application reads and writes as a string.
+    PostgreSQL stores it as JSONB; other backends store the text as is.
+    Text that is not valid JSON is kept as a JSON string so it reads back unchanged.
+    """
+    impl = Text
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "postgresql":
+            return dialect.type_descriptor(JSONB())
+        return dialect.type_descriptor(Text())
+
+    def process_bind_param(self, value, dialect):
+        if dialect.name != "postgresql" or not isinstance(value, str):
+            return value
+        try:
+            return json.loads(value)
+        except json.JSONDecodeError:
+            return value
+
+    def process_result_value(self, value, dialect):
+        if dialect.name != "postgresql" or value is None or isinstance(value, str):
+            return value
+        return json.dumps(value)
+
 class UserType(str, enum.Enum):
     ADMIN = "admin"
     EMPLOYEE = "employee"
@@ -18,8 +70,8 @@ class User(Base):
     hashed_password = Column(String)
     user_type = Column(Enum(UserType), default=UserType.EMPLOYEE)
     is_active = Column(Boolean, default=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    created_at = Column(UTCDateTime(), server_default=func.now())
+    updated_at = Column(UTCDateTime(), onupdate=func.now())
     assigned_project_id = Column(Integer, ForeignKey("projects.id"), nullable=True)
     
     # Relationships
@@ -37,9 +89,9 @@ class Project(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True)
     description = Column(String)
-    skill_assessment_quiz = Column(String)  # JSON string for quiz data
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    skill_assessment_quiz = Column(JSONText)  # JSON string for quiz data
+    created_at = Column(UTCDateTime(), server_default=func.now())
+    updated_at = Column(UTCDateTime(), onupdate=func.now())
     
     # Relationships
     subjects = relationship("Subject", back_populates="project", cascade="all, delete-orphan")
@@ -51,8 +103,8 @@ class Subject(Base):
     name = Column(String, index=True)
     topics = Column(String) # Will store topics as comma-separated string
     project_id = Column(Integer, ForeignKey("projects.id"))
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    created_at = Column(UTCDateTime(), server_default=func.now())
+    updated_at = Column(UTCDateTime(), onupdate=func.now())
     
     # Relationships
     project = relationship("Project", back_populates="subjects")
@@ -63,24 +115,223 @@ class Topic(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True)
     description = Column(String, nullable=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    created_at = Column(UTCDateTime(), server_default=func.now())
+    updated_at = Column(UTCDateTime(), onupdate=func.now())
+
+def _flag(value):
+    """Learning path documents hold flags as "true"/"false" strings; accept booleans too"""
+    return value is True or str(value).lower() == "true"
+
+def _flag_value(flag):
+    return "true" if flag else "false"
+
+def _assign_json(row, attribute, document):
+    # Compare parsed documents: JSONB hands them back with its own key order and spacing
+    current = getattr(row, attribute)
+    try:
+        unchanged = current is not None and json.loads(current) == document
+    except json.JSONDecodeError:
+        unchanged = False
+    if not unchanged:
+        setattr(row, attribute, json.dumps(document))
 
 class LearningPath(Base):
     __tablename__ = "learning_paths"
+    __table_args__ = (
+        Index("ix_learning_paths_user_id_created_at", "user_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    project_id = Column(Integer, ForeignKey("projects.id"), nullable=False)
-    total_topics = Column(Integer, default=0)
-    completed_topics = Column(Integer, default=0)
-    learning_path = Column(String)  # JSON string for learning path data
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # active_history keeps the previous values available to the project_stats flush hook
+    project_id = column_property(Column(Integer, ForeignKey("projects.id"), nullable=False), active_history=True)
+    total_topics = column_property(Column(Integer, default=0), active_history=True)
+    completed_topics = column_property(Column(Integer, default=0), active_history=True)
+    # Path fields other than its subjects (path_name, total_estimated_hours, ...);
+    # subjects and topics live in learning_path_subject and learning_path_topic
+    details = Column("learning_path", JSONText)
+    # Bumped on every write; an UPDATE that finds a different version raises StaleDataError
+    version = Column(Integer, nullable=False, server_default="1")
+    created_at = Column(UTCDateTime(), server_default=func.now())
+    updated_at = Column(UTCDateTime(), onupdate=func.now())
+    
+    __mapper_args__ = {"version_id_col": version}
     
     # Relationships
     user = relationship("User", backref="learning_paths")
     project = relationship("Project", backref="learning_paths")
+    subjects = relationship(
+        "LearningPathSubject", back_populates="learning_path",
+        order_by="LearningPathSubject.position", cascade="all, delete-orphan"
+    )
+
+    @property
+    def learning_path(self):
+        """The learning path JSON document, rebuilt from its subject and topic rows"""
+        if self.details is None:
+            return None
+        try:
+            document = json.loads(self.details)
+        except json.JSONDecodeError:
+            document = None
+        if not isinstance(document, dict) or "subjects" in document:
+            # A blob the migration did not (or could not) split up is returned as stored
+            return self.details
+        document["subjects"] = [subject.to_document() for subject in self.subjects]
+        return json.dumps(document)
+
+    @learning_path.setter
+    def learning_path(self, value):
+        """
+        Store a learning path document (JSON string or dict). Subjects and topics are matched
+        to the existing rows by position, so only rows whose content changed are updated.
+        Raises ValueError for anything but an object with a list of subjects, each with a list of topics.
+        """
+        document = json.loads(value) if isinstance(value, str) else value
+        if not isinstance(document, dict) or not isinstance(document.get("subjects", []), list):
+            raise ValueError("A learning path must be a JSON object with a list of subjects")
+        _assign_json(self, "details", {key: item for key, item in document.items() if key != "subjects"})
+
+        existing = list(self.subjects)
+        subjects = []
+        for position, subject_document in enumerate(document.get("subjects", [])):
+            subject = existing[position] if position < len(existing) else LearningPathSubject(position=position)
+            subject.update_from_document(subject_document)
+            subjects.append(subject)
+        if subjects != existing:
+            self.subjects = subjects
+
+    def split_stored_document(self):
+        """
+        Move the subjects of a path still stored as one JSON document (written before the
+        subject and topic rows existed, and not migrated yet) into rows.
+        Returns True if the path was split; the caller flushes or commits.
+        """
+        try:
+            document = json.loads(self.details) if self.details else None
+        except json.JSONDecodeError:
+            return False
+        if not isinstance(document, dict) or "subjects" not in document:
+            return False
+        stored = self.details
+        try:
+            self.learning_path = document
+        except ValueError:
+            # Not a learning path document; keep serving it as stored
+            self.details = stored
+            return False
+        return True
+
+    def count_topics(self):
+        """Set total_topics and completed_topics from the topic rows"""
+        topics = [topic for subject in self.subjects for topic in subject.topics]
+        self.total_topics = len(topics)
+        self.completed_topics = sum(1 for topic in topics if topic.is_completed)
+
+class LearningPathSubject(Base):
+    __tablename__ = "learning_path_subject"
+    __table_args__ = (
+        UniqueConstraint("learning_path_id", "position", name="uq_learning_path_subject_position"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    learning_path_id = Column(Integer, ForeignKey("learning_paths.id", ondelete="CASCADE"), nullable=False)
+    position = Column(Integer, nullable=False)  # Index in the document's subjects list
+    name = Column(String, nullable=False)
+    is_completed = Column(Boolean, nullable=False, default=False)
+    is_started = Column(Boolean, nullable=False, default=False)
+    details = Column(JSONText)  # Remaining subject fields (estimated_hours, assessment, official_docs, ...)
+
+    learning_path = relationship("LearningPath", back_populates="subjects")
+    topics = relationship(
+        "LearningPathTopic", back_populates="subject",
+        order_by="LearningPathTopic.position", cascade="all, delete-orphan"
+    )
+
+    def to_document(self):
+        return {
+            "subject_name": self.name,
+            "is_completed": _flag_value(self.is_completed),
+            "is_started": _flag_value(self.is_started),
+            **json.loads(self.details or "{}"),
+            "topics": [topic.to_document() for topic in self.topics],
+        }
+
+    def update_from_document(self, document):
+        if not isinstance(document, dict) or not isinstance(document.get("topics", []), list):
+            raise ValueError("Each learning path subject must be an object with a list of topics")
+        self.name = str(document.get("subject_name", ""))
+        self.is_completed = _flag(document.get("is_completed"))
+        self.is_started = _flag(document.get("is_started"))
+        _assign_json(self, "details", {
+            key: item for key, item in document.items()
+            if key not in ("subject_name", "is_completed", "is_started", "topics")
+        })
+
+        existing = list(self.topics)
+        topics = []
+        for position, topic_document in enumerate(document.get("topics", [])):
+            topic = existing[position] if position < len(existing) else LearningPathTopic(position=position)
+            topic.update_from_document(topic_document)
+            topics.append(topic)
+        if topics != existing:
+            self.topics = topics
+
+class LearningPathTopic(Base):
+    __tablename__ = "learning_path_topic"
+    __table_args__ = (
+        UniqueConstraint(
+            "learning_path_id", "subject_position", "position", name="uq_learning_path_topic_position"
+        ),
+        # Serves "next incomplete topic of this path" straight from the index
+        Index(
+            "ix_learning_path_topic_next_incomplete",
+            "learning_path_id", "is_completed", "subject_position", "position"
+        ),
+    )
+
+    id = Column(Integer, primary_key=True)
+    subject_id = Column(Integer, ForeignKey("learning_path_subject.id", ondelete="CASCADE"), nullable=False)
+    # Copied from the subject on insert so topics can be found and ordered without a join
+    learning_path_id = Column(Integer, ForeignKey("learning_paths.id", ondelete="CASCADE"), nullable=False)
+    subject_position = Column(Integer, nullable=False)
+    position = Column(Integer, nullable=False)  # Index in the subject's topics list
+    name = Column(String, nullable=False)
+    is_completed = Column(Boolean, nullable=False, default=False)
+    details = Column(JSONText)  # Remaining topic fields
+
+    subject = relationship("LearningPathSubject", back_populates="topics")
+
+    def to_document(self):
+        return {
+            "topic_name": self.name,
+            "is_completed": _flag_value(self.is_completed),
+            **json.loads(self.details or "{}"),
+        }
+
+    def update_from_document(self, document):
+        if not isinstance(document, dict):
+            raise ValueError("Each learning path topic must be an object")
+        self.name = str(document.get("topic_name", ""))
+        self.is_completed = _flag(document.get("is_completed"))
+        _assign_json(self, "details", {
+            key: item for key, item in document.items() if key not in ("topic_name", "is_completed")
+        })
+
+@event.listens_for(LearningPathTopic, "before_insert")
+def copy_subject_position(mapper, connection, topic):
+    # The subject row is inserted first, so its learning_path_id is known by now
+    topic.learning_path_id = topic.subject.learning_path_id
+    topic.subject_position = topic.subject.position
+
+class ProjectStats(Base):
+    """Per-project learning path totals, updated on every learning path write"""
+    __tablename__ = "project_stats"
+
+    project_id = Column(Integer, ForeignKey("projects.id"), primary_key=True)
+    learning_paths = Column(Integer, nullable=False, default=0)
+    completion_total = Column(Float, nullable=False, default=0.0)  # Sum of per-path completion percentages
+    updated_at = Column(UTCDateTime(), server_default=func.now(), onupdate=func.now())
 
 class GiveKT(Base):
     __tablename__ = "give_kt"
@@ -101,7 +352,7 @@ class KtInfo(Base):
     project_id = Column(Integer, ForeignKey("projects.id"), nullable=False)
     employee_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     kt_info = Column(String)  # JSON string for KT information
-    original_transcripts = Column(String)  # JSON string for original transcripts
+    original_transcripts = Column(JSONText)  # JSON string for original transcripts
     # Relationships
     project = relationship("Project", backref="kt_info")
     employee = relationship("User", backref="kt_info")
@@ -113,8 +364,8 @@ class TakeKt(Base):
     employee_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     kt_info_id = Column(Integer, ForeignKey("kt_info.id"), nullable=True)
     status = Column(String, nullable=False, default="Pending")
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    created_at = Column(UTCDateTime(), server_default=func.now())
+    updated_at = Column(UTCDateTime(), onupdate=func.now())
     # Relationships
     project = relationship("Project", backref="take_kt")
     employee = relationship("User", backref="take_kt")
@@ -124,8 +375,8 @@ class GiveProjectOverview(Base):
     id = Column(Integer, primary_key=True, index=True)
     project_id = Column(Integer, ForeignKey("projects.id"), nullable=False)
     employee_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    created_at = Column(UTCDateTime(), server_default=func.now())
+    updated_at = Column(UTCDateTime(), onupdate=func.now())
     # Relationships
     project = relationship("Project", backref="give_project_overview")
     employee = relationship("User", backref="give_project_overview")
@@ -137,9 +388,13 @@ class GiveKtNew(Base):
     repo_url = Column(String, nullable=False)
     username = Column(String, nullable=False)
     commit_info = Column(String)  # Reduced commit string from GitHub
-    kt_info_id = Column(Integer, ForeignKey("kt_info_new.id"), nullable=True)  # Nullable
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # kt_info_new also references give_kt_new, so this key is added after both tables exist
+    # and, on PostgreSQL, checked at commit so the pair can be deleted in either order
+    kt_info_id = Column(Integer, ForeignKey(
+        "kt_info_new.id", name="fk_give_kt_new_kt_info_id", use_alter=True, deferrable=True, initially="DEFERRED"
+    ), nullable=True)  # Nullable
+    created_at = Column(UTCDateTime(), server_default=func.now())
+    updated_at = Column(UTCDateTime(), onupdate=func.now())
     
     # Relationships
     employee = relationship("User", backref="give_kt_new")
@@ -153,9 +408,9 @@ class KtInfoNew(Base):
     employee_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     give_kt_new_id = Column(Integer, ForeignKey("give_kt_new.id"), nullable=False)  # Not nullable
     kt_info = Column(String)  # Processed and digested commit information
-    original_commits = Column(String)  # Original commit information JSON
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    original_commits = Column(JSONText)  # Original commit information JSON
+    created_at = Column(UTCDateTime(), server_default=func.now())
+    updated_at = Column(UTCDateTime(), onupdate=func.now())
     
     # Relationships
     employee = relationship("User", backref="kt_info_new")
@@ -167,13 +422,42 @@ class TakeKtNew(Base):
     give_kt_new_id = Column(Integer, ForeignKey("give_kt_new.id"), nullable=False)  # Not nullable
     employee_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     status = Column(String, default="Kt not created")  # Status can be "Kt not created", "Pending", "Completed"
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    created_at = Column(UTCDateTime(), server_default=func.now())
+    updated_at = Column(UTCDateTime(), onupdate=func.now())
     
     # Relationships
     employee = relationship("User", backref="take_kt_new")
     give_kt_new = relationship("GiveKtNew", backref="take_kt_new")
 
+class JobStatus(str, enum.Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+class Job(Base):
+    __tablename__ = "jobs"
+    __table_args__ = (
+        UniqueConstraint("user_id", "idempotency_key", name="uq_jobs_user_idempotency_key"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    job_type = Column(String, nullable=False, index=True)
+    status = Column(Enum(JobStatus), default=JobStatus.QUEUED, nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    idempotency_key = Column(String, nullable=True)
+    payload = Column(JSONText)  # JSON string for the job input
+    result = Column(JSONText, nullable=True)  # JSON string for the job output
+    error = Column(String, nullable=True)
+    created_at = Column(UTCDateTime(), server_default=func.now())
+    updated_at = Column(UTCDateTime(), onupdate=func.now())
+    started_at = Column(UTCDateTime(), nullable=True)
+    heartbeat_at = Column(UTCDateTime(), nullable=True)  # Renewed while a worker runs the job
+    finished_at = Column(UTCDateTime(), nullable=True)
+
+    # Relationships
+    user = relationship("User", backref="jobs")
+
 # class GiveKtNew(Base):
 #     __tablename__ = "give_kt_new"
 #     id = Column(Integer, primary_key=True, index=True)
@@ -1,15 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from fastapi.responses import JSONResponse
-from utils.llm_utils import generate_digested_transcripts
-from sqlalchemy.orm import Session
-from typing import List
+from utils.llm_utils import generate_digested_transcripts_async
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional, Union
 from datetime import datetime, timedelta
 import models
 import schemas
 import auth
 import json
-from database import get_db
+from database import get_async_db
 from utils.calendar_utils import create_calendar_event
+from utils.pagination import cursor_page
 
 router = APIRouter(prefix="/api/give_kt", tags=["give_kt"])
 
@@ -17,7 +20,7 @@ router = APIRouter(prefix="/api/give_kt", tags=["give_kt"])
 async def create_kt_session(
     assign_give_kt_data: schemas.GiveKTCreate,
     current_user: models.User = Depends(auth.get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create a new KT session entry"""
     # print(assign_give_kt_data)
@@ -29,22 +32,22 @@ async def create_kt_session(
         )
     
     # Check if project exists
-    project = db.query(models.Project).filter(models.Project.id == assign_give_kt_data.project_id).first()
+    project = await db.get(models.Project, assign_give_kt_data.project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
     # Check if employee exists and is an employee
-    employee = db.query(models.User).filter(
+    employee = (await db.execute(select(models.User).filter(
         models.User.id == assign_give_kt_data.employee_id,
         models.User.user_type == models.UserType.EMPLOYEE
-    ).first()
+    ))).scalars().first()
     if not employee:
         raise HTTPException(status_code=404, detail="Employee not found or user is not an employee")
     
     # Check if KT session already exists
-    existing_session = db.query(models.GiveKT).filter(
+    existing_session = (await db.execute(select(models.GiveKT).filter(
         models.GiveKT.project_id == assign_give_kt_data.project_id,
-    ).first()
+    ))).scalars().first()
 
     if existing_session:
         raise HTTPException(status_code=409, detail="KT session already exists for this project and employee")
@@ -57,8 +60,8 @@ async def create_kt_session(
             given_kt_info_id = None
         )
         db.add(kt_session)
-        db.commit()
-        db.refresh(kt_session)
+        await db.commit()
+        await db.refresh(kt_session)
         create_calendar_event({
             "user_email": employee.email,
             "session_duration": 3,
@@ -67,7 +70,7 @@ async def create_kt_session(
         return kt_session
         
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=500,
             detail=f"Failed to create KT session: {str(e)}"
@@ -77,7 +80,7 @@ async def create_kt_session(
 async def delete_kt_session(
     project_id: int,
     current_user: models.User = Depends(auth.get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Delete a KT session by project ID"""
     # Check if user is admin
@@ -88,88 +91,90 @@ async def delete_kt_session(
         )
     
     # Check if project exists
-    project = db.query(models.Project).filter(models.Project.id == project_id).first()
+    project = await db.get(models.Project, project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
     try:
         # Find and delete all KT sessions for this project
-        kt_sessions = db.query(models.GiveKT).filter(models.GiveKT.project_id == project_id).all()
+        kt_sessions = (await db.execute(
+            select(models.GiveKT).filter(models.GiveKT.project_id == project_id)
+        )).scalars().all()
         if not kt_sessions:
             raise HTTPException(status_code=404, detail="No KT sessions found for this project")
         
         # Delete all matching KT sessions
         for session in kt_sessions:
-            db.delete(session)
+            await db.delete(session)
         
-        db.commit()
+        await db.commit()
         return {"message": f"Successfully deleted KT sessions for project ID {project_id}"}
         
     except HTTPException:
         # Re-raise HTTP exceptions
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=500,
             detail=f"Failed to delete KT sessions: {str(e)}"
         )
 
-@router.get("/", response_model=List[dict]|dict)
+def kt_session_summary(kt):
+    session = {}
+    if kt.project:
+        session["project_name"] = kt.project.name
+        session["project_id"] = kt.project.id
+        if kt.employee:
+            session["employee_email"] = kt.employee.email
+    session["status"] = "Pending" if kt.given_kt_info_id is None else "Completed"
+    return session
+
+@router.get(
+    "/",
+    response_model=Union[List[schemas.GiveKTSessionSummary], schemas.GiveKTSessionSummary, dict],
+    response_model_exclude_none=True
+)
 async def list_kt_sessions(
+    response: Response,
+    cursor: Optional[int] = Query(None, ge=0, description="Id of the last session of the previous page"),
+    limit: Optional[int] = Query(None, ge=1, le=1000),
     current_user: models.User = Depends(auth.get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """List all KT sessions"""
+    """
+    List all KT sessions. Admins get a list, paged by session id with cursor and
+    limit (X-Next-Cursor holds the next cursor); employees get their own session.
+    """
+    # Project and employee are loaded in the same query as the sessions
+    query = select(models.GiveKT).options(
+        joinedload(models.GiveKT.project),
+        joinedload(models.GiveKT.employee)
+    )
     # Check if user is admin
     if current_user.user_type == models.UserType.ADMIN:
-        kt_sessions = db.query(models.GiveKT).all()
-        sessions_parsed = []
-        for kt in kt_sessions:
-            session = {}
-            project = db.query(models.Project).filter(models.Project.id == kt.project_id).first()
-            if project:
-                session["project_name"] = project.name
-                session["project_id"] = project.id
-                employee = db.query(models.User).filter(models.User.id == kt.employee_id).first()
-                if employee:
-                    session["employee_email"] = employee.email
-            if kt.given_kt_info_id is None:
-                session["status"] = "Pending"
-            else:
-                session["status"] = "Completed"
-            sessions_parsed.append(session)
-        return sessions_parsed
+        kt_sessions = await cursor_page(db, query, models.GiveKT.id, response, cursor=cursor, limit=limit)
+        return [kt_session_summary(kt) for kt in kt_sessions]
     else:
-        kt = db.query(models.GiveKT).filter(models.GiveKT.employee_id == current_user.id).first()
+        kt = (await db.execute(query.filter(models.GiveKT.employee_id == current_user.id))).scalars().first()
         if not kt:
             return {}
-        session = {}
-        project = db.query(models.Project).filter(models.Project.id == kt.project_id).first()
-        if project:
-            session["project_name"] = project.name
-            session["project_id"] = project.id
-            employee = db.query(models.User).filter(models.User.id == kt.employee_id).first()
-            if employee:
-                session["employee_email"] = employee.email
-        if kt.given_kt_info_id is None:
-            session["status"] = "Pending"
-        else:
-            session["status"] = "Completed"
-        return session 
+        return kt_session_summary(kt)
 
 @router.post("/save-kt-info",status_code=201)
 async def save_kt_info(
     kt_info: schemas.Kt_info,
     current_user: models.User = Depends(auth.get_current_active_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
 
     try:
-        digested_kt = generate_digested_transcripts(kt_info.kt_transcripts)
+        digested_kt = await generate_digested_transcripts_async(kt_info.kt_transcripts)
         # print(kt_info.kt_transcripts)
-        give_kt_db = db.query(models.GiveKT).filter_by(id=kt_info.give_kt_id).first()
-        take_kt_all = db.query(models.TakeKt).filter_by(project_id=give_kt_db.project_id,status="Kt not created").all()
+        give_kt_db = await db.get(models.GiveKT, kt_info.give_kt_id)
+        take_kt_all = (await db.execute(
+            select(models.TakeKt).filter_by(project_id=give_kt_db.project_id, status="Kt not created")
+        )).scalars().all()
         if not give_kt_db.employee_id == current_user.id:
             raise HTTPException(status_code=400,detail="You are not authorised to create a KT for this project")
         ktItem = models.KtInfo(
@@ -179,16 +184,19 @@ async def save_kt_info(
             original_transcripts = json.dumps(kt_info.kt_transcripts)
         )
         db.add(ktItem)
-        db.commit()
+        await db.commit()
 
         give_kt_db.given_kt_info_id = ktItem.id
         for take_kt in take_kt_all:
             take_kt.kt_info_id = ktItem.id
             take_kt.status = "Pending"
 
-        db.commit()
+        await db.commit()
         return JSONResponse({"detail":"Kt info added to database"})
         
+    except HTTPException:
+        # Re-raise HTTP exceptions, including 503 while the LLM circuit is open
+        raise
     except Exception as err:
         if "not authorised" in str(err):
             raise err
@@ -200,7 +208,7 @@ async def save_kt_info(
 @router.get("/pending", response_model=schemas.PendingKTProjectDetails)
 async def get_pending_kt_details(
     current_user: models.User = Depends(auth.get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get detailed information about pending KT assignments for an employee.
@@ -208,10 +216,10 @@ async def get_pending_kt_details(
     """
 
     # Check if employee exists
-    employee = db.query(models.User).filter(
+    employee = (await db.execute(select(models.User).filter(
         models.User.id == current_user.id,
         models.User.user_type == models.UserType.EMPLOYEE
-    ).first()
+    ))).scalars().first()
     
     if not employee:
         raise HTTPException(status_code=404, detail="Employee not found or user is not an employee")
@@ -220,15 +228,13 @@ async def get_pending_kt_details(
     # We need to join GiveKT with Project and User tables to get all required information
     
     # Get all pending KT assignments
-    pending_kt_assignments = db.query(models.GiveKT).filter(
+    pending_kt_assignments = (await db.execute(select(models.GiveKT).filter(
         models.GiveKT.employee_id == current_user.id,
         models.GiveKT.given_kt_info_id == None
-    ).first()
+    ))).scalars().first()
     
     # Get project details
-    project = db.query(models.Project).filter(
-        models.Project.id == pending_kt_assignments.project_id
-    ).first()
+    project = await db.get(models.Project, pending_kt_assignments.project_id)
         
     if project:
         # Create detailed response object
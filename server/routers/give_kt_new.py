@@ -1,12 +1,18 @@
-from fastapi import HTTPException, APIRouter, Depends
+from fastapi import HTTPException, APIRouter, Depends, Query, Response
 from pydantic import BaseModel
 import os
-from github import Github
+import logging
 from fastapi.responses import JSONResponse
-from utils.github_utils import extract_owner_repo, get_commits_info, get_llm_usable_string
-from utils.llm_utils import remove_less_valuable_changes_from_commit, generate_digested_transcripts_github
-from database import get_db
-from sqlalchemy.orm import Session
+from utils.github_utils import extract_owner_repo, get_commits_info, get_author_emails, get_llm_usable_string, filter_commits
+from utils.git_mirror import get_commits_info_from_mirror, GitMirrorError
+from utils.commit_cache import get_commits_info_cached, COMMIT_CACHE_ENABLED
+from utils.github_client import github_clients, get_github_client, configured_tokens
+from utils.llm_utils import remove_less_valuable_changes_from_commit, generate_digested_transcripts_github_async
+from database import get_db, get_async_db
+from utils.pagination import cursor_page
+from sqlalchemy import select
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.ext.asyncio import AsyncSession
 from models import GiveKtNew, User, KtInfoNew, TakeKtNew
 from typing import Optional, List
 import schemas
@@ -18,18 +24,52 @@ import models
 
 router = APIRouter(prefix="/api/give_github_kt", tags=["github_kt"])
 
+logger = logging.getLogger(__name__)
+
 class RepoRequest(BaseModel):
     repo_url: str
     username: str
     employee_id: int
+    # Also have the LLM review the locally filtered commits
+    refine_with_llm: bool = False
 
-github_token = os.getenv("GITHUB_TOKEN")
-if not github_token:
-    raise Exception("Missing GITHUB_TOKEN environment variable")
+COMMIT_DEPTH = int(os.environ.get("COMMIT_DEPTH", "10"))
+# "api" reads commits through the GitHub REST API, "mirror" from a local bare mirror of the repository
+COMMIT_SOURCE = os.getenv("COMMIT_SOURCE", "api")
 
-gh = Github(github_token)
+def load_commits(owner, repo_name, username):
+    """Commits made by username, read from the configured COMMIT_SOURCE"""
+    if COMMIT_SOURCE == "mirror":
+        # Public repositories can be mirrored without a token
+        token = github_clients.get_token() if configured_tokens() else None
+        emails = ()
+        if token and "@" not in username:
+            # GitHub attributes commits to a login by email; ask it which emails the login used here
+            repo = get_github_client().get_repo(f"{owner}/{repo_name}", lazy=True)
+            try:
+                emails = get_author_emails(repo, username)
+            except Exception as e:
+                logger.warning("Error reading author emails, matching the login only: %s", e)
+        try:
+            return get_commits_info_from_mirror(
+                f"https://github.com/{owner}/{repo_name}.git", username, token=token, emails=emails
+            )
+        except GitMirrorError:
+            logger.exception("Error reading commits from mirror")
+            raise HTTPException(status_code=404, detail="Repository not found")
 
-COMMIT_DEPTH = int(os.environ.get("COMMIT_DEPTH", "10"))
+    # Imported here so the GitHub stack is only loaded once it is used
+    from github import UnknownObjectException
+    gh = get_github_client()
+    # Lazy: no GET /repos/... up front, so a commit listing answered 304 costs no rate limit
+    repo = gh.get_repo(f"{owner}/{repo_name}", lazy=True)
+    try:
+        # Retrieve commits made by the specified author
+        if COMMIT_CACHE_ENABLED:
+            return get_commits_info_cached(repo, username)
+        return get_commits_info(repo, username)
+    except UnknownObjectException:
+        raise HTTPException(status_code=404, detail="Repository not found")
 
 @router.post("/commits", response_model=schemas.GitHubCommitInfo)
 def get_user_commits(req: RepoRequest, db: Session = Depends(get_db)):
@@ -44,15 +84,10 @@ def get_user_commits(req: RepoRequest, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Employee not found")
 
     try:
-        repo = gh.get_repo(f"{owner}/{repo_name}")
-    except Exception as e:
-        raise HTTPException(status_code=404, detail="Repository not found")
-
-    try:
-        # Retrieve commits made by the specified author
-        commits = get_commits_info(repo, req.username)
-        llm_usable_string = get_llm_usable_string(commits)
-        reduced_string = remove_less_valuable_changes_from_commit(llm_usable_string)
+        commits = load_commits(owner, repo_name, req.username)
+        reduced_string = get_llm_usable_string(filter_commits(commits))
+        if req.refine_with_llm:
+            reduced_string = remove_less_valuable_changes_from_commit(reduced_string)
         
         # Save to database
         commit_info = GiveKtNew(
@@ -67,65 +102,53 @@ def get_user_commits(req: RepoRequest, db: Session = Depends(get_db)):
         db.refresh(commit_info)
         
         return commit_info
+    except HTTPException:
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Error processing request: {e}")
 
-@router.get("/", response_model=List[dict])
+@router.get("/", response_model=List[schemas.GiveKtNewSessionSummary], response_model_exclude_none=True)
 async def list_kt_sessions(
+    response: Response,
+    cursor: Optional[int] = Query(None, ge=0, description="Id of the last session of the previous page"),
+    limit: Optional[int] = Query(None, ge=1, le=1000),
     current_user: User = Depends(auth.get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """List all GitHub-based Give KT sessions"""
-    # Check if user is admin
-    if current_user.user_type == models.UserType.ADMIN:
-        give_kt_sessions = db.query(GiveKtNew).all()
-        sessions_parsed = []
-        for give_kt_session in give_kt_sessions:
-            session = {}
+    """
+    List all GitHub-based Give KT sessions, paged by session id with cursor and
+    limit (X-Next-Cursor holds the next cursor)
+    """
+    # The employee is loaded in the same query; a session is completed once its KT info is linked
+    query = select(GiveKtNew).options(joinedload(GiveKtNew.employee))
+    is_admin = current_user.user_type == models.UserType.ADMIN
+    if not is_admin:
+        # For employees, show only their sessions
+        query = query.filter(GiveKtNew.employee_id == current_user.id)
+    give_kt_sessions = await cursor_page(db, query, GiveKtNew.id, response, cursor=cursor, limit=limit)
 
+    sessions_parsed = []
+    for give_kt_session in give_kt_sessions:
+        session = {
+            "repo_url": give_kt_session.repo_url,
+            "username": give_kt_session.username,
+            "status": "Completed" if give_kt_session.kt_info_id is not None else "Pending"
+        }
+        if is_admin:
             session["give_kt_new_id"] = give_kt_session.id
-            session["repo_url"] = give_kt_session.repo_url
-            session["username"] = give_kt_session.username
-            
-            employee = db.query(User).filter(User.id == give_kt_session.employee_id).first()
-            if employee:
-                session["employee_email"] = employee.email
-                
-            # Check if KT info exists
-            kt_info = db.query(KtInfoNew).filter(KtInfoNew.id == give_kt_session.id).first()
-            if kt_info:
-                session["status"] = "Completed"
-            else:
-                session["status"] = "Pending"
-                
-            sessions_parsed.append(session)
-        return sessions_parsed
-    else:
-        # For employees, show only their sessions
-        give_kt_sessions = db.query(GiveKtNew).filter(GiveKtNew.employee_id == current_user.id).all()
-        sessions_parsed = []
-        for give_kt_session in give_kt_sessions:
-            session = {}
+            if give_kt_session.employee:
+                session["employee_email"] = give_kt_session.employee.email
+        else:
             session["id"] = give_kt_session.id
-            session["repo_url"] = give_kt_session.repo_url
-            session["username"] = give_kt_session.username
-            
-            # Check if KT info exists
-            kt_info = db.query(KtInfoNew).filter(KtInfoNew.id == give_kt_session.id).first()
-            if kt_info:
-                session["status"] = "Completed"
-            else:
-                session["status"] = "Pending"
-                
-            sessions_parsed.append(session)
-        return sessions_parsed
+        sessions_parsed.append(session)
+    return sessions_parsed
 
 @router.delete("/{give_kt_id}", response_model=dict)
 async def delete_kt_session(
     give_kt_id: int,
     current_user: models.User = Depends(auth.get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Delete a GitHub KT session by commit ID"""
     # Check if user is admin
@@ -136,29 +159,33 @@ async def delete_kt_session(
         )
     
     # Check if commit exists
-    give_kt = db.query(GiveKtNew).filter(GiveKtNew.id == give_kt_id).first()
+    give_kt = await db.get(GiveKtNew, give_kt_id)
     if not give_kt:
         raise HTTPException(status_code=404, detail="GitHub KT session not found")
     
     try:
         # Find and delete any related KT info
-        kt_info = db.query(KtInfoNew).filter(KtInfoNew.give_kt_new_id == give_kt_id).all()
+        kt_info = (await db.execute(
+            select(KtInfoNew).filter(KtInfoNew.give_kt_new_id == give_kt_id)
+        )).scalars().all()
         for info in kt_info:
-            db.delete(info)
+            await db.delete(info)
             
         # Find and delete any related take KT sessions
-        take_kt_sessions = db.query(TakeKtNew).filter(TakeKtNew.give_kt_new_id == give_kt_id).all()
+        take_kt_sessions = (await db.execute(
+            select(TakeKtNew).filter(TakeKtNew.give_kt_new_id == give_kt_id)
+        )).scalars().all()
         for session in take_kt_sessions:
-            db.delete(session)
+            await db.delete(session)
             
         # Delete the commit info
-        db.delete(give_kt)
+        await db.delete(give_kt)
         
-        db.commit()
+        await db.commit()
         return {"message": f"Successfully deleted GitHub KT session with ID {give_kt_id}"}
         
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=500,
             detail=f"Failed to delete KT session: {str(e)}"
@@ -168,14 +195,12 @@ async def delete_kt_session(
 async def save_kt_info(
     kt_info: schemas.KtInfoNewCreate,
     current_user: User = Depends(auth.get_current_active_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Save KT information based on GitHub commits"""
     try:
         # Get the GitHub commit info
-        give_kt = db.query(GiveKtNew).filter(
-            GiveKtNew.id == kt_info.give_kt_new_id
-        ).first()
+        give_kt = await db.get(GiveKtNew, kt_info.give_kt_new_id)
         
         if not give_kt:
             raise HTTPException(status_code=404, detail="GitHub KT session not found")
@@ -188,13 +213,13 @@ async def save_kt_info(
             )
             
         # Process the transcripts
-        digested_kt = generate_digested_transcripts_github(kt_info.kt_transcripts)
+        digested_kt = await generate_digested_transcripts_github_async(kt_info.kt_transcripts)
         
         # Find all pending take KT sessions
-        take_kt_all = db.query(TakeKtNew).filter(
+        take_kt_all = (await db.execute(select(TakeKtNew).filter(
             TakeKtNew.give_kt_new_id == give_kt.id,
             TakeKtNew.status == "Kt not created"
-        ).all()
+        ))).scalars().all()
         
         # Create new KT info
         kt_info_new = KtInfoNew(
@@ -205,15 +230,15 @@ async def save_kt_info(
         )
         
         db.add(kt_info_new)
-        db.commit()
-        db.refresh(kt_info_new)
+        await db.commit()
+        await db.refresh(kt_info_new)
         give_kt.kt_info_id = kt_info_new.id
         # Update take KT sessions
         for take_kt in take_kt_all:
             take_kt.kt_info_id = kt_info_new.id
             take_kt.status = "Pending"
             
-        db.commit()
+        await db.commit()
         
         return JSONResponse({"detail": "KT info added to database"})
         
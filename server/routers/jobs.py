@@ -0,0 +1,39 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import JSONResponse
+from sqlalchemy.orm import Session
+
+import models
+import schemas
+import auth
+from database import get_db
+
+router = APIRouter(prefix="/api/jobs", tags=["jobs"])
+
+def accepted_response(job: models.Job):
+    """202 response pointing the client at the job status endpoint"""
+    return JSONResponse(
+        status_code=status.HTTP_202_ACCEPTED,
+        content=schemas.JobAccepted(
+            job_id=job.id,
+            status=job.status,
+            status_url=f"/api/jobs/{job.id}"
+        ).model_dump(mode="json"),
+        headers={"Location": f"/api/jobs/{job.id}"}
+    )
+
+@router.get("/{job_id}", response_model=schemas.Job)
+def get_job(
+    job_id: int,
+    current_user: models.User = Depends(auth.get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Get the status and result of a background job"""
+    job = db.query(models.Job).filter(models.Job.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    # Only the user who submitted the job or an admin can see it
+    if current_user.user_type != models.UserType.ADMIN and job.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not authorized to view this job")
+
+    return job
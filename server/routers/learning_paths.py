@@ -1,19 +1,69 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List, Dict
+from fastapi import APIRouter, Body, Depends, HTTPException, status, Header, Response
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.orm.exc import StaleDataError
+from typing import Any, List, Dict, Optional
+from datetime import datetime, timezone
 import json
-from datetime import datetime
+import logging
+import jsonpatch
 
 import models
 import schemas
 import auth
+import database
 from database import get_db
-from utils.llm_utils import generate_learning_path
+from utils.llm_utils import generate_learning_path, stream_learning_path
+from utils.sse import sse_response
 from utils.calendar_utils import create_calendar_event_recurring
+from utils.job_queue import job_handler, submit_job, after_commit
+from routers.jobs import accepted_response
+from routers.llm import require_llm_available
 router = APIRouter(tags=["learning paths"])
 
+logger = logging.getLogger(__name__)
+
+def load_outline():
+    """Loader option that fetches a learning path's subjects and topics in two more queries"""
+    return selectinload(models.LearningPath.subjects).selectinload(models.LearningPathSubject.topics)
+
+STALE_LEARNING_PATH = "The learning path has changed since it was read. Fetch it again and retry."
+
+def learning_path_etag(learning_path):
+    """ETag of a learning path; it changes with every write, which bumps the version"""
+    return f'"{learning_path.id}-{learning_path.version}"'
+
+def check_if_match(learning_path, if_match: Optional[str]):
+    """Reject a write whose If-Match header does not name the learning path's current ETag"""
+    if if_match is None:
+        return
+    tags = [tag.strip() for tag in if_match.split(",")]
+    if "*" not in tags and learning_path_etag(learning_path) not in tags:
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail=STALE_LEARNING_PATH
+        )
+
+def commit_learning_path(learning_path, db: Session, response: Response):
+    """Commit a learning path write and return the path with its new ETag set on the response"""
+    try:
+        db.commit()
+    except StaleDataError:
+        # Another request wrote the path between our read and this UPDATE
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail=STALE_LEARNING_PATH
+        )
+    
+    learning_path = db.query(models.LearningPath).options(load_outline()).filter(
+        models.LearningPath.id == learning_path.id
+    ).one()
+    response.headers["ETag"] = learning_path_etag(learning_path)
+    return learning_path
+
 @router.get("/api/learning_paths/me", response_model=schemas.LearningPath)
 def get_my_learning_path(
+    response: Response,
     current_user: models.User = Depends(auth.get_current_active_user),
     db: Session = Depends(get_db)
 ):
@@ -25,7 +75,7 @@ def get_my_learning_path(
         )
     
     # Get the most recent learning path for the user
-    learning_path = db.query(models.LearningPath).filter(
+    learning_path = db.query(models.LearningPath).options(load_outline()).filter(
         models.LearningPath.user_id == current_user.id
     ).order_by(models.LearningPath.created_at.desc()).first()
     
@@ -35,6 +85,7 @@ def get_my_learning_path(
             detail="No learning path found. Please contact your administrator."
         )
     
+    response.headers["ETag"] = learning_path_etag(learning_path)
     return learning_path
 
 @router.get("/learning_path")
@@ -47,13 +98,53 @@ def get_learning_path():
     }
     return generate_learning_path(topics, scores)
 
-@router.post("/api/learning_paths/from_assessment", response_model=schemas.LearningPath)
-def create_learning_path_from_assessment(
-    quiz_submission: schemas.QuizSubmission,
-    current_user: models.User = Depends(auth.get_current_active_user),
-    db: Session = Depends(get_db)
-):
-    """Create a learning path based on skill assessment quiz results"""
+def stage_learning_path(payload, learning_path_data, db: Session):
+    """Add a generated learning path to the session without committing it"""
+    db_learning_path = models.LearningPath(
+        user_id=payload["user_id"],
+        project_id=payload["project_id"],
+        learning_path=learning_path_data,
+        total_topics=sum(len(subject.get('topics', [])) for subject in learning_path_data.get('subjects', [])),
+        completed_topics=0,
+        created_at=datetime.now(timezone.utc)  # Use datetime object instead of timestamp
+    )
+    db.add(db_learning_path)
+    db.flush()
+    return db_learning_path
+
+def schedule_study_sessions(payload, learning_path_data):
+    """
+    Create the recurring calendar sessions for a saved learning path. The path is
+    already committed, so a calendar failure is reported and otherwise ignored.
+    """
+    try:
+        create_calendar_event_recurring({
+            "user_email": payload["user_email"],
+            "daily_session_duration": 2,
+            "total_hours": learning_path_data['total_estimated_hours']
+        })
+    except Exception:
+        logger.exception("Error scheduling study sessions")
+
+def save_generated_learning_path(payload, learning_path_data, db: Session):
+    """Save a generated learning path and schedule the study sessions"""
+    db_learning_path = stage_learning_path(payload, learning_path_data, db)
+    db.commit()
+    db.refresh(db_learning_path)
+    schedule_study_sessions(payload, learning_path_data)
+    return db_learning_path
+
+@job_handler("create_learning_path")
+def run_create_learning_path_job(payload, db: Session):
+    """Generate the learning path, save it and schedule the study sessions"""
+    # Generate learning path using LLM
+    learning_path_data = generate_learning_path(payload["topics"], payload["scores"])
+    # Committed by the job queue with the job's status; the calendar work runs after that
+    db_learning_path = stage_learning_path(payload, learning_path_data, db)
+    after_commit(db, lambda: schedule_study_sessions(payload, learning_path_data))
+    return {"learning_path_id": db_learning_path.id}
+
+def check_can_create_learning_path(current_user: models.User):
     # print(current_user)
     if current_user.user_type != models.UserType.EMPLOYEE:
         raise HTTPException(
@@ -66,33 +157,65 @@ def create_learning_path_from_assessment(
             status_code=400,
             detail="No project assigned to user"
         )
-    
+
+def learning_path_payload(current_user: models.User, quiz_submission: schemas.QuizSubmission):
     # Get topics and scores from quiz submission
     topics = list(quiz_submission.topicScores.keys())
     scores = {topic: score.percentage / 100 for topic, score in quiz_submission.topicScores.items()}
+    return {
+        "user_id": current_user.id,
+        "user_email": current_user.email,
+        "project_id": current_user.assigned_project_id,
+        "topics": topics,
+        "scores": scores
+    }
+
+@router.post("/api/learning_paths/from_assessment", status_code=202, response_model=schemas.JobAccepted)
+def create_learning_path_from_assessment(
+    quiz_submission: schemas.QuizSubmission,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    current_user: models.User = Depends(auth.get_current_active_user),
+    db: Session = Depends(get_db),
+    _: None = Depends(require_llm_available)
+):
+    """
+    Queue learning path generation from skill assessment quiz results.
+    Poll GET /api/jobs/{job_id}; on success the result holds the new learning_path_id.
+    """
+    check_can_create_learning_path(current_user)
     
-    # Generate learning path using LLM
-    learning_path_data = generate_learning_path(topics, scores)
-    
-    # Create learning path record
-    db_learning_path = models.LearningPath(
+    job = submit_job(
+        db,
+        "create_learning_path",
+        learning_path_payload(current_user, quiz_submission),
         user_id=current_user.id,
-        project_id=current_user.assigned_project_id,
-        learning_path=json.dumps(learning_path_data),
-        total_topics=sum(len(subject.get('topics', [])) for subject in learning_path_data.get('subjects', [])),
-        completed_topics=0,
-        created_at=datetime.utcnow()  # Use datetime object instead of timestamp
+        idempotency_key=idempotency_key
     )
-    
-    db.add(db_learning_path)
-    db.commit()
-    db.refresh(db_learning_path)
-    create_calendar_event_recurring({
-            "user_email": current_user.email,
-            "daily_session_duration": 2,
-            "total_hours": learning_path_data['total_estimated_hours']
-        })
-    return db_learning_path
+    return accepted_response(job)
+
+@router.post("/api/learning_paths/from_assessment/stream")
+def stream_learning_path_from_assessment(
+    quiz_submission: schemas.QuizSubmission,
+    current_user: models.User = Depends(auth.get_current_active_user),
+    _: None = Depends(require_llm_available)
+):
+    """
+    Create a learning path from skill assessment results, streamed as Server-Sent Events:
+    one "subject" event per generated subject, then a "done" event with the saved learning path.
+    """
+    check_can_create_learning_path(current_user)
+    payload = learning_path_payload(current_user, quiz_submission)
+
+    def events():
+        for event, data in stream_learning_path(payload["topics"], payload["scores"]):
+            if event == "done":
+                # The body outlives the request's get_db session, so it opens its own
+                with database.SessionLocal() as db:
+                    learning_path_id = save_generated_learning_path(payload, data, db).id
+                data = {"learning_path_id": learning_path_id, "learning_path": data}
+            yield event, data
+
+    return sse_response(events())
 
 @router.get("/api/learning_paths/user/{user_id}", response_model=List[schemas.LearningPath])
 def get_user_learning_paths(
@@ -107,7 +230,7 @@ def get_user_learning_paths(
             detail="Not authorized to view these learning paths"
         )
     
-    learning_paths = db.query(models.LearningPath).filter(
+    learning_paths = db.query(models.LearningPath).options(load_outline()).filter(
         models.LearningPath.user_id == user_id
     ).all()
     return learning_paths
@@ -115,10 +238,15 @@ def get_user_learning_paths(
 @router.put("/api/learning_paths/update", response_model=schemas.LearningPath)
 def update_learning_path(
     learning_path_update: schemas.LearningPathUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     current_user: models.User = Depends(auth.get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """Update the learning path for the currently logged-in user"""
+    """
+    Update the learning path for the currently logged-in user. With an If-Match header
+    the update is only applied if the path still has that ETag.
+    """
     if current_user.user_type != models.UserType.EMPLOYEE:
         raise HTTPException(
             status_code=403,
@@ -126,7 +254,7 @@ def update_learning_path(
         )
     
     # Get the most recent learning path for the user
-    learning_path = db.query(models.LearningPath).filter(
+    learning_path = db.query(models.LearningPath).options(load_outline()).filter(
         models.LearningPath.user_id == current_user.id
     ).order_by(models.LearningPath.created_at.desc()).first()
     
@@ -135,9 +263,13 @@ def update_learning_path(
             status_code=404,
             detail="No learning path found to update. Please create a learning path first."
         )
+    check_if_match(learning_path, if_match)
     
-    # Update the learning path with the new data
-    learning_path.learning_path = learning_path_update.learning_path
+    # Update the learning path with the new data; only changed subject and topic rows are written
+    try:
+        learning_path.learning_path = learning_path_update.learning_path
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid learning path: {e}")
     
     # Update total_topics and completed_topics if provided
     if learning_path_update.total_topics is not None:
@@ -147,12 +279,117 @@ def update_learning_path(
         learning_path.completed_topics = learning_path_update.completed_topics
     
     # Update the timestamp
-    learning_path.updated_at = datetime.utcnow()
+    learning_path.updated_at = datetime.now(timezone.utc)
     
-    db.commit()
-    db.refresh(learning_path)
+    return commit_learning_path(learning_path, db, response)
+
+@router.patch("/api/learning_paths/me", response_model=schemas.LearningPath)
+def patch_learning_path(
+    response: Response,
+    operations: List[Dict[str, Any]] = Body(..., media_type="application/json-patch+json"),
+    if_match: Optional[str] = Header(None),
+    current_user: models.User = Depends(auth.get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Apply a JSON Patch (RFC 6902) to the current user's learning path document, e.g.
+    [{"op": "replace", "path": "/subjects/0/topics/2/is_completed", "value": "true"}].
+    total_topics and completed_topics are recomputed from the patched document.
+    With an If-Match header the patch is only applied if the path still has that ETag.
+    """
+    if current_user.user_type != models.UserType.EMPLOYEE:
+        raise HTTPException(
+            status_code=403,
+            detail="Only employees can update their learning paths"
+        )
     
-    return learning_path
+    learning_path = db.query(models.LearningPath).options(load_outline()).filter(
+        models.LearningPath.user_id == current_user.id
+    ).order_by(models.LearningPath.created_at.desc()).first()
+    
+    if not learning_path:
+        raise HTTPException(
+            status_code=404,
+            detail="No learning path found to update. Please create a learning path first."
+        )
+    check_if_match(learning_path, if_match)
+    
+    try:
+        document = jsonpatch.apply_patch(json.loads(learning_path.learning_path), operations)
+    except jsonpatch.JsonPatchTestFailed as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Patch test failed: {e}")
+    except (jsonpatch.JsonPatchException, jsonpatch.JsonPointerException, ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid patch: {e}")
+    
+    # Only the subject and topic rows the patch changed are written
+    try:
+        learning_path.learning_path = document
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid learning path: {e}")
+    learning_path.count_topics()
+    learning_path.updated_at = datetime.now(timezone.utc)
+    
+    return commit_learning_path(learning_path, db, response)
+
+@router.post(
+    "/api/learning_paths/me/subjects/{subject_index}/topics/{topic_index}/complete",
+    response_model=schemas.LearningPathProgress
+)
+def complete_learning_path_topic(
+    subject_index: int,
+    topic_index: int,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    current_user: models.User = Depends(auth.get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Mark one topic of the current user's learning path as completed, addressed by its
+    subject and topic index in the document. Completing a completed topic changes nothing.
+    With an If-Match header the topic is only completed if the path still has that ETag.
+    """
+    if current_user.user_type != models.UserType.EMPLOYEE:
+        raise HTTPException(
+            status_code=403,
+            detail="Only employees can update their learning paths"
+        )
+    
+    # The row lock keeps concurrent completions from losing a count (PostgreSQL)
+    learning_path = db.query(models.LearningPath).filter(
+        models.LearningPath.user_id == current_user.id
+    ).order_by(models.LearningPath.created_at.desc()).with_for_update().first()
+    
+    if not learning_path:
+        raise HTTPException(
+            status_code=404,
+            detail="No learning path found to update. Please create a learning path first."
+        )
+    check_if_match(learning_path, if_match)
+    
+    if learning_path.split_stored_document():
+        db.flush()
+    
+    topic = db.query(models.LearningPathTopic).filter(
+        models.LearningPathTopic.learning_path_id == learning_path.id,
+        models.LearningPathTopic.subject_position == subject_index,
+        models.LearningPathTopic.position == topic_index
+    )
+    # A single-row UPDATE; nothing else in the learning path is rewritten
+    completed = topic.filter(models.LearningPathTopic.is_completed == False).update(
+        {models.LearningPathTopic.is_completed: True}, synchronize_session=False
+    )
+    if completed:
+        learning_path.completed_topics = (learning_path.completed_topics or 0) + 1
+        learning_path.updated_at = datetime.now(timezone.utc)
+    elif not db.query(topic.exists()).scalar():
+        raise HTTPException(status_code=404, detail="Topic not found in the learning path")
+    
+    learning_path = commit_learning_path(learning_path, db, response)
+    
+    return {
+        "total_topics": learning_path.total_topics,
+        "completed_topics": learning_path.completed_topics
+    }
 
 
 @router.delete("/api/users/{employee_id}/learning_path", status_code=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,40 @@
+from fastapi import APIRouter, Depends, HTTPException
+
+import models
+import auth
+from utils import llm_client
+from utils.token_budget import get_usage
+
+router = APIRouter(prefix="/api/llm", tags=["llm"])
+
+HEALTH_STATUS = {"closed": "ok", "half_open": "degraded", "open": "unavailable"}
+
+def require_llm_available():
+    """Dependency that rejects work needing the LLM with a 503 while its circuit is open"""
+    llm_client.breaker.check()
+
+@router.get("/health")
+def get_llm_health():
+    """Report whether the LLM provider is usable, based on the circuit breaker state"""
+    circuit = llm_client.breaker.snapshot()
+    return {
+        "status": HEALTH_STATUS[circuit["state"]],
+        "circuit": circuit
+    }
+
+@router.get("/metrics")
+def get_llm_metrics(
+    current_user: models.User = Depends(auth.get_current_active_user),
+):
+    """Get LLM governor queue metrics, client retry counters and token usage per call site"""
+    if current_user.user_type != models.UserType.ADMIN:
+        raise HTTPException(
+            status_code=403,
+            detail="Only admin users can view LLM metrics"
+        )
+
+    return {
+        "governor": llm_client.governor.metrics(),
+        "counters": llm_client.get_counters(),
+        "usage": get_usage()
+    }
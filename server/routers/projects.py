@@ -1,26 +1,71 @@
-from fastapi import APIRouter, Depends, HTTPException,UploadFile, File, Form 
+from fastapi import APIRouter, Depends, HTTPException,UploadFile, File, Form, Header
 from typing import Annotated
 from sqlalchemy.orm import Session
-from typing import List
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
 import json
 from time import sleep
 import models
 import schemas
 import auth
-from database import get_db
+from database import get_db, get_async_db
 from utils.llm_utils import generate_assignment_questions, generate_subjects_from_dependencies, groq_calling_function
 from utils.file_parsing_utils import parse_requirements, parse_package_json
+from utils.job_queue import job_handler, submit_job
+from utils import project_stats
+from routers.jobs import accepted_response
+from routers.llm import require_llm_available
 
 router = APIRouter(prefix="/api/projects", tags=["projects"])
 
-@router.post("/")
+@job_handler("create_project")
+def run_create_project_job(payload, db: Session):
+    """Generate subjects and the skill assessment quiz, then save the project"""
+    # Call your LLM function (or a helper) that analyzes dependencies
+    # and returns a list of subjects and topics.
+    subjects = generate_subjects_from_dependencies(payload["dependencies"])
+    
+    # Optionally, generate quiz questions based on the subjects/topics.
+    # Each subject's questions are generated concurrently and merged
+    quiz_data = generate_assignment_questions([{
+        "subject_name": subject["subject_name"],
+        "topics": subject["topics"]
+    } for subject in subjects['subjects']], per_subject=True)
+    # Create the project (you may decide how to set the project name and description)
+    db_project = models.Project(
+        name=payload["name"],  # You can modify how the name is determined
+        description=payload["description"],
+        skill_assessment_quiz=json.dumps(quiz_data)
+    )
+    db.add(db_project)
+    db.flush()
+    
+    # Save subjects (and topics) to the database
+    for subject in subjects['subjects']:
+        db_subject = models.Subject(
+            name=subject["subject_name"],
+            topics=",".join(subject["topics"]),
+            project_id=db_project.id
+        )
+        db.add(db_subject)
+    # Not committed here: the job queue commits the project with the job's status
+    db.flush()
+    return {"project_id": db_project.id}
+
+@router.post("/", status_code=202, response_model=schemas.JobAccepted)
 async def create_project(
     projectName: Annotated[str, Form()],
     projectDescription: Annotated[str, Form()],
     file: UploadFile = File(...),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
     current_user: models.User = Depends(auth.get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db),
+    _: None = Depends(require_llm_available)
 ):
+    """
+    Queue project creation as a background job.
+    Poll GET /api/jobs/{job_id}; on success the result holds the new project_id.
+    """
     # Only allow admin users to create projects
     if current_user.user_type != models.UserType.ADMIN:
         raise HTTPException(
@@ -28,57 +73,38 @@ async def create_project(
             detail="Only admin users can create projects"
         )
     
-    try:
-        # Read the file contents
-        contents = await file.read()
-        content_str = contents.decode("utf-8")
+    # Read the file contents
+    contents = await file.read()
+    content_str = contents.decode("utf-8")
 
-        # Determine file type and parse dependencies
-        if file.filename.endswith('.txt'):
-            dependencies = parse_requirements(content_str)
-        elif file.filename.endswith('.json'):
-            dependencies = parse_package_json(content_str)
-        else:
-            raise HTTPException(
-                status_code=400,
-                detail="Unsupported file type. Please upload a requirements.txt or package.json file."
-            )
-        
-        # Call your LLM function (or a helper) that analyzes dependencies
-        # and returns a list of subjects and topics.
-        subjects = generate_subjects_from_dependencies(dependencies)
-        
-        # Optionally, generate quiz questions based on the subjects/topics.
-        quiz_data = generate_assignment_questions([{
-            "subject_name": subject["subject_name"],
-            "topics": subject["topics"]
-        } for subject in subjects['subjects']])
-        # Create the project (you may decide how to set the project name and description)
-        db_project = models.Project(
-            name=projectName,  # You can modify how the name is determined
-            description=projectDescription,
-            skill_assessment_quiz=json.dumps(quiz_data)
+    # Determine file type and parse dependencies
+    if file.filename.endswith('.txt'):
+        dependencies = parse_requirements(content_str)
+    elif file.filename.endswith('.json'):
+        dependencies = parse_package_json(content_str)
+    else:
+        raise HTTPException(
+            status_code=400,
+            detail="Unsupported file type. Please upload a requirements.txt or package.json file."
         )
-        # print("quiz_data----------------------------------------------------------",quiz_data)
-        db.add(db_project)
-        db.commit()
-        db.refresh(db_project)
-        
-        # Save subjects (and topics) to the database
-        for subject in subjects['subjects']:
-            db_subject = models.Subject(
-                name=subject["subject_name"],
-                topics=",".join(subject["topics"]),
-                project_id=db_project.id
-            )
-            # print("db_subject----------------------------------------------------------",db_subject)
-            db.add(db_subject)
-        db.commit()
-        db.refresh(db_project)
-        return db_project
+
+    try:
+        # The job queue works on sync sessions, so it is handed the one behind this AsyncSession
+        job = await db.run_sync(
+            submit_job,
+            "create_project",
+            {
+                "name": projectName,
+                "description": projectDescription,
+                "dependencies": dependencies
+            },
+            user_id=current_user.id,
+            idempotency_key=idempotency_key
+        )
+        return accepted_response(job)
 
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=500,
             detail=f"Failed to create project: {str(e)}"
@@ -86,7 +112,7 @@ async def create_project(
 
 
 @router.post("/old")
-async def create_project_old(
+def create_project_old(
     project: schemas.ProjectCreate,
     current_user: models.User = Depends(auth.get_current_active_user),
     db: Session = Depends(get_db)
@@ -159,33 +185,16 @@ def get_project_completion_stats(
     current_user: models.User = Depends(auth.get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """Get completion statistics for all projects"""
-    # Get all projects
-    projects = db.query(models.Project).all()
-    result = []
-    
-    for project in projects:
-        # Get all learning paths for this project
-        learning_paths = db.query(models.LearningPath).filter(
-            models.LearningPath.project_id == project.id
-        ).all()
-        
-        # Calculate completion rate for this project
-        if learning_paths:
-            total_completion = 0
-            for path in learning_paths:
-                if path.total_topics > 0:
-                    completion_rate = (path.completed_topics / path.total_topics) * 100
-                    total_completion += completion_rate
-            
-            avg_completion = total_completion / len(learning_paths) if learning_paths else 0
-        else:
-            avg_completion = 0
-        
-        result.append({
-            "id": project.id,
-            "name": project.name,
-            "completionRate": round(avg_completion, 1)
-        })
-    
-    return result
+    """
+    Get completion statistics for all projects: the average completion of each
+    project's learning paths, computed in the database with one row per project.
+    """
+    if project_stats.PROJECT_STATS_MATERIALIZED:
+        query = project_stats.materialized_stats_query(db)
+    else:
+        query = project_stats.completion_stats_query(db)
+
+    return [
+        {"id": project_id, "name": name, "completionRate": round(completion_rate or 0, 1)}
+        for project_id, name, completion_rate in query
+    ]
@@ -6,25 +6,44 @@ import models
 import schemas
 import auth
 from database import get_db
-from utils.llm_utils import generate_toic_quiz
+from utils.llm_utils import generate_toic_quiz, stream_topic_quiz
+from utils.sse import sse_response
+from routers.llm import require_llm_available
 
 router = APIRouter(tags=["skill assessments"])
 
 @router.post("/api/skill-assessment/topic-quiz/{topic}")
 def get_topic_quiz(
     topic: str,
+    bypass_cache: bool = False,
     current_user: models.User = Depends(auth.get_current_active_user),
 ):
-    """Generate a quiz for a specific topic"""
+    """Generate a quiz for a specific topic, served from the LLM cache unless bypass_cache is set"""
     try:
-        quiz_data = generate_toic_quiz(topic)
+        quiz_data = generate_toic_quiz(topic, bypass_cache=bypass_cache)
         return quiz_data
+    except HTTPException:
+        # Re-raise HTTP exceptions, including 503 while the LLM circuit is open
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Error generating quiz: {str(e)}"
         )
 
+@router.post("/api/skill-assessment/topic-quiz/{topic}/stream")
+def stream_topic_quiz_events(
+    topic: str,
+    bypass_cache: bool = False,
+    current_user: models.User = Depends(auth.get_current_active_user),
+    _: None = Depends(require_llm_available),
+):
+    """
+    Stream a quiz for a specific topic as Server-Sent Events:
+    one "question" event per generated question, then a "done" event with the whole quiz.
+    """
+    return sse_response(stream_topic_quiz(topic, bypass_cache=bypass_cache))
+
 
 
 @router.get("/api/skill-assessment/quiz")
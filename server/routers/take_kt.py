@@ -1,11 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload, contains_eager
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
 from datetime import datetime
 import models
 import schemas
 import auth
-from database import get_db
+from database import get_async_db
+from utils.pagination import cursor_page
 
 router = APIRouter(prefix="/api/take_kt", tags=["take_kt"])
 
@@ -13,7 +16,7 @@ router = APIRouter(prefix="/api/take_kt", tags=["take_kt"])
 async def create_take_kt_session(
     take_kt_data: schemas.TakeKTCreate,
     current_user: models.User = Depends(auth.get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create a new Take KT session entry"""
     # Check if user is admin
@@ -24,19 +27,21 @@ async def create_take_kt_session(
         )
     
     # Check if project exists
-    project = db.query(models.Project).filter(models.Project.id == take_kt_data.project_id).first()
+    project = await db.get(models.Project, take_kt_data.project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
     # Check if employee exists
-    employee = db.query(models.User).filter(models.User.email == take_kt_data.email).first()
+    employee = (await db.execute(
+        select(models.User).filter(models.User.email == take_kt_data.email)
+    )).scalars().first()
     if not employee:
         raise HTTPException(status_code=404, detail="Employee not found")
     
     # Check if employee already has a Take KT session assigned
-    existing_session = db.query(models.TakeKt).filter(
+    existing_session = (await db.execute(select(models.TakeKt).filter(
         models.TakeKt.employee_id == employee.id
-    ).first()
+    ))).scalars().first()
     
     if existing_session:
         raise HTTPException(
@@ -45,10 +50,10 @@ async def create_take_kt_session(
         )
     
     # Check if there's a KtInfo entry for this project with status "Pending"
-    kt_info = db.query(models.KtInfo).filter(
+    kt_info = (await db.execute(select(models.KtInfo).filter(
         models.KtInfo.project_id == take_kt_data.project_id,
         # models.KtInfo.employee_id == employee.id
-    ).first()
+    ))).scalars().first()
     
     status = "Kt not created"
     kt_info_id = None
@@ -66,8 +71,8 @@ async def create_take_kt_session(
             status=status
         )
         db.add(take_kt_session)
-        db.commit()
-        db.refresh(take_kt_session)
+        await db.commit()
+        await db.refresh(take_kt_session)
         
         return {
             "message": "Take KT session created successfully",
@@ -75,55 +80,53 @@ async def create_take_kt_session(
         }
         
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=500,
             detail=f"Failed to create Take KT session: {str(e)}"
         )
 
-@router.get("/", response_model=List[dict])
+@router.get("/", response_model=List[schemas.TakeKTSessionSummary], response_model_exclude_none=True)
 async def list_take_kt_sessions(
+    response: Response,
+    cursor: Optional[int] = Query(None, ge=0, description="Id of the last session of the previous page"),
+    limit: Optional[int] = Query(None, ge=1, le=1000),
     current_user: models.User = Depends(auth.get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """List all Take KT sessions"""
+    """
+    List all Take KT sessions, paged by session id with cursor and limit
+    (X-Next-Cursor holds the next cursor). Sessions whose project no longer exists are left out.
+    """
+    # Project and employee are loaded in the same query as the sessions
+    query = (
+        select(models.TakeKt)
+        .join(models.TakeKt.project)
+        .options(contains_eager(models.TakeKt.project), joinedload(models.TakeKt.employee))
+    )
     
     # Different implementation based on user type
-    if current_user.user_type == models.UserType.ADMIN:
-        # Admin view - get all Take KT sessions
-        take_kt_sessions = db.query(models.TakeKt).all()
-    else:
+    if current_user.user_type != models.UserType.ADMIN:
         # Employee view - get only their Take KT sessions
-        take_kt_sessions = db.query(models.TakeKt).filter(
-            models.TakeKt.employee_id == current_user.id
-        ).all()
-    
-    sessions_parsed = []
+        query = query.filter(models.TakeKt.employee_id == current_user.id)
+    take_kt_sessions = await cursor_page(db, query, models.TakeKt.id, response, cursor=cursor, limit=limit)
     
-    for kt in take_kt_sessions:
-        session = {}
-        project = db.query(models.Project).filter(models.Project.id == kt.project_id).first()
-        
-        if project:
-            session["project_name"] = project.name
-            session["project_id"] = project.id
-            
-            employee = db.query(models.User).filter(models.User.id == kt.employee_id).first()
-            if employee:
-                session["employee_email"] = employee.email
-                
-            session["status"] = kt.status
-            session["take_kt_id"] = kt.id
-            
-            sessions_parsed.append(session)
-    
-    return sessions_parsed
+    return [
+        {
+            "project_name": kt.project.name,
+            "project_id": kt.project.id,
+            "employee_email": kt.employee.email if kt.employee else None,
+            "status": kt.status,
+            "take_kt_id": kt.id
+        }
+        for kt in take_kt_sessions
+    ]
 
 @router.delete("/{take_kt_id}", response_model=dict)
 async def delete_take_kt_session(
     take_kt_id: int,
     current_user: models.User = Depends(auth.get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Delete a Take KT session by ID"""
     # Check if user is admin
@@ -134,21 +137,21 @@ async def delete_take_kt_session(
         )
     
     # Check if Take KT session exists
-    take_kt_session = db.query(models.TakeKt).filter(models.TakeKt.id == take_kt_id).first()
+    take_kt_session = await db.get(models.TakeKt, take_kt_id)
     if not take_kt_session:
         raise HTTPException(status_code=404, detail="Take KT session not found")
     
     try:
         # Delete the Take KT session
-        db.delete(take_kt_session)
-        db.commit()
+        await db.delete(take_kt_session)
+        await db.commit()
         
         return {
             "message": f"Successfully deleted Take KT session with ID {take_kt_id}"
         }
         
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=500,
             detail=f"Failed to delete Take KT session: {str(e)}"
@@ -1,11 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
 from datetime import datetime
 import models
 import schemas
 import auth
-from database import get_db
+from database import get_async_db
+from utils.pagination import cursor_page
 
 router = APIRouter(prefix="/api/take_github_kt", tags=["take_github_kt"])
 
@@ -13,7 +16,7 @@ router = APIRouter(prefix="/api/take_github_kt", tags=["take_github_kt"])
 async def create_take_kt_session(
     take_kt_data: schemas.TakeKtNewCreate,
     current_user: models.User = Depends(auth.get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create a new Take KT session for GitHub commits"""
     # Check if user is admin
@@ -24,23 +27,23 @@ async def create_take_kt_session(
         )
     
     # Check if the GitHub commit exists
-    give_kt = db.query(models.GiveKtNew).filter(
-        models.GiveKtNew.id == take_kt_data.give_kt_new_id
-    ).first()
+    give_kt = await db.get(models.GiveKtNew, take_kt_data.give_kt_new_id)
     
     if not give_kt:
         raise HTTPException(status_code=404, detail="GitHub commit information not found")
     
     # Check if employee exists
-    employee = db.query(models.User).filter(models.User.email == take_kt_data.email).first()
+    employee = (await db.execute(
+        select(models.User).filter(models.User.email == take_kt_data.email)
+    )).scalars().first()
     if not employee:
         raise HTTPException(status_code=404, detail="Employee not found")
     
     # Check if employee already has a Take KT session assigned for this GitHub commit
-    existing_session = db.query(models.TakeKtNew).filter(
+    existing_session = (await db.execute(select(models.TakeKtNew).filter(
         models.TakeKtNew.employee_id == employee.id,
         models.TakeKtNew.give_kt_new_id == take_kt_data.give_kt_new_id
-    ).first()
+    ))).scalars().first()
     
     if existing_session:
         raise HTTPException(
@@ -49,9 +52,9 @@ async def create_take_kt_session(
         )
     
     # Check if there's a KtInfoNew entry for this GitHub commit
-    kt_info = db.query(models.KtInfoNew).filter(
+    kt_info = (await db.execute(select(models.KtInfoNew).filter(
         models.KtInfoNew.give_kt_new_id == take_kt_data.give_kt_new_id
-    ).first()
+    ))).scalars().first()
     
     status = "Kt not created"
     kt_info_id = None
@@ -68,8 +71,8 @@ async def create_take_kt_session(
             status=status
         )
         db.add(take_kt_session)
-        db.commit()
-        db.refresh(take_kt_session)
+        await db.commit()
+        await db.refresh(take_kt_session)
         
         return {
             "message": "Take KT session created successfully",
@@ -77,48 +80,46 @@ async def create_take_kt_session(
         }
         
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=500,
             detail=f"Failed to create Take KT session: {str(e)}"
         )
 
-@router.get("/", response_model=List[dict])
+@router.get("/", response_model=List[schemas.TakeKtNewSessionSummary], response_model_exclude_none=True)
 async def list_take_kt_sessions(
+    response: Response,
+    cursor: Optional[int] = Query(None, ge=0, description="Id of the last session of the previous page"),
+    limit: Optional[int] = Query(None, ge=1, le=1000),
     current_user: models.User = Depends(auth.get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """List all Take KT sessions for GitHub commits"""
+    """
+    List all Take KT sessions for GitHub commits, paged by session id with
+    cursor and limit (X-Next-Cursor holds the next cursor)
+    """
+    # Commit information and employee are loaded in the same query as the sessions
+    query = select(models.TakeKtNew).options(
+        joinedload(models.TakeKtNew.give_kt_new),
+        joinedload(models.TakeKtNew.employee)
+    )
     
     # Different implementation based on user type
-    if current_user.user_type == models.UserType.ADMIN:
-        # Admin view - get all Take KT sessions
-        take_kt_sessions = db.query(models.TakeKtNew).all()
-    else:
+    if current_user.user_type != models.UserType.ADMIN:
         # Employee view - get only their Take KT sessions
-        take_kt_sessions = db.query(models.TakeKtNew).filter(
-            models.TakeKtNew.employee_id == current_user.id
-        ).all()
+        query = query.filter(models.TakeKtNew.employee_id == current_user.id)
+    take_kt_sessions = await cursor_page(db, query, models.TakeKtNew.id, response, cursor=cursor, limit=limit)
     
     sessions_parsed = []
-    
     for kt in take_kt_sessions:
         session = {}
-        
-        # Get commit information
-        give_kt = db.query(models.GiveKtNew).filter(models.GiveKtNew.id == kt.give_kt_new_id).first()
-        if give_kt:
-            session["repo_url"] = give_kt.repo_url
-            session["username"] = give_kt.username
-        
-        # Get employee information
-        emp = db.query(models.User).filter(models.User.id == kt.employee_id).first()
-        if emp:
-            session["employee_email"] = emp.email
-        
+        if kt.give_kt_new:
+            session["repo_url"] = kt.give_kt_new.repo_url
+            session["username"] = kt.give_kt_new.username
+        if kt.employee:
+            session["employee_email"] = kt.employee.email
         session["status"] = kt.status
         session["take_kt_id"] = kt.id
-        
         sessions_parsed.append(session)
     
     return sessions_parsed
@@ -127,7 +128,7 @@ async def list_take_kt_sessions(
 async def delete_take_kt_session(
     take_kt_id: int,
     current_user: models.User = Depends(auth.get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Delete a Take KT session for GitHub commits by ID"""
     # Check if user is admin
@@ -138,21 +139,21 @@ async def delete_take_kt_session(
         )
     
     # Check if Take KT session exists
-    take_kt_session = db.query(models.TakeKtNew).filter(models.TakeKtNew.id == take_kt_id).first()
+    take_kt_session = await db.get(models.TakeKtNew, take_kt_id)
     if not take_kt_session:
         raise HTTPException(status_code=404, detail="Take KT session not found")
     
     try:
         # Delete the Take KT session
-        db.delete(take_kt_session)
-        db.commit()
+        await db.delete(take_kt_session)
+        await db.commit()
         
         return {
             "message": f"Successfully deleted Take KT session with ID {take_kt_id}"
         }
         
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=500,
             detail=f"Failed to delete Take KT session: {str(e)}"
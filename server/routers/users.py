@@ -1,6 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import and_, or_, asc, desc, case, func
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Literal, Optional
 
 import models
 import schemas
@@ -13,63 +14,110 @@ router = APIRouter(prefix="/api/users", tags=["users"])
 def read_users_me(current_user: models.User = Depends(auth.get_current_active_user)):
     return current_user
 
+def employee_progress_query(db: Session):
+    """
+    One query for every employee with their assigned project and the progress of
+    their latest learning path on it: employee ⟕ project ⟕ latest learning path.
+    """
+    latest_path = (
+        db.query(
+            models.LearningPath.user_id,
+            models.LearningPath.project_id,
+            func.max(models.LearningPath.id).label("id")
+        )
+        .group_by(models.LearningPath.user_id, models.LearningPath.project_id)
+        .subquery()
+    )
+    progress = case(
+        (models.LearningPath.total_topics > 0,
+         models.LearningPath.completed_topics * 100.0 / models.LearningPath.total_topics),
+        else_=0.0
+    ).label("progress")
+    query = (
+        db.query(
+            models.User.id,
+            models.User.email,
+            models.User.username,
+            models.Project.id.label("project_id"),
+            models.Project.name.label("project_name"),
+            progress,
+            models.LearningPath.updated_at.label("last_activity"),
+            func.count().over().label("total")
+        )
+        .outerjoin(models.Project, models.Project.id == models.User.assigned_project_id)
+        .outerjoin(
+            latest_path,
+            and_(latest_path.c.user_id == models.User.id, latest_path.c.project_id == models.Project.id)
+        )
+        .outerjoin(models.LearningPath, models.LearningPath.id == latest_path.c.id)
+        .filter(models.User.user_type == models.UserType.EMPLOYEE)
+    )
+    return query, progress
+
 @router.get("/employees", response_model=list[schemas.EmployeeWithProgress])
 def list_employees(
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Page size; all employees when omitted"),
+    search: Optional[str] = Query(None, description="Matches part of the employee's name or email"),
+    project_id: Optional[int] = Query(None, description="Only employees assigned to this project"),
+    sort_by: Literal["id", "name", "email", "progress", "last_activity"] = "id",
+    order: Literal["asc", "desc"] = "asc",
     current_user: models.User = Depends(auth.get_current_active_user),
     db: Session = Depends(get_db)
 ):
+    """List employees with their project progress. The total before paging is sent in X-Total-Count."""
     if current_user.user_type != models.UserType.ADMIN:
         raise HTTPException(
             status_code=403,
             detail="Only admin users can view employee list"
         )
-    
-    # Get all non-admin users
-    employees = db.query(models.User).filter(
-        models.User.user_type == models.UserType.EMPLOYEE
-    ).all()
-    
-    # Prepare employee list with progress data
+
+    query, progress = employee_progress_query(db)
+    if search:
+        pattern = f"%{search}%"
+        query = query.filter(or_(models.User.username.ilike(pattern), models.User.email.ilike(pattern)))
+    if project_id is not None:
+        query = query.filter(models.User.assigned_project_id == project_id)
+
+    sort_column = {
+        "id": models.User.id,
+        "name": models.User.username,
+        "email": models.User.email,
+        "progress": progress,
+        "last_activity": models.LearningPath.updated_at,
+    }[sort_by]
+    direction = desc if order == "desc" else asc
+    # Employee id breaks ties so pages are stable
+    query = query.order_by(direction(sort_column), direction(models.User.id))
+    rows = query.offset(skip).limit(limit).all()
+
+    if rows:
+        total = rows[0].total
+    else:
+        # Past the last page the window count is not available
+        total = query.with_entities(func.count()).order_by(None).scalar() if skip else 0
+    response.headers["X-Total-Count"] = str(total)
+
     employee_list = []
-    for employee in employees:
-        # Calculate actual progress based on learning paths
-        progress = 0.0
+    for row in rows:
         assigned_projects = []
-        last_activity = None
-        
-        # Get the employee's assigned project
-        if employee.assigned_project_id:
-            project = db.query(models.Project).filter(models.Project.id == employee.assigned_project_id).first()
-            if project:
-                # Get the employee's learning path for this project
-                learning_path = db.query(models.LearningPath).filter(
-                    models.LearningPath.user_id == employee.id,
-                    models.LearningPath.project_id == project.id
-                ).first()
-                
-                if learning_path:
-                    # Calculate progress percentage
-                    if learning_path.total_topics > 0:
-                        progress = (learning_path.completed_topics / learning_path.total_topics) * 100
-                    last_activity = learning_path.updated_at
-                
-                assigned_projects.append({
-                    "id": project.id,
-                    "name": project.name,
-                    "progress": progress,
-                    "last_activity": last_activity
-                })
-        
-        employee_data = schemas.EmployeeWithProgress(
-            id=employee.id,
-            email=employee.email,
-            name=employee.username,  # Using username as name for now
-            progress=progress,
+        if row.project_id is not None:
+            assigned_projects.append({
+                "id": row.project_id,
+                "name": row.project_name,
+                "progress": row.progress,
+                "last_activity": row.last_activity
+            })
+        employee_list.append(schemas.EmployeeWithProgress(
+            id=row.id,
+            email=row.email,
+            name=row.username,  # Using username as name for now
+            progress=row.progress,
             assigned_projects=assigned_projects,
-            last_activity=last_activity
-        )
-        employee_list.append(employee_data)
-    
+            last_activity=row.last_activity
+        ))
+
     return employee_list
 
 @router.post("/assign-project")
@@ -1,7 +1,7 @@
 import array
 from pydantic import BaseModel, EmailStr, field_validator, validator, Field
 from typing import Optional, List, Dict
-from models import UserType
+from models import UserType, JobStatus
 from datetime import datetime
 from enum import Enum
 
@@ -107,6 +107,7 @@ class LearningPathCreate(LearningPathBase):
 
 class LearningPath(LearningPathBase):
     id: int
+    version: int = 1
     created_at: datetime
     updated_at: Optional[datetime] = None
 
@@ -143,6 +144,11 @@ class LearningPathUpdate(BaseModel):
     total_topics: Optional[int] = None
     completed_topics: Optional[int] = None
 
+class LearningPathProgress(BaseModel):
+    """Topic counters of a learning path"""
+    total_topics: int
+    completed_topics: int
+
 class ProjectCompletionStats(BaseModel):
     """Schema for project completion statistics"""
     id: int
@@ -206,6 +212,21 @@ class TakeKTCreate(BaseModel):
             }
         }
 
+class GiveKTSessionSummary(BaseModel):
+    """Schema for a KT session in the KT session listing; project fields are left out when the project no longer exists"""
+    project_name: Optional[str] = None
+    project_id: Optional[int] = None
+    employee_email: Optional[str] = None
+    status: str
+
+class TakeKTSessionSummary(BaseModel):
+    """Schema for a Take KT session in the Take KT session listing"""
+    take_kt_id: int
+    project_name: str
+    project_id: int
+    employee_email: Optional[str] = None
+    status: str
+
 # GitHub Commit-based Knowledge Transfer Schemas
 class GitHubCommitInfoBase(BaseModel):
     """Base schema for GitHub Commit information"""
@@ -274,6 +295,23 @@ class TakeKtNew(BaseModel):
     class Config:
         from_attributes = True
 
+class GiveKtNewSessionSummary(BaseModel):
+    """Schema for a GitHub KT session in the GitHub KT session listing (admins get give_kt_new_id, employees id)"""
+    give_kt_new_id: Optional[int] = None
+    id: Optional[int] = None
+    repo_url: str
+    username: str
+    employee_email: Optional[str] = None
+    status: str
+
+class TakeKtNewSessionSummary(BaseModel):
+    """Schema for a Take KT session in the GitHub Take KT session listing"""
+    take_kt_id: int
+    repo_url: Optional[str] = None
+    username: Optional[str] = None
+    employee_email: Optional[str] = None
+    status: Optional[str] = None
+
 class PendingKTGitHubDetails(BaseModel):
     """Schema for detailed GitHub information in pending KT assignments"""
     github_commit_id: int
@@ -285,3 +323,24 @@ class PendingKTGitHubDetails(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class Job(BaseModel):
+    """Schema for background job status"""
+    id: int
+    job_type: str
+    status: JobStatus
+    result: Optional[str] = None  # JSON string
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class JobAccepted(BaseModel):
+    """Schema returned when a request has been queued as a background job"""
+    job_id: int
+    status: JobStatus
+    status_url: str
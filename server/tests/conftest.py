@@ -1,9 +1,13 @@
 import pytest
+import asyncio
+import json
+import aiosqlite
 from fastapi.testclient import TestClient
 from fastapi import FastAPI
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import StaticPool, NullPool
 
 import sys
 import os
@@ -12,12 +16,19 @@ from pathlib import Path
 # Add server directory to sys.path
 sys.path.append(str(Path(__file__).parent.parent))
 
-from database import Base, get_db
+import database
+from database import Base, get_db, get_async_db, async_database_url
 from models import User, UserType, Project, Subject, LearningPath
 import auth as auth_utils
+from utils.llm_cache import llm_cache
+from utils.commit_cache import commit_cache
+from utils import job_queue
+from utils import llm_client
+from utils.llm_governor import LLMGovernor
+from utils.circuit_breaker import CircuitBreaker
 
 # Import routers directly instead of the main app
-from routers import auth, users, projects, learning_paths, skill_assessments, livekit, give_kt, take_kt
+from routers import auth, users, projects, learning_paths, skill_assessments, livekit, give_kt, take_kt, give_kt_new, take_kt_new, jobs, llm
 
 # Create a test app without the static files
 def create_test_app():
@@ -33,31 +44,97 @@ def create_test_app():
     app.include_router(livekit.router)
     app.include_router(give_kt.router)
     app.include_router(take_kt.router)
+    app.include_router(give_kt_new.router)
+    app.include_router(take_kt_new.router)
+    app.include_router(jobs.router)
+    app.include_router(llm.router)
     
     return app
 
 # Get the test app
 app = create_test_app()
 
-# Use in-memory SQLite for testing
-SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+# Use in-memory SQLite for testing; TEST_DATABASE_URL runs the suite against another
+# database instead, e.g. postgresql://postgres@localhost/learnpro_test (its tables are dropped after each test)
+SQLALCHEMY_DATABASE_URL = os.getenv("TEST_DATABASE_URL", "sqlite:///:memory:")
+
+@pytest.fixture(autouse=True)
+def isolated_llm_cache(tmp_path, monkeypatch):
+    """Point the LLM response cache at a fresh database for each test"""
+    monkeypatch.setattr(llm_cache, "path", str(tmp_path / "llm_cache.db"))
+
+@pytest.fixture(autouse=True)
+def isolated_commit_cache(tmp_path, monkeypatch):
+    """Point the GitHub commit cache at a fresh database for each test"""
+    monkeypatch.setattr(commit_cache, "path", str(tmp_path / "commit_cache.db"))
+
+@pytest.fixture(autouse=True)
+def unthrottled_llm_governor(monkeypatch):
+    """Give each test a fresh LLM governor without rate budgets"""
+    governor = LLMGovernor(max_concurrency=16, requests_per_minute=0, tokens_per_minute=0)
+    monkeypatch.setattr(llm_client, "governor", governor)
+    return governor
+
+@pytest.fixture(autouse=True)
+def llm_circuit_breaker(monkeypatch):
+    """Give each test a closed LLM circuit breaker"""
+    breaker = CircuitBreaker("Groq API", failure_threshold=5, recovery_timeout=30)
+    monkeypatch.setattr(llm_client, "breaker", breaker)
+    return breaker
 
 @pytest.fixture(scope="function")
 def test_db_engine():
     """Create a SQLAlchemy engine for testing - fresh for each test"""
-    engine = create_engine(
-        SQLALCHEMY_DATABASE_URL,
-        connect_args={"check_same_thread": False},
-        poolclass=StaticPool,
-    )
+    if SQLALCHEMY_DATABASE_URL.startswith("sqlite"):
+        engine = create_engine(
+            SQLALCHEMY_DATABASE_URL,
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool,
+        )
+    else:
+        engine = create_engine(SQLALCHEMY_DATABASE_URL)
     Base.metadata.create_all(bind=engine)
     yield engine
-    Base.metadata.drop_all(bind=engine)
+    # An in-memory database goes away with its connection
+    if ":memory:" not in SQLALCHEMY_DATABASE_URL:
+        Base.metadata.drop_all(bind=engine)
+    engine.dispose()
+
+@pytest.fixture
+def test_async_engine(test_db_engine):
+    """Async engine on the same database as test_db_engine"""
+    if ":memory:" in SQLALCHEMY_DATABASE_URL:
+        # The in-memory database only exists in test_db_engine's connection, so the
+        # async driver is handed that connection. Returning it to the pool must not
+        # roll back work the sync test session has not committed yet.
+        pooled = test_db_engine.raw_connection()
+        connection = pooled.driver_connection
+        pooled.close()
+
+        async def connect():
+            return await aiosqlite.Connection(lambda: connection, 64)
+
+        engine = create_async_engine(
+            "sqlite+aiosqlite://", async_creator=connect, poolclass=StaticPool, pool_reset_on_return=None
+        )
+    else:
+        # Each TestClient and asyncio.run() call has its own event loop, which
+        # asyncpg connections cannot outlive, so connections are not pooled
+        engine = create_async_engine(async_database_url(SQLALCHEMY_DATABASE_URL), poolclass=NullPool)
+    yield engine
+    asyncio.run(engine.dispose())
 
 @pytest.fixture
-def db_session(test_db_engine):
-    """Create a SQLAlchemy session for testing"""
+def db_session(test_db_engine, test_async_engine, monkeypatch):
+    """
+    Create a SQLAlchemy session for testing. It is closed before the async
+    engine, which owns the in-memory database's connection once it is disposed.
+    """
     TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=test_db_engine)
+    # Run background jobs inline against the test database
+    job_queue.configure(session_factory=TestingSessionLocal, workers=0)
+    # Sessions opened outside a request, e.g. by streamed responses, use the test database too
+    monkeypatch.setattr(database, "SessionLocal", TestingSessionLocal)
     session = TestingSessionLocal()
     try:
         yield session
@@ -66,7 +143,29 @@ def db_session(test_db_engine):
         session.close()
 
 @pytest.fixture
-def client(db_session):
+def async_session_factory(test_async_engine):
+    """Async sessions on the test database, configured like database.AsyncSessionLocal"""
+    return async_sessionmaker(test_async_engine, autoflush=False, expire_on_commit=False)
+
+@pytest.fixture
+def count_queries(test_db_engine, test_async_engine):
+    """Return a function that calls fn() and returns its result with the number of SQL statements it ran"""
+    engines = [test_db_engine, test_async_engine.sync_engine]
+    def run(fn):
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        for engine in engines:
+            event.listen(engine, "before_cursor_execute", listener)
+        try:
+            result = fn()
+        finally:
+            for engine in engines:
+                event.remove(engine, "before_cursor_execute", listener)
+        return result, len(statements)
+    return run
+
+@pytest.fixture
+def client(db_session, async_session_factory):
     """Create a FastAPI TestClient with the test database"""
     def _get_test_db():
         try:
@@ -74,8 +173,13 @@ def client(db_session):
         finally:
             pass
 
-    # Override the get_db dependency
+    async def _get_test_async_db():
+        async with async_session_factory() as session:
+            yield session
+
+    # Override the get_db and get_async_db dependencies
     app.dependency_overrides[get_db] = _get_test_db
+    app.dependency_overrides[get_async_db] = _get_test_async_db
     
     with TestClient(app) as client:
         yield client
@@ -214,7 +318,7 @@ def sample_learning_path(db_session, sample_project, employee_token):
     learning_path = LearningPath(
         user_id=user_id,
         project_id=project_id,
-        learning_path=str(learning_path_json),
+        learning_path=json.dumps(learning_path_json),
         total_topics=2,
         completed_topics=0
     )
@@ -230,3 +334,32 @@ def sample_learning_path(db_session, sample_project, employee_token):
         "total_topics": learning_path.total_topics,
         "completed_topics": learning_path.completed_topics
     }
+
+@pytest.fixture
+def legacy_learning_path(db_session, sample_project, employee_token):
+    """A learning path still stored as one JSON document, as before the subject and topic rows existed"""
+    document = {
+        "path_name": "Legacy Learning Path",
+        "subjects": [
+            {
+                "subject_name": "Subject 1",
+                "is_completed": "false",
+                "is_started": "true",
+                "topics": [
+                    {"topic_name": "Topic A", "is_completed": "true"},
+                    {"topic_name": "Topic B", "is_completed": "false"}
+                ]
+            }
+        ]
+    }
+    # Written to the column directly, bypassing the setter that splits it into rows
+    learning_path = LearningPath(
+        user_id=employee_token["user_id"],
+        project_id=sample_project["id"],
+        details=json.dumps(document),
+        total_topics=2,
+        completed_topics=1
+    )
+    db_session.add(learning_path)
+    db_session.commit()
+    return {"id": learning_path.id, "user_id": learning_path.user_id, "document": document}
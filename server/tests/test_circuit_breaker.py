@@ -0,0 +1,142 @@
+"""
+Tests for the LLM circuit breaker
+"""
+
+import pytest
+import time
+import io
+import requests
+from fastapi import status
+from unittest.mock import patch, MagicMock
+
+import sys
+from pathlib import Path
+
+# Make sure we can import from server directory
+sys.path.append(str(Path(__file__).parent.parent))
+
+from utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+from utils.llm_client import chat_completion, reset_session, RetryPolicy
+
+
+def test_breaker_opens_after_threshold():
+    """Test that consecutive failures open the circuit and a success resets the count"""
+    breaker = CircuitBreaker("test", failure_threshold=3, recovery_timeout=30)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.before_call()  # still closed
+
+    breaker.record_failure()
+    with pytest.raises(CircuitOpenError) as exc_info:
+        breaker.before_call()
+    assert exc_info.value.status_code == 503
+    assert exc_info.value.headers["Retry-After"] == "30"
+    assert breaker.snapshot()["state"] == "open"
+
+
+def test_half_open_allows_a_single_probe():
+    """Test that after the recovery timeout one probe goes through and decides the state"""
+    breaker = CircuitBreaker("test", failure_threshold=1, recovery_timeout=0.1, half_open_max_calls=1)
+    breaker.record_failure("boom")
+    time.sleep(0.15)
+    assert breaker.snapshot()["state"] == "half_open"
+
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()  # the probe is still in flight
+
+    # A failed probe opens the circuit again
+    breaker.record_failure("still down")
+    assert breaker.snapshot()["state"] == "open"
+    assert breaker.snapshot()["last_error"] == "still down"
+
+    time.sleep(0.15)
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.snapshot()["state"] == "closed"
+
+
+def test_cancelled_probe_frees_the_slot():
+    """Test that a probe that never reached the provider does not block later probes"""
+    breaker = CircuitBreaker("test", failure_threshold=1, recovery_timeout=0)
+    breaker.record_failure()
+    breaker.before_call()
+    breaker.cancel_call()
+    breaker.before_call()
+
+
+@patch('utils.llm_client.requests.Session.post')
+def test_client_fails_fast_while_open(mock_post, monkeypatch, llm_circuit_breaker):
+    """Test that once the provider keeps failing, calls stop reaching it"""
+    monkeypatch.setenv("GROQ_API_KEY", "test-key")
+    reset_session()
+    llm_circuit_breaker.failure_threshold = 2
+    mock_post.side_effect = requests.exceptions.ConnectionError("connection refused")
+    policy = RetryPolicy(max_attempts=2, backoff_base=0)
+
+    with pytest.raises(requests.exceptions.ConnectionError):
+        chat_completion("prompt", retry_policy=policy)
+    assert mock_post.call_count == 2
+
+    with pytest.raises(CircuitOpenError):
+        chat_completion("prompt", retry_policy=policy)
+    assert mock_post.call_count == 2
+    reset_session()
+
+
+@patch('utils.llm_client.requests.Session.post')
+def test_rate_limits_do_not_trip_the_breaker(mock_post, monkeypatch, llm_circuit_breaker):
+    """Test that 4xx answers, including 429, count as the provider being up"""
+    monkeypatch.setenv("GROQ_API_KEY", "test-key")
+    reset_session()
+    llm_circuit_breaker.failure_threshold = 1
+    mock_post.return_value = MagicMock(status_code=429, headers={})
+    mock_post.return_value.raise_for_status.side_effect = requests.exceptions.HTTPError("429")
+
+    with pytest.raises(requests.exceptions.HTTPError):
+        chat_completion("prompt", retry_policy=RetryPolicy(max_attempts=1))
+    assert llm_circuit_breaker.snapshot()["state"] == "closed"
+    reset_session()
+
+
+def test_topic_quiz_returns_503_while_open(client, employee_token, llm_circuit_breaker):
+    """Test that endpoints answer 503 with Retry-After instead of waiting on the provider"""
+    for _ in range(llm_circuit_breaker.failure_threshold):
+        llm_circuit_breaker.record_failure("HTTP 503")
+
+    response = client.post("/api/skill-assessment/topic-quiz/Python", headers=employee_token)
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert int(response.headers["retry-after"]) > 0
+
+
+def test_project_creation_is_rejected_while_open(client, admin_token, llm_circuit_breaker, db_session):
+    """Test that no job is queued while the circuit is open"""
+    for _ in range(llm_circuit_breaker.failure_threshold):
+        llm_circuit_breaker.record_failure("HTTP 503")
+
+    response = client.post(
+        "/api/projects/",
+        headers=admin_token,
+        data={"projectName": "Project", "projectDescription": "Description"},
+        files={"file": ("requirements.txt", io.BytesIO(b"fastapi==0.68.0"), "text/plain")}
+    )
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert "retry-after" in response.headers
+
+
+def test_health_endpoint(client, llm_circuit_breaker):
+    """Test that the health endpoint reports the breaker state"""
+    response = client.get("/api/llm/health")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["status"] == "ok"
+    assert response.json()["circuit"]["state"] == "closed"
+
+    for _ in range(llm_circuit_breaker.failure_threshold):
+        llm_circuit_breaker.record_failure("HTTP 502")
+    body = client.get("/api/llm/health").json()
+    assert body["status"] == "unavailable"
+    assert body["circuit"]["last_error"] == "HTTP 502"
+    assert body["circuit"]["retry_after_seconds"] > 0
@@ -0,0 +1,159 @@
+"""
+Tests for the persistent, incremental GitHub commit cache
+"""
+
+import pytest
+from unittest.mock import MagicMock
+
+import sys
+from pathlib import Path
+
+# Make sure we can import from server directory
+sys.path.append(str(Path(__file__).parent.parent))
+
+from utils.commit_cache import get_commits_info_cached, commit_cache
+
+
+class FakeGitHubRepo:
+    """Stands in for a PyGithub repository, answering commit listings with ETags like the REST API"""
+
+    def __init__(self, commits):
+        self.full_name = "Team/Payments"
+        self.url = "https://api.github.com/repos/Team/Payments"
+        self.commits = list(commits)  # newest first
+        self.listings = 0
+        self.not_modified = 0
+        self.detail_requests = []
+        self.failing = set()
+        self.requester = MagicMock()
+        self.requester.requestJsonAndCheck.side_effect = self.list_commits
+
+    def push(self, sha, message):
+        self.commits.insert(0, (sha, message))
+
+    def etag(self, per_page):
+        return f'W/"{self.commits[0][0]}-{per_page}"'
+
+    def list_commits(self, verb, url, parameters=None, headers=None):
+        assert url == f"{self.url}/commits"
+        per_page = parameters["per_page"]
+        self.listings += 1
+        if (headers or {}).get("If-None-Match") == self.etag(per_page):
+            self.not_modified += 1
+            return {"etag": self.etag(per_page)}, None
+        listing = [{"sha": sha, "commit": {"message": message}} for sha, message in self.commits[:per_page]]
+        return {"etag": self.etag(per_page)}, listing
+
+    def get_commit(self, sha):
+        self.detail_requests.append(sha)
+        if sha in self.failing:
+            raise Exception("502 Bad Gateway")
+        changed = MagicMock()
+        changed.filename = f"{sha}.py"
+        changed.changes = 25
+        detailed = MagicMock()
+        detailed.files = [changed]
+        return detailed
+
+
+@pytest.fixture
+def repo(monkeypatch):
+    monkeypatch.setenv("COMMIT_DEPTH", "3")
+    return FakeGitHubRepo([("c3", "Add refunds"), ("c2", "Add payments API"), ("c1", "Initial commit")])
+
+
+def test_first_run_fetches_and_stores_commits(repo):
+    """Test that a first run returns the REST structure and records the sync state"""
+    result = get_commits_info_cached(repo, "alice")
+    assert [commit["sha"] for commit in result["commits"]] == ["c3", "c2", "c1"]
+    assert result["commits"][0] == {"sha": "c3", "message": "Add refunds", "files": [{"filename": "c3.py", "lines_changed": 25}]}
+    assert sorted(repo.detail_requests) == ["c1", "c2", "c3"]
+
+    state = commit_cache.get_sync_state("team/payments", "alice")
+    assert state["last_seen_sha"] == "c3"
+    assert state["etag"] == repo.etag(3)
+
+
+def test_unchanged_repository_costs_only_a_conditional_request(repo):
+    """Test that a repeated request is answered from the cache after a 304"""
+    first = get_commits_info_cached(repo, "alice")
+    repo.detail_requests.clear()
+
+    second = get_commits_info_cached(repo, "Alice")
+    assert second == first
+    assert repo.not_modified == 1
+    assert repo.detail_requests == []
+    headers = repo.requester.requestJsonAndCheck.call_args.kwargs["headers"]
+    assert headers == {"If-None-Match": repo.etag(3)}
+
+
+class LazyFakeGitHubRepo(FakeGitHubRepo):
+    """A repository from get_repo(..., lazy=True): reading its attributes would fetch it with GET /repos/..."""
+
+    def __init__(self, commits):
+        super().__init__(commits)
+        self.repo_requests = 0
+
+    @property
+    def full_name(self):
+        self.repo_requests += 1
+        return "Team/Payments"
+
+    @full_name.setter
+    def full_name(self, value):
+        pass
+
+
+def test_not_modified_listing_makes_no_other_request(monkeypatch):
+    """Test that a 304 listing on a lazy repository is the only request made"""
+    monkeypatch.setenv("COMMIT_DEPTH", "3")
+    repo = LazyFakeGitHubRepo([("c3", "Add refunds"), ("c2", "Add payments API"), ("c1", "Initial commit")])
+    get_commits_info_cached(repo, "alice")
+    repo.requester.requestJsonAndCheck.reset_mock()
+    repo.detail_requests.clear()
+
+    get_commits_info_cached(repo, "alice")
+    assert repo.not_modified == 1
+    assert repo.requester.requestJsonAndCheck.call_count == 1
+    assert repo.detail_requests == []
+    assert repo.repo_requests == 0
+
+
+def test_only_new_commits_are_fetched(repo):
+    """Test that after new pushes only the commits above the last seen one are fetched"""
+    get_commits_info_cached(repo, "alice")
+    repo.detail_requests.clear()
+    repo.push("c4", "Add invoices")
+    repo.push("c5", "Fix invoice totals")
+
+    result = get_commits_info_cached(repo, "alice")
+    assert [commit["sha"] for commit in result["commits"]] == ["c5", "c4", "c3"]
+    assert sorted(repo.detail_requests) == ["c4", "c5"]
+    assert commit_cache.get_sync_state("team/payments", "alice")["last_seen_sha"] == "c5"
+
+
+def test_failed_commit_details_are_retried_next_run(repo):
+    """Test that a commit whose details failed is not cached and the ETag is not kept"""
+    repo.failing = {"c2"}
+    result = get_commits_info_cached(repo, "alice")
+    assert result["commits"][1] == {"sha": "c2", "message": "Add payments API", "files": []}
+    assert commit_cache.get_sync_state("team/payments", "alice")["etag"] is None
+
+    repo.failing = set()
+    repo.detail_requests.clear()
+    result = get_commits_info_cached(repo, "alice")
+    assert repo.detail_requests == ["c2"]
+    assert result["commits"][1]["files"] == [{"filename": "c2.py", "lines_changed": 25}]
+
+
+def test_raising_commit_depth_fetches_older_commits(repo, monkeypatch):
+    """Test that a deeper listing is not answered from the shallower cached one"""
+    repo.commits.append(("c0", "Project skeleton"))
+    get_commits_info_cached(repo, "alice")
+    repo.detail_requests.clear()
+
+    monkeypatch.setenv("COMMIT_DEPTH", "4")
+    result = get_commits_info_cached(repo, "alice")
+    assert repo.not_modified == 0
+    assert repo.detail_requests == ["c0"]
+    assert [commit["sha"] for commit in result["commits"]] == ["c3", "c2", "c1", "c0"]
@@ -0,0 +1,142 @@
+"""
+Tests for the database engine factory, the SQLite tuning profile and the portable column types
+"""
+
+import json
+import asyncio
+import inspect
+import pytest
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import text
+from sqlalchemy.pool import QueuePool
+
+import sys
+from pathlib import Path
+
+# Make sure we can import from server directory
+sys.path.append(str(Path(__file__).parent.parent))
+
+import database
+from database import create_db_engine, create_async_db_engine, async_database_url
+from models import Project
+
+
+def pragmas(engine):
+    with engine.connect() as conn:
+        return {
+            name: conn.execute(text(f"PRAGMA {name}")).scalar()
+            for name in ("journal_mode", "synchronous", "busy_timeout", "cache_size", "foreign_keys")
+        }
+
+
+def test_tuned_sqlite_engine_applies_profile(tmp_path):
+    """Test that every pooled connection gets WAL and the other pragmas"""
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'app.db'}", tuned=True, pool_size=3, max_overflow=2)
+    assert isinstance(engine.pool, QueuePool)
+    assert engine.pool.size() == 3
+
+    assert pragmas(engine) == {
+        "journal_mode": "wal",
+        "synchronous": 1,  # NORMAL
+        "busy_timeout": database.SQLITE_BUSY_TIMEOUT_MS,
+        "cache_size": -database.SQLITE_CACHE_SIZE_KB,
+        "foreign_keys": 0,
+    }
+    engine.dispose()
+
+
+def test_untuned_sqlite_engine_keeps_defaults(tmp_path):
+    """Test that SQLITE_TUNED=false leaves SQLite's rollback journal in place"""
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'app.db'}", tuned=False)
+    assert pragmas(engine)["journal_mode"] == "delete"
+    engine.dispose()
+
+
+def test_foreign_keys_can_be_enabled(tmp_path, monkeypatch):
+    """Test that SQLITE_FOREIGN_KEYS turns on foreign key enforcement"""
+    monkeypatch.setattr(database, "SQLITE_FOREIGN_KEYS", True)
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'app.db'}", tuned=True)
+    assert pragmas(engine)["foreign_keys"] == 1
+    engine.dispose()
+
+
+def test_async_database_url_uses_asyncio_drivers():
+    """Test that the async engine URL keeps the database and swaps in the asyncio driver"""
+    assert async_database_url("sqlite:///./app.db") == "sqlite+aiosqlite:///./app.db"
+    assert async_database_url("postgresql+psycopg://learnpro:s%40fe@db:5432/learnpro") == (
+        "postgresql+asyncpg://learnpro:s%40fe@db:5432/learnpro"
+    )
+    with pytest.raises(ValueError):
+        async_database_url("mysql://learnpro@db/learnpro")
+
+
+def test_async_sqlite_engine_applies_profile(tmp_path):
+    """Test that the async engine opens SQLite connections with the same profile"""
+    engine = create_async_db_engine(f"sqlite:///{tmp_path / 'app.db'}", tuned=True, pool_size=2)
+
+    async def read_pragmas():
+        async with engine.connect() as conn:
+            journal_mode = (await conn.execute(text("PRAGMA journal_mode"))).scalar()
+            busy_timeout = (await conn.execute(text("PRAGMA busy_timeout"))).scalar()
+        await engine.dispose()
+        return journal_mode, busy_timeout
+
+    assert asyncio.run(read_pragmas()) == ("wal", database.SQLITE_BUSY_TIMEOUT_MS)
+
+
+def test_server_engine_recycles_and_pings_connections():
+    """Test that engines for a database server replace stale pooled connections"""
+    engine = create_db_engine("postgresql://learnpro@localhost/learnpro", pool_size=4, max_overflow=1)
+    assert engine.pool.size() == 4
+    assert engine.pool._recycle == database.DB_POOL_RECYCLE
+    assert engine.pool._pre_ping
+    engine.dispose()
+
+
+def test_timestamps_are_stored_and_read_in_utc(db_session):
+    """Test that naive and offset timestamps both come back as aware UTC datetimes"""
+    naive = Project(name="Naive", description="", updated_at=datetime(2024, 1, 1, 12, 0))
+    offset = Project(name="Offset", description="",
+                     updated_at=datetime(2024, 1, 1, 12, 0, tzinfo=timezone(timedelta(hours=5, minutes=30))))
+    db_session.add_all([naive, offset])
+    db_session.commit()
+    db_session.expire_all()
+
+    assert naive.updated_at == datetime(2024, 1, 1, 12, 0, tzinfo=timezone.utc)
+    assert offset.updated_at == datetime(2024, 1, 1, 6, 30, tzinfo=timezone.utc)
+    assert naive.created_at.tzinfo == timezone.utc
+
+
+def test_json_columns_round_trip(db_session):
+    """Test that JSON columns read back the stored document, and text that is not JSON as is"""
+    quiz = {"questions": [{"question": "What is a join?", "options": ["a", "b"], "answer": "a"}]}
+    with_json = Project(name="JSON", description="", skill_assessment_quiz=json.dumps(quiz))
+    with_text = Project(name="Text", description="", skill_assessment_quiz="not json")
+    db_session.add_all([with_json, with_text])
+    db_session.commit()
+    db_session.expire_all()
+
+    assert json.loads(with_json.skill_assessment_quiz) == quiz
+    assert with_text.skill_assessment_quiz == "not json"
+    if db_session.bind.dialect.name == "postgresql":
+        assert db_session.execute(
+            text("SELECT jsonb_typeof(skill_assessment_quiz) FROM projects ORDER BY id")
+        ).scalars().all() == ["object", "string"]
+
+
+def test_async_endpoints_use_async_sessions():
+    """Test that no async def endpoint or dependency runs blocking queries on a sync session"""
+    from conftest import app
+
+    def blocking_dependencies(dependant):
+        for dependency in dependant.dependencies:
+            if dependency.call is database.get_db and inspect.iscoroutinefunction(dependant.call):
+                yield dependant.call.__qualname__
+            yield from blocking_dependencies(dependency)
+
+    offenders = [
+        name
+        for route in app.routes if hasattr(route, "dependant")
+        for name in blocking_dependencies(route.dependant)
+    ]
+    assert offenders == []
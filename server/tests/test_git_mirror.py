@@ -0,0 +1,230 @@
+"""
+Tests for the local git mirror commit backend, using a local bare repository as the remote
+"""
+
+import pytest
+import os
+import base64
+import shutil
+import subprocess
+from unittest.mock import patch, MagicMock
+
+import sys
+from pathlib import Path
+
+# Make sure we can import from server directory
+sys.path.append(str(Path(__file__).parent.parent))
+
+from utils.git_mirror import get_commits_info_from_mirror, mirror_path, parse_git_log, GitMirrorError
+from utils.github_utils import get_llm_usable_string, get_commits_info, get_author_emails
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="git is not installed")
+
+
+def git(cwd, *args, author="Alice Dev <alice@example.com>"):
+    name, email = author[:-1].split(" <")
+    env = {
+        **os.environ,
+        "GIT_AUTHOR_NAME": name, "GIT_AUTHOR_EMAIL": email,
+        "GIT_COMMITTER_NAME": name, "GIT_COMMITTER_EMAIL": email,
+    }
+    return subprocess.run(["git", *args], cwd=cwd, env=env, check=True, capture_output=True, text=True).stdout
+
+
+def commit_file(workdir, filename, lines, message, author="Alice Dev <alice@example.com>"):
+    path = workdir / filename
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("".join(f"line {index}\n" for index in range(lines)))
+    git(workdir, "add", filename)
+    git(workdir, "commit", "-q", "-m", message, author=author)
+    git(workdir, "push", "-q", "origin", "HEAD:main")
+
+
+@pytest.fixture
+def remote(tmp_path):
+    """A bare repository standing in for GitHub, and a working clone that pushes to it"""
+    bare = tmp_path / "remote.git"
+    subprocess.run(["git", "init", "-q", "--bare", "--initial-branch=main", str(bare)], check=True)
+    workdir = tmp_path / "work"
+    subprocess.run(["git", "clone", "-q", str(bare), str(workdir)], check=True, capture_output=True)
+    git(workdir, "checkout", "-q", "-b", "main")
+    commit_file(workdir, "api/payments.py", 30, "Add payments API\n\nHandles card payments.")
+    commit_file(workdir, "web/app.js", 12, "Add checkout page", author="Bob Other <bob@example.com>")
+    commit_file(workdir, "api/refunds.py", 15, "Add refunds")
+    return bare.as_uri(), workdir
+
+
+def test_mirror_matches_get_commits_info_structure(remote, tmp_path, monkeypatch):
+    """Test that the mirror returns the author's commits newest first in the REST structure"""
+    monkeypatch.setenv("COMMIT_DEPTH", "5")
+    url, _ = remote
+    result = get_commits_info_from_mirror(
+        url, "alice", mirror_dir=str(tmp_path / "mirrors"), emails={"alice@example.com"}
+    )
+
+    assert [commit["message"] for commit in result["commits"]] == [
+        "Add refunds", "Add payments API\n\nHandles card payments."
+    ]
+    assert result["commits"][0]["files"] == [{"filename": "api/refunds.py", "lines_changed": 15}]
+    assert result["commits"][1]["files"] == [{"filename": "api/payments.py", "lines_changed": 30}]
+    assert len(result["commits"][0]["sha"]) == 40
+    assert "api/refunds.py (15 lines changed)" in get_llm_usable_string(result)
+
+
+def test_mirror_is_reused_and_fetched_incrementally(remote, tmp_path, monkeypatch):
+    """Test that a second run fetches new commits into the existing mirror instead of cloning"""
+    monkeypatch.setenv("COMMIT_DEPTH", "1")
+    url, workdir = remote
+    mirrors = str(tmp_path / "mirrors")
+    first = get_commits_info_from_mirror(url, "alice@example.com", mirror_dir=mirrors)
+    assert first["commits"][0]["message"] == "Add refunds"
+
+    commit_file(workdir, "api/refunds.py", 40, "Rewrite refunds")
+    with patch("utils.git_mirror.subprocess.run", wraps=subprocess.run) as run:
+        second = get_commits_info_from_mirror(url, "alice@example.com", mirror_dir=mirrors)
+    commands = [call.args[0] for call in run.call_args_list]
+    assert not any("clone" in command for command in commands)
+    assert any("fetch" in command for command in commands)
+
+    assert second["commits"][0]["message"] == "Rewrite refunds"
+    # The file grew from 15 to 40 lines
+    assert second["commits"][0]["files"] == [{"filename": "api/refunds.py", "lines_changed": 25}]
+
+
+def test_token_is_not_passed_on_the_command_line(remote, tmp_path):
+    """Test that the token reaches git through its environment, never its argv"""
+    url, _ = remote
+    with patch("utils.git_mirror.subprocess.run", wraps=subprocess.run) as run:
+        get_commits_info_from_mirror(url, "alice@example.com", token="secret-token", mirror_dir=str(tmp_path / "mirrors"))
+        get_commits_info_from_mirror(url, "alice@example.com", token="secret-token", mirror_dir=str(tmp_path / "mirrors"))
+
+    credentials = base64.b64encode(b"x-access-token:secret-token").decode()
+    for call in run.call_args_list:
+        argv = " ".join(call.args[0])
+        assert "secret-token" not in argv
+        assert credentials not in argv
+    authenticated = [call for call in run.call_args_list if "GIT_CONFIG_VALUE_0" in call.kwargs["env"]]
+    # The first run clones and the second fetches, both authenticated
+    assert [("clone" in call.args[0], "fetch" in call.args[0]) for call in authenticated] == [(True, False), (False, True)]
+    assert all(
+        call.kwargs["env"]["GIT_CONFIG_VALUE_0"] == f"Authorization: Basic {credentials}" for call in authenticated
+    )
+
+
+def test_unknown_repository_leaves_no_mirror(tmp_path):
+    """Test that a failed clone raises and does not leave a broken mirror behind"""
+    url = (tmp_path / "missing.git").as_uri()
+    mirrors = str(tmp_path / "mirrors")
+    with pytest.raises(GitMirrorError):
+        get_commits_info_from_mirror(url, "alice", mirror_dir=mirrors)
+    assert not os.path.exists(mirror_path(url, mirrors))
+
+
+def test_parse_git_log_handles_binary_files():
+    """Test that binary files, reported as "-" by numstat, count zero lines"""
+    output = "\x1eabc123\x1fAdd logo\n\x1f\n\n-\t-\tassets/logo.png\n3\t1\tREADME.md\n"
+    assert parse_git_log(output) == {"commits": [{
+        "sha": "abc123",
+        "message": "Add logo",
+        "files": [
+            {"filename": "assets/logo.png", "lines_changed": 0},
+            {"filename": "README.md", "lines_changed": 4},
+        ]
+    }]}
+
+
+# Emails GitHub would attribute to each login
+LOGIN_EMAILS = {"alice": {"alice@example.com", "alice@work.example"}}
+
+
+class LocalGitHubRepo:
+    """Answers the GitHub API calls of both commit backends from a local clone, attributing commits to logins by email"""
+
+    def __init__(self, workdir):
+        self.workdir = workdir
+        self.url = "https://api.github.com/repos/team/payments"
+        self.requester = MagicMock()
+        self.requester.requestJsonAndCheck.side_effect = self.list_commits_json
+
+    def authored(self, author):
+        output = git(self.workdir, "log", "--format=%H%x1f%ae%x1f%B%x1e", "main")
+        commits = []
+        for record in output.split("\x1e"):
+            if not record.strip():
+                continue
+            sha, email, message = record.strip("\n").split("\x1f", 2)
+            if email.lower() in LOGIN_EMAILS.get(author, {author}):
+                commits.append((sha, email, message.strip()))
+        return commits
+
+    def list_commits_json(self, verb, url, parameters=None, headers=None):
+        listing = [
+            {"sha": sha, "commit": {"message": message, "author": {"email": email}}}
+            for sha, email, message in self.authored(parameters["author"])
+        ]
+        return {}, listing[:parameters["per_page"]]
+
+    def get_commits(self, author):
+        for sha, _, message in self.authored(author):
+            commit = MagicMock()
+            commit.sha = sha
+            commit.commit.message = message
+            yield commit
+
+    def get_commit(self, sha):
+        # GitHub reports a merge's changes against its first parent
+        output = git(self.workdir, "show", "--numstat", "--format=", "--diff-merges=first-parent", sha)
+        files = []
+        for line in output.splitlines():
+            if line.strip():
+                added, deleted, filename = line.split("\t", 2)
+                changed = MagicMock()
+                changed.filename = filename
+                changed.changes = int(added) + int(deleted)
+                files.append(changed)
+        detailed = MagicMock()
+        detailed.files = files
+        return detailed
+
+
+@pytest.fixture
+def shared_history(remote):
+    """The remote plus commits under a second email, by a lookalike author, and a merge"""
+    url, workdir = remote
+    git(workdir, "checkout", "-q", "-b", "feature")
+    (workdir / "api" / "invoices.py").write_text("".join(f"line {index}\n" for index in range(20)))
+    git(workdir, "add", "api/invoices.py")
+    git(workdir, "commit", "-q", "-m", "Add invoices")
+    git(workdir, "checkout", "-q", "main")
+    commit_file(workdir, "web/app.js", 18, "Restyle checkout", author="Sal Ali <sal@example.com>")
+    git(workdir, "merge", "-q", "--no-ff", "-m", "Merge invoices", "feature")
+    git(workdir, "push", "-q", "origin", "HEAD:main")
+    commit_file(workdir, "api/tax.py", 8, "Add tax rules", author="Alice Dev <alice@work.example>")
+    return url, workdir
+
+
+def test_mirror_and_api_return_the_same_commits(shared_history, tmp_path, monkeypatch):
+    """Test that both backends select the same commits, merges included, for a login"""
+    monkeypatch.setenv("COMMIT_DEPTH", "10")
+    url, workdir = shared_history
+    github_repo = LocalGitHubRepo(workdir)
+
+    from_api = get_commits_info(github_repo, "alice")
+    from_mirror = get_commits_info_from_mirror(
+        url, "alice", mirror_dir=str(tmp_path / "mirrors"), emails=get_author_emails(github_repo, "alice")
+    )
+    assert from_mirror == from_api
+    assert [commit["message"] for commit in from_mirror["commits"]] == [
+        "Add tax rules", "Merge invoices", "Add invoices", "Add refunds", "Add payments API\n\nHandles card payments."
+    ]
+    assert from_mirror["commits"][1]["files"] == [{"filename": "api/invoices.py", "lines_changed": 20}]
+
+
+def test_login_is_not_matched_as_a_substring(shared_history, tmp_path, monkeypatch):
+    """Test that a login only matches whole emails or author names"""
+    monkeypatch.setenv("COMMIT_DEPTH", "10")
+    url, _ = shared_history
+    mirrors = str(tmp_path / "mirrors")
+    assert get_commits_info_from_mirror(url, "al", mirror_dir=mirrors) == {"commits": []}
+    result = get_commits_info_from_mirror(url, "sal@example.com", mirror_dir=mirrors)
+    assert [commit["message"] for commit in result["commits"]] == ["Restyle checkout"]
@@ -0,0 +1,98 @@
+"""
+Tests for the lazily built, token-rotating GitHub client pool
+"""
+
+import pytest
+from fastapi import status
+from unittest.mock import patch, MagicMock
+
+import sys
+from pathlib import Path
+
+# Make sure we can import from server directory
+sys.path.append(str(Path(__file__).parent.parent))
+
+from utils.github_client import GitHubClientPool, GitHubNotConfiguredError, github_clients
+
+
+@pytest.fixture
+def no_github_tokens(monkeypatch):
+    monkeypatch.delenv("GITHUB_TOKEN", raising=False)
+    monkeypatch.delenv("GITHUB_TOKENS", raising=False)
+    github_clients.reset()
+    yield
+    github_clients.reset()
+
+
+def test_pool_is_built_on_first_use(monkeypatch):
+    """Test that clients are only created when first requested, from GITHUB_TOKENS"""
+    monkeypatch.setenv("GITHUB_TOKENS", "token-a, token-b")
+    pool = GitHubClientPool()
+    with patch("github.Github") as mock_github:
+        mock_github.return_value.requester.rate_limiting = (-1, -1)
+        assert mock_github.call_count == 0
+        pool.get_client()
+        pool.get_client()
+    assert mock_github.call_count == 2
+
+
+def test_missing_tokens_fail_the_request_not_startup(no_github_tokens):
+    """Test that an unconfigured pool raises a 503 only when a client is needed"""
+    pool = GitHubClientPool()
+    with pytest.raises(GitHubNotConfiguredError) as error:
+        pool.get_client()
+    assert error.value.status_code == 503
+
+
+def test_client_with_most_rate_limit_left_is_used():
+    """Test that requests rotate to the token with the most remaining rate limit"""
+    pool = GitHubClientPool(tokens=["token-a", "token-b", "token-c"])
+    first = pool.get_client()
+    # Tokens GitHub has not reported on yet count as full
+    first.requester.rate_limiting = (4999, 5000)
+    second = pool.get_client()
+    assert second is not first
+    second.requester.rate_limiting = (100, 5000)
+    third = pool.get_client()
+    assert third not in (first, second)
+    third.requester.rate_limiting = (3000, 5000)
+
+    assert pool.get_client() is first
+    assert pool.get_token() == "token-a"
+    first.requester.rate_limiting = (10, 5000)
+    assert pool.get_token() == "token-c"
+
+
+def test_commits_endpoint_without_github_configured(client, employee_token, no_github_tokens):
+    """Test that GitHub KT answers 503 when no token is configured while the rest of the app works"""
+    response = client.post("/api/give_github_kt/commits", json={
+        "repo_url": "https://github.com/team/payments",
+        "username": "alice",
+        "employee_id": int(employee_token["user_id"])
+    })
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert response.json()["detail"] == "GitHub integration is not configured"
+
+
+@patch('routers.give_kt_new.get_commits_info_cached')
+@patch('routers.give_kt_new.get_github_client')
+def test_commits_endpoint_uses_pooled_client(mock_get_github_client, mock_get_commits, client, employee_token):
+    """Test that the commits endpoint gets its client from the pool and stores the filtered commits"""
+    gh = MagicMock()
+    mock_get_github_client.return_value = gh
+    mock_get_commits.return_value = {"commits": [
+        {"sha": "1", "message": "Add payments API", "files": [
+            {"filename": "api/payments.py", "lines_changed": 120},
+            {"filename": "package-lock.json", "lines_changed": 900},
+        ]}
+    ]}
+
+    response = client.post("/api/give_github_kt/commits", json={
+        "repo_url": "https://github.com/team/payments",
+        "username": "alice",
+        "employee_id": int(employee_token["user_id"])
+    })
+    assert response.status_code == status.HTTP_200_OK
+    gh.get_repo.assert_called_once_with("team/payments", lazy=True)
+    assert "api/payments.py (120 lines changed)" in response.json()["commit_info"]
+    assert "package-lock.json" not in response.json()["commit_info"]
@@ -4,9 +4,13 @@ Tests for the GitHub utilities and related functionality
 
 import pytest
 import json
+import threading
+import time
 from unittest.mock import patch, MagicMock
+from github import RateLimitExceededException
 from fastapi import status
-from utils.github_utils import extract_owner_repo, get_commits_info, get_llm_usable_string
+from utils.github_utils import extract_owner_repo, get_commits_info, get_llm_usable_string, filter_commits, CommitFilter
+from utils.token_budget import count_tokens
 
 # Test data for commits
 MOCK_REPO_URL = "https://github.com/user/repo"
@@ -66,8 +70,7 @@ def test_extract_owner_repo():
     assert owner is None
     assert repo is None
 
-@patch('utils.github_utils.Github')
-def test_get_commits_info(mock_github):
+def test_get_commits_info():
     """Test retrieving commit information from GitHub"""
     # Set up mocks
     mock_file1 = MagicMock()
@@ -142,8 +145,8 @@ def test_get_llm_usable_string():
     assert "" in lines
 
 @patch('routers.give_kt_new.extract_owner_repo')
-@patch('routers.give_kt_new.Github')
-def test_github_integration_in_give_kt_new(mock_github, mock_extract_owner_repo, client, admin_token):
+@patch('routers.give_kt_new.get_github_client')
+def test_github_integration_in_give_kt_new(mock_get_github_client, mock_extract_owner_repo, client, admin_token):
     """Test GitHub integration in the give-kt-new API"""
     # Set up the mocks
     mock_extract_owner_repo.return_value = ("user", "repo")
@@ -151,7 +154,7 @@ def test_github_integration_in_give_kt_new(mock_github, mock_extract_owner_repo,
     mock_repo = MagicMock()
     mock_github_instance = MagicMock()
     mock_github_instance.get_repo.return_value = mock_repo
-    mock_github.return_value = mock_github_instance
+    mock_get_github_client.return_value = mock_github_instance
     
     # Mock get_commits_info to return our test data
     with patch('routers.give_kt_new.get_commits_info', return_value=MOCK_COMMITS_DATA):
@@ -184,3 +187,150 @@ def test_github_integration_in_give_kt_new(mock_github, mock_extract_owner_repo,
     else:
         # Other errors might indicate issues with our test
         assert False, f"Unexpected status code {response.status_code}: {response.text}"
+
+def test_commit_summary_drops_smallest_files_first():
+    """Test that an over-budget commit summary leaves out the smallest changes"""
+    commits = {"commits": [
+        {"message": "Add billing", "files": [
+            {"filename": f"billing/module_{index}.py", "lines_changed": index} for index in range(1, 41)
+        ]},
+    ]}
+    full = get_llm_usable_string(commits, token_budget=100000)
+    assert "billing/module_1.py" in full
+
+    budgeted = get_llm_usable_string(commits, token_budget=150)
+    assert count_tokens(budgeted) <= 150
+    assert "billing/module_40.py (40 lines changed)" in budgeted
+    assert "billing/module_1.py" not in budgeted
+    assert "smaller files omitted" in budgeted
+
+def test_commit_summary_drops_oldest_commits_last():
+    """Test that older commits are left out once every file line has been dropped"""
+    commits = {"commits": [
+        {"message": f"Commit number {index} " + "detail " * 20, "files": [{"filename": "app.py", "lines_changed": 1}]}
+        for index in range(30)
+    ]}
+    budgeted = get_llm_usable_string(commits, token_budget=200)
+    assert count_tokens(budgeted) <= 200
+    assert "Commit number 0 " in budgeted
+    assert "Commit number 29 " not in budgeted
+    assert "older commits omitted" in budgeted
+
+def test_filter_commits_applies_default_rules():
+    """Test that small changes, lockfiles, vendored code and unused commits are dropped locally"""
+    commits = {"commits": [
+        {"sha": "1", "message": "Add payments API", "files": [
+            {"filename": "api/payments.py", "lines_changed": 120},
+            {"filename": "api/__init__.py", "lines_changed": 2},
+            {"filename": "package-lock.json", "lines_changed": 900},
+            {"filename": "web/vendor/chart.js", "lines_changed": 400},
+            {"filename": "proto/payments_pb2.py", "lines_changed": 300},
+        ]},
+        {"sha": "2", "message": "Experiment that will not be used", "files": [
+            {"filename": "experiments/try.py", "lines_changed": 50},
+        ]},
+        {"sha": "3", "message": "Merge pull request #4 from team/payments", "files": [
+            {"filename": "api/payments.py", "lines_changed": 120},
+        ]},
+        {"sha": "4", "message": "Fix typo", "files": [
+            {"filename": "README.md", "lines_changed": 1},
+        ]},
+    ]}
+
+    with patch('utils.llm_utils.groq_calling_function_string') as mock_llm:
+        result = filter_commits(commits)
+    mock_llm.assert_not_called()
+
+    assert [commit["sha"] for commit in result["commits"]] == ["1"]
+    assert result["commits"][0]["files"] == [{"filename": "api/payments.py", "lines_changed": 120}]
+    # The input is left untouched
+    assert len(commits["commits"][0]["files"]) == 5
+
+def test_commit_filter_is_configurable():
+    """Test custom thresholds, path globs and message patterns"""
+    commit_filter = CommitFilter(min_lines_changed=3, excluded_paths=["*.md"], excluded_messages=[r"\[skip kt\]"])
+    result = filter_commits(MOCK_COMMITS_DATA, commit_filter)
+    assert [file["filename"] for file in result["commits"][0]["files"]] == ["file1.py", "file2.py"]
+    assert result["commits"][1]["files"] == [{"filename": "file3.py", "lines_changed": 3}]
+
+    skipped = {"commits": [{"message": "Docs [SKIP KT]", "files": [{"filename": "app.py", "lines_changed": 50}]}]}
+    assert filter_commits(skipped, commit_filter) == {"commits": []}
+
+    summary = get_llm_usable_string(filter_commits(MOCK_COMMITS_DATA))
+    assert "file1.py (10 lines changed)" in summary
+    assert "file2.py" not in summary
+    assert "Fixed bug Y" not in summary
+
+def make_slow_repo(count, delay=0.1, failing=()):
+    """Mock repo whose get_commit takes delay seconds and raises for the shas in failing"""
+    commits = []
+    for index in range(count):
+        commit = MagicMock()
+        commit.sha = f"sha{index}"
+        commit.commit.message = f"Commit {index}"
+        commits.append(commit)
+
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def get_commit(sha):
+        with lock:
+            active.append(sha)
+            peak.append(len(active))
+        time.sleep(delay * (count - int(sha[3:])) / count)
+        with lock:
+            active.remove(sha)
+        if sha in failing:
+            raise Exception("502 Bad Gateway")
+        changed = MagicMock()
+        changed.filename = f"{sha}.py"
+        changed.changes = 20
+        detailed = MagicMock()
+        detailed.files = [changed]
+        return detailed
+
+    repo = MagicMock()
+    repo.get_commits.return_value = commits
+    repo.get_commit.side_effect = get_commit
+    return repo, peak
+
+def test_get_commits_info_fetches_concurrently_in_order(monkeypatch):
+    """Test that commit details are fetched by a bounded pool and returned in commit order"""
+    monkeypatch.setenv("COMMIT_DEPTH", "8")
+    repo, peak = make_slow_repo(8)
+    with patch('utils.github_utils.GITHUB_FETCH_CONCURRENCY', 4):
+        result = get_commits_info(repo, "username")
+
+    assert [commit["sha"] for commit in result["commits"]] == [f"sha{index}" for index in range(8)]
+    assert result["commits"][3]["files"] == [{"filename": "sha3.py", "lines_changed": 20}]
+    assert 1 < max(peak) <= 4
+
+def test_get_commits_info_survives_partial_failures(monkeypatch):
+    """Test that a commit whose details fail is kept without files"""
+    monkeypatch.setenv("COMMIT_DEPTH", "3")
+    repo, _ = make_slow_repo(3, delay=0, failing={"sha1"})
+    result = get_commits_info(repo, "username")
+    assert [len(commit["files"]) for commit in result["commits"]] == [1, 0, 1]
+
+    repo, _ = make_slow_repo(3, delay=0, failing={"sha0", "sha1", "sha2"})
+    with pytest.raises(Exception, match="every commit"):
+        get_commits_info(repo, "username")
+
+@patch('utils.github_utils.time.sleep')
+def test_get_commits_info_waits_out_rate_limits(mock_sleep, monkeypatch):
+    """Test that a secondary rate limit is retried after GitHub's Retry-After"""
+    monkeypatch.setenv("COMMIT_DEPTH", "1")
+    repo, _ = make_slow_repo(1, delay=0)
+    succeed = repo.get_commit.side_effect
+    responses = [RateLimitExceededException(403, {"message": "secondary rate limit"}, {"Retry-After": "2"})]
+
+    def get_commit(sha):
+        if responses:
+            raise responses.pop(0)
+        return succeed(sha)
+
+    repo.get_commit.side_effect = get_commit
+    result = get_commits_info(repo, "username")
+    assert result["commits"][0]["files"] == [{"filename": "sha0.py", "lines_changed": 20}]
+    assert mock_sleep.call_args_list[0].args == (2.0,)
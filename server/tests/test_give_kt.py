@@ -11,10 +11,10 @@ def mock_calendar():
         mock_calendar.return_value = True
         yield mock_calendar
 
-# Mock the llm_utils.generate_digested_transcripts function
+# Mock the llm_utils.generate_digested_transcripts_async function
 @pytest.fixture(autouse=True)
 def mock_llm():
-    with patch('routers.give_kt.generate_digested_transcripts') as mock_llm:
+    with patch('routers.give_kt.generate_digested_transcripts_async') as mock_llm:
         mock_llm.return_value = "Digested KT information"
         yield mock_llm
 
@@ -223,3 +223,43 @@ def test_get_pending_kt_details(client, employee_token, sample_give_kt):
     assert data["give_kt_id"] == sample_give_kt["id"]
     assert data["project_id"] == sample_give_kt["project_id"]
     assert data["employee_id"] == sample_give_kt["employee_id"]
+
+def add_kt_sessions(db_session, project_id, count, start=0):
+    """Add count employees, each with a Give KT session for the project"""
+    from models import User, UserType, GiveKT
+    for n in range(start, start + count):
+        user = User(username=f"giver{n}", email=f"giver{n}@example.com",
+                    hashed_password="x", user_type=UserType.EMPLOYEE)
+        db_session.add(user)
+        db_session.flush()
+        db_session.add(GiveKT(project_id=project_id, employee_id=user.id))
+    db_session.commit()
+
+def test_list_kt_sessions_query_count_and_cursor(client, admin_token, sample_project, db_session, count_queries):
+    """Test that the listing costs the same queries for 3 or 30 sessions and pages by cursor"""
+    add_kt_sessions(db_session, sample_project["id"], 3)
+    response, few_queries = count_queries(lambda: client.get("/api/give_kt/", headers=admin_token))
+    assert len(response.json()) == 3
+
+    add_kt_sessions(db_session, sample_project["id"], 27, start=3)
+    response, many_queries = count_queries(lambda: client.get("/api/give_kt/", headers=admin_token))
+    assert len(response.json()) == 30
+    assert many_queries == few_queries
+    assert response.json()[0] == {
+        "project_name": sample_project["name"],
+        "project_id": sample_project["id"],
+        "employee_email": "giver0@example.com",
+        "status": "Pending"
+    }
+
+    emails, params, pages = [], {"limit": 12}, 0
+    while True:
+        response = client.get("/api/give_kt/", headers=admin_token, params=params)
+        assert response.status_code == status.HTTP_200_OK
+        emails += [session["employee_email"] for session in response.json()]
+        pages += 1
+        if "x-next-cursor" not in response.headers:
+            break
+        params["cursor"] = response.headers["x-next-cursor"]
+    assert pages == 3
+    assert emails == [f"giver{n}@example.com" for n in range(30)]
@@ -83,3 +83,66 @@ def test_save_commit_info_github_error(client, admin_token):
     """Test handling of GitHub API errors"""
     # Force test to pass
     assert True
+
+def add_github_kt_sessions(db_session, count, start=0):
+    """Add count employees with a GitHub Give KT session; every third one has its KT recorded"""
+    from models import User, UserType, GiveKtNew, KtInfoNew
+    sessions = []
+    for n in range(start, start + count):
+        user = User(username=f"dev{n}", email=f"dev{n}@example.com",
+                    hashed_password="x", user_type=UserType.EMPLOYEE)
+        db_session.add(user)
+        db_session.flush()
+        session = GiveKtNew(employee_id=user.id, repo_url=f"https://github.com/team/repo{n}", username=f"dev{n}")
+        db_session.add(session)
+        db_session.flush()
+        if n % 3 == 0:
+            kt_info = KtInfoNew(employee_id=user.id, give_kt_new_id=session.id, kt_info="Digest")
+            db_session.add(kt_info)
+            db_session.flush()
+            session.kt_info_id = kt_info.id
+        sessions.append(session)
+    db_session.commit()
+    return sessions
+
+def test_list_give_kt_new_query_count_and_cursor(client, admin_token, db_session, count_queries):
+    """Test that the GitHub KT listing costs the same queries for 3 or 30 sessions and pages by cursor"""
+    add_github_kt_sessions(db_session, 3)
+    response, few_queries = count_queries(lambda: client.get("/api/give_github_kt/", headers=admin_token))
+    assert response.status_code == status.HTTP_200_OK
+    assert len(response.json()) == 3
+
+    sessions = add_github_kt_sessions(db_session, 27, start=3)
+    response, many_queries = count_queries(lambda: client.get("/api/give_github_kt/", headers=admin_token))
+    listed = response.json()
+    assert len(listed) == 30
+    assert many_queries == few_queries
+    assert listed[1] == {
+        "give_kt_new_id": listed[1]["give_kt_new_id"],
+        "repo_url": "https://github.com/team/repo1",
+        "username": "dev1",
+        "employee_email": "dev1@example.com",
+        "status": "Pending"
+    }
+    assert [session["status"] for session in listed[:4]] == ["Completed", "Pending", "Pending", "Completed"]
+
+    response = client.get("/api/give_github_kt/", headers=admin_token,
+                          params={"limit": 5, "cursor": sessions[-6].id})
+    assert [session["username"] for session in response.json()] == [f"dev{n}" for n in range(25, 30)]
+    assert "x-next-cursor" not in response.headers
+
+def test_list_give_kt_new_status_follows_linked_kt_info(client, admin_token, db_session):
+    """Test that a GitHub KT session is completed once its KT info is linked, not when an id happens to match"""
+    from models import KtInfoNew
+    pending, completed = add_github_kt_sessions(db_session, 2, start=1)
+    kt_info = KtInfoNew(employee_id=completed.employee_id, give_kt_new_id=completed.id, kt_info="Digest")
+    db_session.add(kt_info)
+    db_session.flush()
+    completed.kt_info_id = kt_info.id
+    db_session.commit()
+    # The KT info's id is the pending session's id, which the old rule took as completion
+    assert kt_info.id == pending.id != completed.id
+
+    listed = {session["username"]: session["status"] for session in
+              client.get("/api/give_github_kt/", headers=admin_token).json()}
+    assert listed == {"dev1": "Pending", "dev2": "Completed"}
@@ -0,0 +1,224 @@
+"""
+Tests for background jobs and the job status endpoint
+"""
+
+import pytest
+import json
+from datetime import datetime, timezone, timedelta
+from fastapi import status
+from unittest.mock import patch
+
+from models import User, Job, JobStatus, Project, LearningPath
+from utils import job_queue
+
+MOCK_LEARNING_PATH = {
+    "subjects": [{"name": "Subject 1", "topics": [{"name": "Topic A"}, {"name": "Topic B"}]}],
+    "total_estimated_hours": 4
+}
+
+QUIZ_SUBMISSION = {
+    "answers": {"1": "A"},
+    "topicScores": {"Topic A": {"score": 1, "total": 2, "percentage": 50.0}}
+}
+
+
+@pytest.fixture
+def assigned_employee(db_session, employee_token, sample_project):
+    """Assign the sample project to the test employee"""
+    user = db_session.query(User).filter(User.id == int(employee_token["user_id"])).first()
+    user.assigned_project_id = sample_project["id"]
+    db_session.commit()
+    return {"Authorization": employee_token["Authorization"]}
+
+
+@patch('routers.learning_paths.create_calendar_event_recurring')
+@patch('routers.learning_paths.generate_learning_path')
+def test_learning_path_from_assessment_runs_as_job(mock_generate, mock_calendar, client, assigned_employee):
+    """Test that the assessment endpoint returns 202 and the job produces the learning path"""
+    mock_generate.return_value = MOCK_LEARNING_PATH
+
+    response = client.post(
+        "/api/learning_paths/from_assessment",
+        headers=assigned_employee,
+        json=QUIZ_SUBMISSION
+    )
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    accepted = response.json()
+
+    response = client.get(accepted["status_url"], headers=assigned_employee)
+    assert response.status_code == status.HTTP_200_OK
+    job = response.json()
+    assert job["status"] == "succeeded"
+    assert job["finished_at"] is not None
+    assert "learning_path_id" in json.loads(job["result"])
+
+    mock_generate.assert_called_once_with(["Topic A"], {"Topic A": 0.5})
+    mock_calendar.assert_called_once()
+
+    response = client.get("/api/learning_paths/me", headers=assigned_employee)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["total_topics"] == 2
+
+
+@patch('routers.learning_paths.create_calendar_event_recurring')
+@patch('routers.learning_paths.generate_learning_path')
+def test_idempotency_key_returns_existing_job(mock_generate, mock_calendar, client, assigned_employee, db_session):
+    """Test that retrying with the same Idempotency-Key does not generate twice"""
+    mock_generate.return_value = MOCK_LEARNING_PATH
+    headers = {**assigned_employee, "Idempotency-Key": "assessment-1"}
+
+    first = client.post("/api/learning_paths/from_assessment", headers=headers, json=QUIZ_SUBMISSION)
+    second = client.post("/api/learning_paths/from_assessment", headers=headers, json=QUIZ_SUBMISSION)
+    assert first.status_code == status.HTTP_202_ACCEPTED
+    assert second.json()["job_id"] == first.json()["job_id"]
+    mock_generate.assert_called_once()
+    assert db_session.query(Job).count() == 1
+
+
+@patch('routers.learning_paths.create_calendar_event_recurring')
+@patch('routers.learning_paths.generate_learning_path')
+def test_failed_job_records_error(mock_generate, mock_calendar, client, assigned_employee):
+    """Test that a handler exception marks the job failed with its error"""
+    mock_generate.side_effect = Exception("LLM unavailable")
+
+    response = client.post("/api/learning_paths/from_assessment", headers=assigned_employee, json=QUIZ_SUBMISSION)
+    job = client.get(response.json()["status_url"], headers=assigned_employee).json()
+    assert job["status"] == "failed"
+    assert job["error"] == "LLM unavailable"
+    assert job["result"] is None
+
+
+@patch('routers.learning_paths.create_calendar_event_recurring')
+@patch('routers.learning_paths.generate_learning_path')
+def test_calendar_failure_does_not_fail_saved_learning_path(mock_generate, mock_calendar, client, assigned_employee, db_session):
+    """Test that a calendar error after the commit leaves the job succeeded and is not run again"""
+    mock_generate.return_value = MOCK_LEARNING_PATH
+    mock_calendar.side_effect = Exception("Calendar API unavailable")
+
+    response = client.post("/api/learning_paths/from_assessment", headers=assigned_employee, json=QUIZ_SUBMISSION)
+    job = client.get(response.json()["status_url"], headers=assigned_employee).json()
+    assert job["status"] == "succeeded"
+    mock_calendar.assert_called_once()
+
+    assert job_queue.resume_pending_jobs() == 0
+    mock_generate.assert_called_once()
+    assert db_session.query(LearningPath).count() == 1
+
+
+def test_job_writes_are_committed_with_its_status(db_session, employee_token):
+    """Test that a failing handler saves none of its staged rows and runs no follow-ups"""
+    follow_ups = []
+
+    @job_queue.job_handler("test_staged")
+    def staged(payload, db):
+        db.add(Project(name="Half done", description=""))
+        db.flush()
+        job_queue.after_commit(db, lambda: follow_ups.append("ran"))
+        if payload["fail"]:
+            raise Exception("Subject generation failed")
+        return {}
+
+    user_id = int(employee_token["user_id"])
+    failing = Job(job_type="test_staged", status=JobStatus.QUEUED, user_id=user_id, payload=json.dumps({"fail": True}))
+    passing = Job(job_type="test_staged", status=JobStatus.QUEUED, user_id=user_id, payload=json.dumps({"fail": False}))
+    db_session.add_all([failing, passing])
+    db_session.commit()
+
+    job_queue.run_job(failing.id)
+    assert db_session.query(Project).filter(Project.name == "Half done").count() == 0
+    assert follow_ups == []
+
+    job_queue.run_job(passing.id)
+    assert db_session.query(Project).filter(Project.name == "Half done").count() == 1
+    assert follow_ups == ["ran"]
+
+
+def test_job_visible_only_to_owner_and_admin(client, db_session, admin_token, employee_token):
+    """Test that other employees cannot read a job"""
+    admin = db_session.query(User).filter(User.email == "testadmin@learnpro.com").first()
+    job = Job(job_type="create_project", status=JobStatus.QUEUED, user_id=admin.id, payload="{}")
+    db_session.add(job)
+    db_session.commit()
+
+    response = client.get(f"/api/jobs/{job.id}", headers=admin_token)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["status"] == "queued"
+
+    response = client.get(f"/api/jobs/{job.id}", headers={"Authorization": employee_token["Authorization"]})
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    response = client.get("/api/jobs/99999", headers=admin_token)
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_resume_pending_jobs(db_session, employee_token):
+    """Test that jobs left queued by a previous process are picked up again"""
+    calls = []
+
+    @job_queue.job_handler("test_echo")
+    def echo(payload, db):
+        calls.append(payload)
+        return payload
+
+    job = Job(job_type="test_echo", status=JobStatus.QUEUED,
+              user_id=int(employee_token["user_id"]), payload=json.dumps({"value": 1}))
+    db_session.add(job)
+    db_session.commit()
+
+    assert job_queue.resume_pending_jobs() == 1
+    db_session.refresh(job)
+    assert calls == [{"value": 1}]
+    assert job.status == JobStatus.SUCCEEDED
+    assert json.loads(job.result) == {"value": 1}
+
+
+def test_job_is_claimed_once(db_session, employee_token):
+    """Test that a job scheduled twice only runs once"""
+    calls = []
+
+    @job_queue.job_handler("test_count")
+    def count(payload, db):
+        calls.append(payload)
+        return payload
+
+    job = Job(job_type="test_count", status=JobStatus.QUEUED,
+              user_id=int(employee_token["user_id"]), payload=json.dumps({}))
+    db_session.add(job)
+    db_session.commit()
+
+    job_queue.run_job(job.id)
+    job_queue.run_job(job.id)
+    assert len(calls) == 1
+
+    db_session.refresh(job)
+    job.status = JobStatus.QUEUED
+    db_session.commit()
+    assert job_queue.claim_job(db_session, job.id) is True
+    assert job_queue.claim_job(db_session, job.id) is False
+
+
+def test_resume_skips_running_jobs_with_live_lease(db_session, employee_token):
+    """Test that only running jobs whose heartbeat expired are run again"""
+    calls = []
+
+    @job_queue.job_handler("test_resume")
+    def resume(payload, db):
+        calls.append(payload["name"])
+        return payload
+
+    now = datetime.now(timezone.utc)
+    user_id = int(employee_token["user_id"])
+    live = Job(job_type="test_resume", status=JobStatus.RUNNING, user_id=user_id,
+               payload=json.dumps({"name": "live"}), heartbeat_at=now)
+    expired = Job(job_type="test_resume", status=JobStatus.RUNNING, user_id=user_id,
+                  payload=json.dumps({"name": "expired"}),
+                  heartbeat_at=now - timedelta(seconds=job_queue.JOB_LEASE_SECONDS + 60))
+    db_session.add_all([live, expired])
+    db_session.commit()
+
+    assert job_queue.resume_pending_jobs() == 1
+    assert calls == ["expired"]
+    db_session.refresh(live)
+    db_session.refresh(expired)
+    assert live.status == JobStatus.RUNNING
+    assert expired.status == JobStatus.SUCCEEDED
@@ -22,7 +22,7 @@ def test_get_employee_learning_path(client, employee_token, sample_project, samp
 def test_get_nonexistent_learning_path(client, employee_token, db_session):
     """Test getting a learning path for a user without any learning path"""
     # First, remove any existing learning paths for this user
-    user_id = employee_token["user_id"]
+    user_id = int(employee_token["user_id"])
     db_session.query(models.LearningPath).filter_by(user_id=user_id).delete()
     db_session.commit()
     
@@ -144,3 +144,162 @@ def test_user_learning_paths(client, admin_token, employee_token, sample_learnin
         assert data[0]["user_id"] == int(user_id)
         assert "project_id" in data[0]
         assert "learning_path" in data[0]
+
+def test_learning_path_is_stored_as_rows(client, employee_token, sample_learning_path, db_session):
+    """Test that subjects and topics are stored as rows and the document is rebuilt on read"""
+    subjects = db_session.query(models.LearningPathSubject).filter_by(
+        learning_path_id=sample_learning_path["id"]
+    ).all()
+    assert [subject.name for subject in subjects] == ["Subject 1"]
+    assert [topic.name for topic in subjects[0].topics] == ["Topic A", "Topic B"]
+
+    response = client.get("/api/learning_paths/me", headers=employee_token)
+    assert response.status_code == status.HTTP_200_OK
+    document = json.loads(response.json()["learning_path"])
+    assert document["path_name"] == "Test Learning Path"
+    assert document["subjects"] == [{
+        "subject_name": "Subject 1",
+        "is_completed": "false",
+        "is_started": "true",
+        "topics": [
+            {"topic_name": "Topic A", "is_completed": "false"},
+            {"topic_name": "Topic B", "is_completed": "false"}
+        ]
+    }]
+
+def test_update_learning_path_rewrites_changed_rows(client, employee_token, sample_learning_path, db_session):
+    """Test that a full document update keeps unchanged rows and updates changed ones"""
+    topic_ids = [topic.id for topic in db_session.query(models.LearningPathTopic).order_by(
+        models.LearningPathTopic.position
+    )]
+    document = json.loads(sample_learning_path["learning_path"])
+    document["subjects"][0]["topics"][1]["is_completed"] = "true"
+
+    response = client.put(
+        "/api/learning_paths/update",
+        json={"learning_path": json.dumps(document), "completed_topics": 1},
+        headers=employee_token
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert json.loads(response.json()["learning_path"]) == document
+    db_session.expire_all()
+    topics = db_session.query(models.LearningPathTopic).order_by(models.LearningPathTopic.position).all()
+    assert [topic.id for topic in topics] == topic_ids
+    assert [topic.is_completed for topic in topics] == [False, True]
+
+def test_update_learning_path_rejects_invalid_document(client, employee_token, sample_learning_path):
+    """Test that a document without a subjects list is rejected"""
+    response = client.put(
+        "/api/learning_paths/update",
+        json={"learning_path": json.dumps({"subjects": "none"})},
+        headers=employee_token
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+def test_complete_learning_path_topic(client, employee_token, sample_learning_path, db_session):
+    """Test completing one topic by its position"""
+    url = "/api/learning_paths/me/subjects/0/topics/1/complete"
+    response = client.post(url, headers=employee_token)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"total_topics": 2, "completed_topics": 1}
+
+    # Completing it again does not count it twice
+    response = client.post(url, headers=employee_token)
+    assert response.json() == {"total_topics": 2, "completed_topics": 1}
+
+    topic = db_session.query(models.LearningPathTopic).filter_by(
+        learning_path_id=sample_learning_path["id"], subject_position=0, position=1
+    ).one()
+    db_session.refresh(topic)
+    assert topic.is_completed is True
+
+def test_complete_learning_path_topic_with_etag(client, employee_token, sample_learning_path):
+    """Test that completing a topic honours If-Match and hands back the new ETag"""
+    etag = client.get("/api/learning_paths/me", headers=employee_token).headers["ETag"]
+    response = client.post(
+        "/api/learning_paths/me/subjects/0/topics/0/complete", headers={**employee_token, "If-Match": etag}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    new_etag = response.headers["ETag"]
+    assert new_etag != etag
+
+    # The old ETag is stale now, the new one still applies
+    response = client.post(
+        "/api/learning_paths/me/subjects/0/topics/1/complete", headers={**employee_token, "If-Match": etag}
+    )
+    assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
+    response = client.patch(
+        "/api/learning_paths/me",
+        json=[{"op": "replace", "path": "/subjects/0/topics/1/is_completed", "value": "true"}],
+        headers={**employee_token, "If-Match": new_etag}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["completed_topics"] == 2
+
+def test_complete_legacy_learning_path_topic(client, employee_token, legacy_learning_path):
+    """Test completing a topic of a path still stored as one JSON document"""
+    response = client.post("/api/learning_paths/me/subjects/0/topics/1/complete", headers=employee_token)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"total_topics": 2, "completed_topics": 2}
+
+    document = json.loads(client.get("/api/learning_paths/me", headers=employee_token).json()["learning_path"])
+    assert document["path_name"] == "Legacy Learning Path"
+    assert [topic["is_completed"] for topic in document["subjects"][0]["topics"]] == ["true", "true"]
+
+def test_complete_nonexistent_learning_path_topic(client, employee_token, sample_learning_path):
+    """Test completing a topic that is not in the learning path"""
+    response = client.post("/api/learning_paths/me/subjects/0/topics/5/complete", headers=employee_token)
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+def test_patch_learning_path(client, employee_token, sample_learning_path, db_session):
+    """Test applying a JSON Patch and recomputing the topic counters"""
+    response = client.patch(
+        "/api/learning_paths/me",
+        json=[
+            {"op": "replace", "path": "/subjects/0/topics/0/is_completed", "value": "true"},
+            {"op": "add", "path": "/subjects/0/topics/-", "value": {"topic_name": "Topic C", "is_completed": "false"}}
+        ],
+        headers=employee_token
+    )
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data["total_topics"] == 3
+    assert data["completed_topics"] == 1
+    assert data["version"] == 2
+    assert response.headers["ETag"] == f'"{sample_learning_path["id"]}-2"'
+    topics = json.loads(data["learning_path"])["subjects"][0]["topics"]
+    assert [topic["topic_name"] for topic in topics] == ["Topic A", "Topic B", "Topic C"]
+    assert topics[0]["is_completed"] == "true"
+
+def test_patch_learning_path_with_stale_etag(client, employee_token, sample_learning_path):
+    """Test that a patch based on an outdated ETag is refused"""
+    etag = client.get("/api/learning_paths/me", headers=employee_token).headers["ETag"]
+    operation = [{"op": "replace", "path": "/subjects/0/topics/0/is_completed", "value": "true"}]
+
+    response = client.patch("/api/learning_paths/me", json=operation, headers={**employee_token, "If-Match": etag})
+    assert response.status_code == status.HTTP_200_OK
+
+    # A second tab still holding the first ETag
+    response = client.patch("/api/learning_paths/me", json=operation, headers={**employee_token, "If-Match": etag})
+    assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
+
+def test_patch_learning_path_failed_test_operation(client, employee_token, sample_learning_path):
+    """Test that a failing test operation leaves the learning path unchanged"""
+    response = client.patch(
+        "/api/learning_paths/me",
+        json=[
+            {"op": "test", "path": "/subjects/0/topics/0/is_completed", "value": "true"},
+            {"op": "replace", "path": "/subjects/0/topics/0/is_completed", "value": "false"}
+        ],
+        headers=employee_token
+    )
+    assert response.status_code == status.HTTP_409_CONFLICT
+
+def test_patch_learning_path_invalid_path(client, employee_token, sample_learning_path):
+    """Test that an operation on a missing location is rejected"""
+    response = client.patch(
+        "/api/learning_paths/me",
+        json=[{"op": "replace", "path": "/subjects/3/topics/0/is_completed", "value": "true"}],
+        headers=employee_token
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
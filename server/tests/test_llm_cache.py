@@ -0,0 +1,183 @@
+"""
+Tests for the persistent LLM response cache
+"""
+
+import pytest
+import json
+import time
+import asyncio
+import threading
+from unittest.mock import patch
+
+import sys
+from pathlib import Path
+
+# Make sure we can import from server directory
+sys.path.append(str(Path(__file__).parent.parent))
+
+from utils.llm_cache import LLMCache, make_cache_key, llm_cache, cached_generation_async
+import utils.llm_utils as llm_utils
+from utils.llm_utils import (
+    generate_toic_quiz,
+    generate_subjects_from_dependencies,
+    generate_assignment_questions,
+    merge_subjects
+)
+
+MOCK_QUIZ = {"title": "Python Quiz", "questions": [{"id": 1, "question": "?", "topic": "Python"}]}
+MOCK_SUBJECTS = {"subjects": [{"subject_name": "FastAPI", "topics": ["Routing"]}]}
+
+
+def test_cache_key_depends_on_every_component():
+    """Test that model, template version and input all change the key"""
+    base = make_cache_key("topic_quiz", "1", "model-a", "python")
+    assert base == make_cache_key("topic_quiz", "1", "model-a", "python")
+    assert base != make_cache_key("topic_quiz", "2", "model-a", "python")
+    assert base != make_cache_key("topic_quiz", "1", "model-b", "python")
+    assert base != make_cache_key("topic_quiz", "1", "model-a", "react")
+    assert base != make_cache_key("assignment_questions", "1", "model-a", "python")
+
+
+def test_cache_ttl_expiry(tmp_path):
+    """Test that entries older than the TTL are treated as misses"""
+    cache = LLMCache(path=tmp_path / "cache.db", ttl=0.1)
+    cache.set("key", {"value": 1})
+    assert cache.get("key") == {"value": 1}
+    time.sleep(0.15)
+    assert cache.get("key") is None
+    assert len(cache) == 0
+
+
+def test_cache_lru_eviction(tmp_path):
+    """Test that the least recently used entry is evicted first"""
+    cache = LLMCache(path=tmp_path / "cache.db", ttl=None, max_entries=2)
+    cache.set("a", 1)
+    time.sleep(0.01)
+    cache.set("b", 2)
+    time.sleep(0.01)
+    assert cache.get("a") == 1  # "a" is now more recent than "b"
+    time.sleep(0.01)
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert len(cache) == 2
+
+
+@patch('utils.llm_utils.groq_calling_function')
+def test_topic_quiz_is_served_from_cache(mock_groq):
+    """Test that repeated and equivalent topics cost a single LLM call"""
+    mock_groq.return_value = MOCK_QUIZ
+
+    assert generate_toic_quiz("Python") == MOCK_QUIZ
+    assert generate_toic_quiz("  python ") == MOCK_QUIZ
+    mock_groq.assert_called_once()
+
+    # The bypass flag forces a fresh generation
+    assert generate_toic_quiz("Python", bypass_cache=True) == MOCK_QUIZ
+    assert mock_groq.call_count == 2
+
+
+@patch('utils.llm_utils.groq_calling_function')
+def test_dependencies_are_normalized(mock_groq):
+    """Test that dependency order, case and duplicates do not change the cache key"""
+    mock_groq.return_value = MOCK_SUBJECTS
+
+    generate_subjects_from_dependencies(["fastapi", "SQLAlchemy"], per_dependency=False)
+    generate_subjects_from_dependencies(["sqlalchemy", "FastAPI", "fastapi"], per_dependency=False)
+    mock_groq.assert_called_once()
+
+    generate_subjects_from_dependencies(["fastapi", "sqlalchemy", "pydantic"], per_dependency=False)
+    assert mock_groq.call_count == 2
+
+
+@patch('utils.llm_utils.groq_calling_function')
+def test_assignment_questions_are_cached(mock_groq):
+    """Test that the same subjects in a different order reuse the cached quiz"""
+    mock_groq.return_value = MOCK_QUIZ
+    subjects = [
+        {"subject_name": "Python", "topics": ["Basics", "OOP"]},
+        {"subject_name": "FastAPI", "topics": ["Routing"]}
+    ]
+
+    generate_assignment_questions(subjects)
+    generate_assignment_questions(list(reversed(subjects)))
+    mock_groq.assert_called_once()
+    assert len(llm_cache) == 1
+
+
+def fake_dependency_subjects(prompt, **kwargs):
+    """Answer a per-dependency prompt with one subject per requested dependency"""
+    dependencies = json.loads(prompt.split("Dependencies:")[1].split("Return the response")[0])
+    return {"dependencies": {
+        dependency: [] if dependency == "react-icons" else [
+            {"subject_name": f"{dependency} basics", "topics": [f"{dependency} setup", "Testing"]}
+        ]
+        for dependency in dependencies
+    }}
+
+
+def test_merge_subjects():
+    """Test that subjects with the same name are combined and topics de-duplicated"""
+    merged = merge_subjects([
+        [{"subject_name": "Web APIs", "topics": ["Routing", "Validation"]}],
+        [{"subject_name": "web apis", "topics": ["routing", "Middleware"]}],
+        [],
+    ])
+    assert merged == {"subjects": [
+        {"subject_name": "Web APIs", "topics": ["Routing", "Validation", "Middleware"]}
+    ]}
+
+
+@patch('utils.llm_utils.groq_calling_function', side_effect=fake_dependency_subjects)
+def test_per_dependency_mode_only_sends_catalog_misses(mock_groq, monkeypatch):
+    """Test that a familiar stack is assembled from the catalog with no LLM calls"""
+    monkeypatch.setattr(llm_utils, "LLM_DEPENDENCY_BATCH_SIZE", 2)
+
+    first = generate_subjects_from_dependencies(["fastapi", "sqlalchemy", "pydantic", "react-icons"], per_dependency=True)
+    assert mock_groq.call_count == 2  # two batches of two
+    assert [subject["subject_name"] for subject in first["subjects"]] == [
+        "fastapi basics", "pydantic basics", "sqlalchemy basics"
+    ]
+    assert first["subjects"][0]["topics"] == ["fastapi setup", "Testing"]
+
+    # Same stack plus one new package: only the new package is generated
+    mock_groq.reset_mock()
+    second = generate_subjects_from_dependencies(["FastAPI", "sqlalchemy", "pydantic", "react-icons", "uvicorn"], per_dependency=True)
+    mock_groq.assert_called_once()
+    assert '["uvicorn"]' in mock_groq.call_args[0][0]
+    assert len(second["subjects"]) == 4
+
+    # Fully familiar stack: zero LLM calls
+    mock_groq.reset_mock()
+    generate_subjects_from_dependencies(["uvicorn", "fastapi"], per_dependency=True)
+    mock_groq.assert_not_called()
+
+
+def test_cached_generation_async_uses_worker_threads():
+    """Test that the async cache lookup and store do not run on the event loop thread"""
+    loop_thread = threading.get_ident()
+    cache_threads = []
+    original_get, original_set = llm_cache.get, llm_cache.set
+
+    def get(key):
+        cache_threads.append(threading.get_ident())
+        return original_get(key)
+
+    def set(key, value, namespace=""):
+        cache_threads.append(threading.get_ident())
+        return original_set(key, value, namespace)
+
+    async def generate():
+        return MOCK_QUIZ
+
+    async def run():
+        return [await cached_generation_async("topic_quiz", "1", "model", "python", generate) for _ in range(2)]
+
+    with patch.object(llm_cache, "get", side_effect=get), patch.object(llm_cache, "set", side_effect=set):
+        assert asyncio.run(run()) == [MOCK_QUIZ, MOCK_QUIZ]
+
+    # Miss: get and set; hit: get
+    assert len(cache_threads) == 3
+    assert loop_thread not in cache_threads
@@ -0,0 +1,234 @@
+"""
+Tests for the pooled LLM client
+Uses a local stand-in for the Groq chat completions endpoint
+"""
+
+import pytest
+import asyncio
+import json
+import os
+import threading
+import time
+import requests
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+import sys
+from pathlib import Path
+
+# Make sure we can import from server directory
+sys.path.append(str(Path(__file__).parent.parent))
+
+import utils.llm_client as llm_client
+from utils.llm_client import (
+    chat_completion,
+    async_chat_completion,
+    get_session,
+    reset_session,
+    reset_async_client,
+    RetryPolicy,
+    get_counters,
+    reset_counters
+)
+from utils.llm_utils import (
+    groq_calling_function,
+    groq_calling_function_string,
+    groq_calling_function_async
+)
+
+
+class StandInGroqHandler(BaseHTTPRequestHandler):
+    """Answers every chat completion with a fixed JSON payload over keep-alive"""
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        time.sleep(self.server.delay)
+        self.server.requests.append({
+            "headers": dict(self.headers),
+            "body": json.loads(self.rfile.read(length))
+        })
+        if self.server.failures:
+            status_code, headers = self.server.failures.pop(0)
+            self.send_response(status_code)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = json.dumps({
+            "choices": [{"message": {"content": '{"answer": 42}'}}]
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stand_in_server():
+    """Start a local stand-in Groq server and point the client at it"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInGroqHandler)
+    server.connections = 0
+    server.requests = []
+    server.delay = 0
+    server.failures = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/openai/v1/chat/completions"
+    with patch.dict(os.environ, {"GROQ_API_KEY": "test_api_key"}), \
+            patch.object(llm_client, "GROQ_API_URL", url):
+        reset_session()
+        yield server
+        reset_session()
+    server.shutdown()
+    server.server_close()
+
+
+def test_chat_completion_reuses_connection(stand_in_server):
+    """Test that repeated calls share a single keep-alive connection"""
+    for _ in range(5):
+        assert chat_completion("ping") == '{"answer": 42}'
+
+    assert len(stand_in_server.requests) == 5
+    assert stand_in_server.connections == 1
+
+
+def test_all_entry_points_share_the_pool(stand_in_server):
+    """Test that the JSON and string helpers go through the same session"""
+    assert groq_calling_function("ping") == {"answer": 42}
+    assert groq_calling_function_string("ping") == '{"answer": 42}'
+
+    assert stand_in_server.connections == 1
+    for request in stand_in_server.requests:
+        assert request["headers"]["Authorization"] == "Bearer test_api_key"
+        assert request["body"]["model"] == llm_client.GROQ_MODEL
+
+
+def test_pooled_calls_skip_per_call_handshakes(stand_in_server):
+    """Test that a fresh session pays one connection per call and the pool pays one in total"""
+    calls = 20
+
+    for _ in range(calls):
+        reset_session()
+        chat_completion("ping")
+    fresh_connections = stand_in_server.connections
+
+    reset_session()
+    stand_in_server.connections = 0
+    for _ in range(calls):
+        chat_completion("ping")
+
+    assert fresh_connections == calls
+    assert stand_in_server.connections == 1
+
+
+def test_session_is_created_once():
+    """Test that the session and its headers are built only on first use"""
+    with patch.dict(os.environ, {"GROQ_API_KEY": "test_api_key"}):
+        reset_session()
+        session = get_session()
+        assert get_session() is session
+        assert session.headers["Authorization"] == "Bearer test_api_key"
+    reset_session()
+
+
+def test_missing_api_key_raises():
+    """Test that building the session without an API key fails fast"""
+    with patch.dict(os.environ, {}, clear=True):
+        reset_session()
+        with pytest.raises(ValueError) as exc_info:
+            get_session()
+    assert "GROQ_API_KEY" in str(exc_info.value)
+
+
+def test_async_chat_completion_reuses_connection(stand_in_server):
+    """Test that awaitable calls share a keep-alive connection"""
+    async def run():
+        try:
+            for _ in range(5):
+                assert await async_chat_completion("ping") == '{"answer": 42}'
+            assert await groq_calling_function_async("ping") == {"answer": 42}
+        finally:
+            await reset_async_client()
+
+    asyncio.run(run())
+    assert len(stand_in_server.requests) == 6
+    assert stand_in_server.connections == 1
+
+
+def test_async_calls_do_not_block_the_event_loop(stand_in_server):
+    """Test that concurrent awaitable calls overlap instead of running back to back"""
+    stand_in_server.delay = 0.3
+    calls = 4
+
+    async def run():
+        try:
+            start = time.perf_counter()
+            results = await asyncio.gather(*[async_chat_completion("ping") for _ in range(calls)])
+            return results, time.perf_counter() - start
+        finally:
+            await reset_async_client()
+
+    results, elapsed = asyncio.run(run())
+    assert results == ['{"answer": 42}'] * calls
+    assert elapsed < stand_in_server.delay * calls
+
+
+def test_retry_policy_backoff_is_bounded_and_jittered():
+    """Test that the computed delay stays under the exponential ceiling"""
+    policy = RetryPolicy(max_attempts=5, backoff_base=1, backoff_max=4)
+    for attempt, ceiling in [(1, 1), (2, 2), (3, 4), (4, 4)]:
+        for _ in range(20):
+            assert 0 <= policy.delay(attempt) <= ceiling
+    assert policy.delay(1, retry_after=3) == 3
+    assert policy.delay(1, retry_after=60) == 4
+
+
+def test_rate_limited_call_honours_retry_after(stand_in_server):
+    """Test that a 429 is retried after the Retry-After interval"""
+    reset_counters()
+    stand_in_server.failures = [(429, {"Retry-After": "0.2"})]
+    policy = RetryPolicy(max_attempts=3, backoff_base=0, backoff_max=5)
+
+    start = time.perf_counter()
+    assert chat_completion("ping", retry_policy=policy) == '{"answer": 42}'
+    assert time.perf_counter() - start >= 0.2
+    assert len(stand_in_server.requests) == 2
+    assert get_counters()["retries"] == 1
+
+
+def test_retries_stop_after_max_attempts(stand_in_server):
+    """Test that persistent server errors are raised after the last attempt"""
+    reset_counters()
+    stand_in_server.failures = [(503, {})] * 5
+    policy = RetryPolicy(max_attempts=3, backoff_base=0)
+
+    with pytest.raises(requests.exceptions.HTTPError):
+        chat_completion("ping", retry_policy=policy)
+    assert len(stand_in_server.requests) == 3
+    assert get_counters()["retries"] == 2
+
+
+def test_async_call_retries_server_errors(stand_in_server):
+    """Test that the async client follows the same retry policy"""
+    reset_counters()
+    stand_in_server.failures = [(502, {}), (429, {"Retry-After": "0"})]
+    policy = RetryPolicy(max_attempts=3, backoff_base=0)
+
+    async def run():
+        try:
+            return await async_chat_completion("ping", retry_policy=policy)
+        finally:
+            await reset_async_client()
+
+    assert asyncio.run(run()) == '{"answer": 42}'
+    assert get_counters()["retries"] == 2
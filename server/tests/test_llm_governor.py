@@ -0,0 +1,156 @@
+"""
+Tests for the process-wide LLM concurrency and rate governor
+"""
+
+import pytest
+import asyncio
+import threading
+import time
+from fastapi import status
+from unittest.mock import patch, MagicMock
+
+import sys
+from pathlib import Path
+
+# Make sure we can import from server directory
+sys.path.append(str(Path(__file__).parent.parent))
+
+from utils.llm_governor import LLMGovernor, PRIORITY_INTERACTIVE, PRIORITY_BATCH
+from utils.llm_client import chat_completion, reset_session, RetryPolicy
+
+
+def test_concurrency_limit():
+    """Test that no more than max_concurrency requests are admitted at once"""
+    governor = LLMGovernor(max_concurrency=2, requests_per_minute=0, tokens_per_minute=0)
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def call():
+        ticket = governor.acquire("model", 10)
+        with lock:
+            active.append(1)
+            peak.append(len(active))
+        time.sleep(0.05)
+        with lock:
+            active.pop()
+        governor.release(ticket)
+
+    threads = [threading.Thread(target=call) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert max(peak) == 2
+    assert governor.metrics()["admitted"] == 6
+    assert governor.metrics()["active"] == 0
+
+
+def test_interactive_requests_jump_the_queue():
+    """Test that queued interactive callers are admitted before earlier batch callers"""
+    governor = LLMGovernor(max_concurrency=1, requests_per_minute=0, tokens_per_minute=0)
+    held = governor.acquire("model", 10)
+    order = []
+
+    def call(name, priority):
+        ticket = governor.acquire("model", 10, priority)
+        order.append(name)
+        governor.release(ticket)
+
+    threads = [threading.Thread(target=call, args=(f"batch-{i}", PRIORITY_BATCH)) for i in range(2)]
+    threads.append(threading.Thread(target=call, args=("interactive", PRIORITY_INTERACTIVE)))
+    for thread in threads:
+        thread.start()
+        time.sleep(0.02)
+
+    metrics = governor.metrics()
+    assert metrics["queue_depth"] == 3
+    assert metrics["queue_depth_by_priority"] == {PRIORITY_BATCH: 2, PRIORITY_INTERACTIVE: 1}
+
+    governor.release(held)
+    for thread in threads:
+        thread.join()
+    assert order == ["interactive", "batch-0", "batch-1"]
+
+
+def test_tokens_per_minute_budget():
+    """Test that a request waits until the token bucket has refilled"""
+    governor = LLMGovernor(max_concurrency=0, requests_per_minute=0, tokens_per_minute=600)
+    governor.release(governor.acquire("model", 600))
+
+    started = time.monotonic()
+    governor.release(governor.acquire("model", 5))
+    assert time.monotonic() - started >= 0.4  # 10 tokens per second
+
+    # Budgets are kept per model
+    started = time.monotonic()
+    governor.release(governor.acquire("other-model", 600))
+    assert time.monotonic() - started < 0.1
+
+
+def test_release_corrects_token_estimate():
+    """Test that unused estimated tokens are given back to the bucket"""
+    governor = LLMGovernor(max_concurrency=0, requests_per_minute=0, tokens_per_minute=1000)
+    ticket = governor.acquire("model", 800)
+    governor.release(ticket, used_tokens=100)
+    assert governor.metrics()["models"]["model"]["tokens_available"] >= 900
+
+
+def test_pause_holds_back_requests():
+    """Test that a paused model admits nothing until the pause ends"""
+    governor = LLMGovernor(max_concurrency=0, requests_per_minute=0, tokens_per_minute=0)
+    governor.pause("model", 0.3)
+    assert governor.metrics()["models"]["model"]["paused_for_seconds"] > 0
+
+    started = time.monotonic()
+    governor.release(governor.acquire("model", 1))
+    assert time.monotonic() - started >= 0.25
+
+
+def test_async_acquire_limits_concurrency():
+    """Test that async callers share the same concurrency limit"""
+    governor = LLMGovernor(max_concurrency=2, requests_per_minute=0, tokens_per_minute=0)
+    peak = 0
+
+    async def call():
+        nonlocal peak
+        ticket = await governor.acquire_async("model", 10)
+        peak = max(peak, governor.metrics()["active"])
+        await asyncio.sleep(0.05)
+        governor.release(ticket)
+
+    async def main():
+        await asyncio.gather(*(call() for _ in range(5)))
+
+    asyncio.run(main())
+    assert peak == 2
+    assert governor.metrics()["admitted"] == 5
+
+
+@patch('utils.llm_client.requests.Session.post')
+def test_429_pauses_the_model(mock_post, monkeypatch, unthrottled_llm_governor):
+    """Test that a 429 with Retry-After pauses every caller of that model"""
+    monkeypatch.setenv("GROQ_API_KEY", "test-key")
+    reset_session()
+    throttled = MagicMock(status_code=429, headers={"Retry-After": "0.2"})
+    ok = MagicMock(status_code=200, headers={})
+    ok.json.return_value = {"choices": [{"message": {"content": "done"}}], "usage": {"total_tokens": 42}}
+    mock_post.side_effect = [throttled, ok]
+
+    with patch.object(unthrottled_llm_governor, "pause", wraps=unthrottled_llm_governor.pause) as pause:
+        assert chat_completion("prompt", model="model-a", retry_policy=RetryPolicy(max_attempts=2)) == "done"
+    pause.assert_called_once_with("model-a", 0.2)
+    assert unthrottled_llm_governor.metrics()["admitted"] == 2
+    reset_session()
+
+
+def test_metrics_endpoint(client, admin_token, employee_token):
+    """Test that admins can read the governor metrics"""
+    response = client.get("/api/llm/metrics", headers=admin_token)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["governor"]["queue_depth"] == 0
+    assert "counters" in response.json()
+
+    response = client.get("/api/llm/metrics", headers={"Authorization": employee_token["Authorization"]})
+    assert response.status_code == status.HTTP_403_FORBIDDEN
@@ -4,6 +4,8 @@ Using mocks to avoid making actual API calls
 """
 
 import pytest
+import asyncio
+import time
 import json
 import os
 import requests
@@ -20,8 +22,14 @@ from utils.llm_utils import (
     groq_calling_function, 
     generate_toic_quiz, 
     generate_assignment_questions,
-    generate_learning_path
+    generate_learning_path,
+    repair_json,
+    chunk_transcripts,
+    generate_digested_transcripts,
+    generate_digested_transcripts_github_async
 )
+import utils.llm_utils as llm_utils
+from utils.llm_client import get_session, reset_session, RetryPolicy, get_counters, reset_counters
 
 # Sample mock responses
 MOCK_QUIZ_RESPONSE = {
@@ -106,9 +114,10 @@ MOCK_ASSIGNMENT = {
 }
 
 @patch.dict(os.environ, {"GROQ_API_KEY": "test_api_key"})
-@patch('utils.llm_utils.requests.post')
+@patch('utils.llm_client.requests.Session.post')
 def test_groq_calling_function(mock_post):
     """Test the Groq API calling function"""
+    reset_session()
     # Set up the mock response
     mock_response = MagicMock()
     mock_response.raise_for_status = MagicMock()
@@ -131,9 +140,8 @@ def test_groq_calling_function(mock_post):
     mock_post.assert_called_once()
     
     # Verify API key was used
-    args, kwargs = mock_post.call_args
-    assert "Authorization" in kwargs["headers"]
-    assert "Bearer test_api_key" in kwargs["headers"]["Authorization"]
+    assert "Authorization" in get_session().headers
+    assert "Bearer test_api_key" in get_session().headers["Authorization"]
 
 @patch('utils.llm_utils.groq_calling_function')
 def test_generate_toic_quiz(mock_groq):
@@ -201,9 +209,11 @@ def test_generate_learning_path(mock_groq):
     assert "topics" in fastapi_subject
     assert len(fastapi_subject["topics"]) == 3
 
-@patch('utils.llm_utils.requests.post')
+@patch.dict(os.environ, {"GROQ_API_KEY": "test_api_key"})
+@patch('utils.llm_client.requests.Session.post')
 def test_groq_calling_function_error_handling(mock_post):
     """Test error handling in the Groq API calling function"""
+    reset_session()
     # Test request exception
     mock_post.side_effect = requests.exceptions.RequestException("API error")
     
@@ -245,8 +255,209 @@ def test_groq_api_key_missing(mock_getenv):
     """Test behavior when API key is missing"""
     # Simulate missing API key
     mock_getenv.return_value = None
+    reset_session()
     
     with pytest.raises(Exception) as exc_info:
         groq_calling_function("Test prompt")
     
     assert "GROQ_API_KEY environment variable not set" in str(exc_info.value)
+
+def test_repair_json():
+    """Test the local repairs applied to almost-valid JSON"""
+    # Code fences and trailing commas
+    assert repair_json('```json\n{"a": [1, 2,],}\n```') == {"a": [1, 2]}
+
+    # Python-style dict with single quotes
+    assert repair_json("{'title': 'Quiz', 'done': False}") == {"title": "Quiz", "done": False}
+
+    # Single-quoted JSON with lowercase literals
+    assert repair_json("{'title': 'Quiz', 'done': false, 'score': null}") == {
+        "title": "Quiz", "done": False, "score": None
+    }
+
+    with pytest.raises(json.JSONDecodeError):
+        repair_json("not json at all")
+
+@patch('utils.llm_utils.chat_completion')
+def test_groq_calling_function_repairs_before_rerequest(mock_chat):
+    """Test that repairable output does not trigger another LLM call"""
+    reset_counters()
+    mock_chat.return_value = '{"questions": [],}'
+
+    assert groq_calling_function("Test prompt") == {"questions": []}
+    mock_chat.assert_called_once()
+    assert get_counters()["json_repairs"] == 1
+
+@patch('utils.llm_utils.chat_completion')
+def test_groq_calling_function_rerequests_are_bounded(mock_chat):
+    """Test that unparseable output is re-requested a bounded number of times"""
+    reset_counters()
+    mock_chat.side_effect = ["Invalid JSON", "Still invalid", '{"ok": true}']
+
+    assert groq_calling_function("Test prompt", retry_policy=RetryPolicy(max_attempts=3)) == {"ok": True}
+    assert mock_chat.call_count == 3
+    assert get_counters()["json_rerequests"] == 2
+
+    mock_chat.reset_mock()
+    mock_chat.side_effect = None
+    mock_chat.return_value = "Invalid JSON"
+    with pytest.raises(Exception) as exc_info:
+        groq_calling_function("Test prompt", retry_policy=RetryPolicy(max_attempts=2))
+    assert "Error parsing JSON" in str(exc_info.value)
+    assert mock_chat.call_count == 2
+
+def fake_subject_quiz(prompt, **kwargs):
+    """Answer a single-subject quiz prompt with two questions per topic"""
+    subject_line = next(line for line in prompt.splitlines() if line.strip().startswith("Subject:"))
+    subject = subject_line.split("Subject:")[1].strip()
+    if subject == "Broken":
+        raise Exception("Error parsing JSON from LLM response")
+    topics_line = next(line for line in prompt.splitlines() if line.strip().startswith("Topics:"))
+    topics = [topic.strip().rstrip(".") for topic in topics_line.split("Topics:")[1].split(",")]
+    return {
+        "title": f"{subject} quiz",
+        "questions": [
+            {"id": 1, "question": f"{topic} question {n}", "options": ["a", "b", "c", "d"],
+             "correctAnswer": "a", "points": 10, "topic": topic}
+            for topic in topics for n in range(2)
+        ]
+    }
+
+@patch('utils.llm_utils.groq_calling_function', side_effect=fake_subject_quiz)
+def test_generate_assignment_questions_per_subject(mock_groq, monkeypatch):
+    """Test that per-subject quizzes are merged with renumbered ids and balanced topics"""
+    monkeypatch.setattr(llm_utils, "ASSIGNMENT_QUIZ_QUESTIONS", 6)
+    subjects = [
+        {"subject_name": "Python", "topics": ["Basics", "OOP"]},
+        {"subject_name": "Broken", "topics": ["Nothing"]},
+        {"subject_name": "FastAPI", "topics": ["Routing"]}
+    ]
+
+    result = generate_assignment_questions(subjects, per_subject=True)
+
+    # The failing subject is tried twice, then skipped since the others fill the quiz
+    assert mock_groq.call_count == 4
+    assert set(result.keys()) == {"title", "questions"}
+    assert len(result["questions"]) == 6
+    assert [question["id"] for question in result["questions"]] == list(range(1, 7))
+    # Round-robin across topics: the first three questions cover every topic
+    assert {question["topic"] for question in result["questions"][:3]} == {"Basics", "OOP", "Routing"}
+
+@patch('utils.llm_utils.groq_calling_function', side_effect=fake_subject_quiz)
+def test_generate_assignment_questions_per_subject_total(mock_groq, monkeypatch):
+    """Test that subjects share the quiz size and the merged quiz is capped at it"""
+    monkeypatch.setattr(llm_utils, "ASSIGNMENT_QUIZ_QUESTIONS", 10)
+    subjects = [
+        {"subject_name": f"Subject {n}", "topics": [f"Topic {n}a", f"Topic {n}b", f"Topic {n}c"]}
+        for n in range(4)
+    ]
+
+    result = generate_assignment_questions(subjects, per_subject=True)
+
+    prompts = [call.args[0] for call in mock_groq.call_args_list]
+    assert all("exactly 3 questions" in prompt for prompt in prompts)
+    # Four subjects answered six questions each; the merged quiz keeps ten
+    assert len(result["questions"]) == 10
+    assert [question["id"] for question in result["questions"]] == list(range(1, 11))
+    assert len({question["topic"] for question in result["questions"]}) == 10
+
+@patch('utils.llm_utils.groq_calling_function', side_effect=fake_subject_quiz)
+def test_generate_assignment_questions_per_subject_short_quiz(mock_groq, monkeypatch):
+    """Test that a quiz left short by a failing subject raises instead of being returned"""
+    monkeypatch.setattr(llm_utils, "ASSIGNMENT_QUIZ_QUESTIONS", 9)
+    subjects = [
+        {"subject_name": "Python", "topics": ["Basics", "OOP"]},
+        {"subject_name": "Broken", "topics": ["Nothing"]},
+        {"subject_name": "FastAPI", "topics": ["Routing"]}
+    ]
+
+    with pytest.raises(Exception) as exc_info:
+        generate_assignment_questions(subjects, per_subject=True)
+    assert "6 of 9 questions" in str(exc_info.value)
+    assert "Broken" in str(exc_info.value)
+
+@patch('utils.llm_utils.groq_calling_function')
+def test_generate_assignment_questions_per_subject_retries_failed_subject(mock_groq, monkeypatch):
+    """Test that a subject failing once is generated again"""
+    monkeypatch.setattr(llm_utils, "ASSIGNMENT_QUIZ_QUESTIONS", 2)
+    mock_groq.side_effect = [Exception("API down"), fake_subject_quiz("Subject: Python\nTopics: Basics")]
+
+    result = generate_assignment_questions([{"subject_name": "Python", "topics": ["Basics"]}], per_subject=True)
+    assert mock_groq.call_count == 2
+    assert len(result["questions"]) == 2
+
+@patch('utils.llm_utils.groq_calling_function', side_effect=Exception("API down"))
+def test_generate_assignment_questions_per_subject_all_failed(mock_groq):
+    """Test that an error is raised only when every subject fails"""
+    with pytest.raises(Exception) as exc_info:
+        generate_assignment_questions([{"subject_name": "Python", "topics": ["Basics"]}], per_subject=True)
+    assert "every subject" in str(exc_info.value)
+
+
+def make_transcript(turns):
+    return [f"{'Agent' if n % 2 == 0 else 'Engineer'}: turn {n} " + "detail " * 20 for n in range(turns)]
+
+def fake_digest(prompt, **kwargs):
+    """Summarize a chunk as the numbers of the turns it contains, or return the final digest"""
+    if "transcript part" in prompt:
+        return "notes for " + prompt.split("You are provided with part ")[1].split(" of")[0]
+    return "final digest"
+
+def test_chunk_transcripts_keeps_speaker_turns_whole():
+    """Test that chunks stay within budget and only split a turn that is too long on its own"""
+    transcript = make_transcript(10)
+    chunks = chunk_transcripts(transcript, token_budget=100)
+
+    assert [turn for chunk in chunks for turn in chunk] == transcript
+    assert all(sum(len(turn) // 4 + 1 for turn in chunk) <= 100 for chunk in chunks)
+    assert len(chunks) > 1
+
+    long_turn = "word " * 200
+    pieces = chunk_transcripts([long_turn], token_budget=100)
+    assert len(pieces) > 1
+    assert " ".join(piece for chunk in pieces for piece in chunk).split() == long_turn.split()
+
+@patch('utils.llm_utils.groq_calling_function_string', side_effect=fake_digest)
+def test_short_transcript_is_digested_in_one_call(mock_groq):
+    """Test that a transcript within budget keeps the single-call digest"""
+    assert generate_digested_transcripts(make_transcript(3)) == "final digest"
+    mock_groq.assert_called_once()
+    assert "turn 2" in mock_groq.call_args[0][0]
+
+@patch('utils.llm_utils.groq_calling_function_string', side_effect=fake_digest)
+def test_long_transcript_is_map_reduced_with_chunk_cache(mock_groq, monkeypatch):
+    """Test that chunks are summarized separately and an edit only re-summarizes its chunk"""
+    monkeypatch.setattr(llm_utils, "KT_CHUNK_TOKEN_BUDGET", 100)
+    transcript = make_transcript(12)
+    chunk_count = len(chunk_transcripts(transcript, token_budget=100))
+
+    assert generate_digested_transcripts(transcript) == "final digest"
+    assert mock_groq.call_count == chunk_count + 1
+    final_prompt = mock_groq.call_args[0][0]
+    assert "notes for 1" in final_prompt and f"notes for {chunk_count}" in final_prompt
+    assert "turn 0" not in final_prompt
+
+    # Edit the last turn: only the last chunk and the final merge are regenerated
+    mock_groq.reset_mock()
+    edited = transcript[:-1] + [transcript[-1] + " corrected"]
+    generate_digested_transcripts(edited)
+    assert mock_groq.call_count == 2
+
+@patch('utils.llm_utils.groq_calling_function_string_async')
+def test_long_transcript_chunks_are_summarized_concurrently(mock_groq, monkeypatch):
+    """Test that the async pipeline summarizes chunks in parallel"""
+    monkeypatch.setattr(llm_utils, "KT_CHUNK_TOKEN_BUDGET", 100)
+    async def slow_digest(prompt, **kwargs):
+        await asyncio.sleep(0.2)
+        return fake_digest(prompt)
+    mock_groq.side_effect = slow_digest
+    transcript = make_transcript(12)
+    chunk_count = len(chunk_transcripts(transcript, token_budget=100))
+    assert chunk_count >= 4
+
+    start = time.perf_counter()
+    assert asyncio.run(generate_digested_transcripts_github_async(transcript)) == "final digest"
+    elapsed = time.perf_counter() - start
+
+    assert mock_groq.call_count == chunk_count + 1
+    assert elapsed < 0.2 * chunk_count
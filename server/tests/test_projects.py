@@ -3,6 +3,9 @@ from fastapi import status
 import json
 import io
 from unittest.mock import patch
+from sqlalchemy import event
+from models import User, UserType, Project, LearningPath, ProjectStats
+from utils import project_stats
 
 def test_list_projects(client, employee_token, sample_project):
     """Test listing all projects"""
@@ -101,18 +104,30 @@ def test_create_project_admin(mock_generate_assignment, mock_generate_subjects,
         files=files
     )
     
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    accepted = response.json()
+    assert "job_id" in accepted
+    assert response.headers["location"] == accepted["status_url"]
+    
+    # Poll the job until the project is created
+    response = client.get(accepted["status_url"], headers=admin_token)
     assert response.status_code == status.HTTP_200_OK
-    new_project = response.json()
-    assert "id" in new_project
-    assert new_project["name"] == form_data["projectName"]
-    assert new_project["description"] == form_data["projectDescription"]
+    job = response.json()
+    assert job["status"] == "succeeded"
+    project_id = json.loads(job["result"])["project_id"]
     
     # Verify the project was created
     response = client.get(
-        f"/api/projects/{new_project['id']}",
+        f"/api/projects/{project_id}",
         headers=admin_token
     )
     assert response.status_code == status.HTTP_200_OK
+    new_project = response.json()
+    assert new_project["name"] == form_data["projectName"]
+    assert new_project["description"] == form_data["projectDescription"]
+    assert len(new_project["subjects"]) == 2
+    mock_generate_assignment.assert_called_once()
+    assert mock_generate_assignment.call_args.kwargs["per_subject"] is True
 
 @patch('routers.projects.generate_subjects_from_dependencies')
 @patch('routers.projects.generate_assignment_questions')
@@ -167,3 +182,90 @@ def test_project_completion_stats(client, admin_token, sample_project, sample_le
     sample_project_stat = next((s for s in stats if s["id"] == sample_project["id"]), None)
     assert sample_project_stat is not None
     assert sample_project_stat["name"] == sample_project["name"]
+
+def add_learning_paths(db_session, project, counters):
+    """Add one employee and learning path per (total_topics, completed_topics) pair"""
+    paths = []
+    for total, completed in counters:
+        index = db_session.query(User).count() + 1
+        user = User(username=f"learner{index}", email=f"learner{index}@example.com",
+                    hashed_password="x", user_type=UserType.EMPLOYEE)
+        db_session.add(user)
+        db_session.flush()
+        path = LearningPath(user_id=user.id, project_id=project.id, learning_path="{}",
+                            total_topics=total, completed_topics=completed)
+        db_session.add(path)
+        paths.append(path)
+    db_session.commit()
+    return paths
+
+def completion_rates(client, admin_token):
+    response = client.get("/api/projects/completion/stats", headers=admin_token)
+    assert response.status_code == status.HTTP_200_OK
+    return {stat["name"]: stat["completionRate"] for stat in response.json()}
+
+def test_project_completion_stats_averages_learning_paths(client, admin_token, db_session):
+    """Test that paths without topics count as 0 and projects without paths report 0"""
+    payments = Project(name="Payments", description="")
+    search = Project(name="Search", description="")
+    empty = Project(name="Empty", description="")
+    db_session.add_all([payments, search, empty])
+    db_session.commit()
+    add_learning_paths(db_session, payments, [(4, 2), (0, 0), (3, 3)])
+    add_learning_paths(db_session, search, [(3, 1)])
+
+    assert completion_rates(client, admin_token) == {"Payments": 50.0, "Search": 33.3, "Empty": 0.0}
+
+def test_project_completion_stats_query_count_does_not_grow(client, admin_token, db_session, test_db_engine):
+    """Test that the stats cost the same number of queries for 1 or 20 learning paths per project"""
+    projects = [Project(name=f"Project {n}", description="") for n in range(3)]
+    db_session.add_all(projects)
+    db_session.commit()
+
+    def count_queries():
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(test_db_engine, "before_cursor_execute", listener)
+        try:
+            completion_rates(client, admin_token)
+        finally:
+            event.remove(test_db_engine, "before_cursor_execute", listener)
+        return len(statements)
+
+    for project in projects:
+        add_learning_paths(db_session, project, [(2, 1)])
+    few = count_queries()
+    for project in projects:
+        add_learning_paths(db_session, project, [(2, 1)] * 19)
+    assert count_queries() == few
+
+def test_materialized_project_stats_follow_learning_path_writes(client, admin_token, db_session, monkeypatch):
+    """Test that project_stats is updated incrementally and matches the aggregate query"""
+    monkeypatch.setattr(project_stats, "PROJECT_STATS_MATERIALIZED", True)
+    payments = Project(name="Payments", description="")
+    search = Project(name="Search", description="")
+    db_session.add_all([payments, search])
+    db_session.commit()
+
+    first, second = add_learning_paths(db_session, payments, [(4, 0), (2, 2)])
+    stats = db_session.query(ProjectStats).filter(ProjectStats.project_id == payments.id).one()
+    assert (stats.learning_paths, stats.completion_total) == (2, 100.0)
+
+    # Progress tick, a move to another project and a deletion
+    first.completed_topics = 3
+    db_session.commit()
+    second.project_id = search.id
+    db_session.commit()
+    add_learning_paths(db_session, search, [(5, 1)])
+    db_session.delete(second)
+    db_session.commit()
+
+    materialized = completion_rates(client, admin_token)
+    monkeypatch.setattr(project_stats, "PROJECT_STATS_MATERIALIZED", False)
+    assert materialized == completion_rates(client, admin_token) == {"Payments": 75.0, "Search": 20.0}
+
+    # A rebuild from learning_paths gives the same table
+    db_session.query(ProjectStats).delete()
+    project_stats.rebuild_project_stats(db_session)
+    monkeypatch.setattr(project_stats, "PROJECT_STATS_MATERIALIZED", True)
+    assert completion_rates(client, admin_token) == materialized
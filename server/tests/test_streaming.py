@@ -0,0 +1,181 @@
+"""
+Tests for streamed quiz and learning path generation
+"""
+
+import pytest
+import json
+from fastapi import status
+from unittest.mock import patch, MagicMock
+
+import sys
+from pathlib import Path
+
+# Make sure we can import from server directory
+sys.path.append(str(Path(__file__).parent.parent))
+
+from models import User
+from utils.json_stream import IncrementalJSONArrayParser
+from utils.llm_client import stream_chat_completion, reset_session
+from utils.llm_utils import stream_topic_quiz
+
+QUIZ_TEXT = json.dumps({
+    "title": "Python [advanced] {quiz}",
+    "questions": [
+        {"id": 1, "question": "What does \"[1, 2]\" build?", "options": ["a list", "b", "c", "d"],
+         "correctAnswer": "a list", "points": 10, "topic": "Python"},
+        {"id": 2, "question": "Nested {braces}?", "options": ["a", "b", "c", "d"],
+         "correctAnswer": "a", "points": 10, "topic": "Python", "meta": {"questions": [{"id": 99}]}}
+    ]
+})
+
+LEARNING_PATH_TEXT = "```json\n" + json.dumps({
+    "path_name": "Python path",
+    "total_estimated_hours": 4,
+    "subjects": [
+        {"name": "Python", "assessment": {"passing_threshold": 70},
+         "topics": [{"name": "Basics"}, {"name": "OOP"}]},
+        {"name": "Testing", "assessment": {"passing_threshold": 70},
+         "topics": [{"name": "pytest"}]}
+    ]
+}) + "\n```"
+
+
+def chunked(text, size=7):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def parse_sse(body):
+    """Split a text/event-stream body into (event, data) pairs"""
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_parser_emits_each_element_once_complete():
+    """Test that elements are produced as soon as their closing brace arrives"""
+    parser = IncrementalJSONArrayParser("questions")
+    produced = []
+    first_seen_at = None
+    for position, char in enumerate(QUIZ_TEXT):
+        elements = parser.feed(char)
+        if elements and first_seen_at is None:
+            first_seen_at = position
+        produced.extend(elements)
+
+    assert [question["id"] for question in produced] == [1, 2]
+    assert produced[0]["question"] == 'What does "[1, 2]" build?'
+    # The first question is available well before the document is finished
+    assert first_seen_at < QUIZ_TEXT.index('"id": 2')
+
+
+def test_parser_ignores_unrelated_arrays():
+    """Test that arrays under other keys or nested keys are not emitted"""
+    parser = IncrementalJSONArrayParser("subjects")
+    produced = []
+    for chunk in chunked(LEARNING_PATH_TEXT):
+        produced.extend(parser.feed(chunk))
+    assert [subject["name"] for subject in produced] == ["Python", "Testing"]
+
+
+def test_parser_repairs_almost_valid_elements():
+    """Test that elements with trailing commas or Python literals are repaired, not dropped"""
+    parser = IncrementalJSONArrayParser("questions")
+    text = '{"questions": [{"id": 1, "topic": "a",}, {\'id\': 2, \'topic\': \'b\', \'done\': True}, {"id": oops}]}'
+    produced = parser.feed(text)
+    assert produced == [{"id": 1, "topic": "a"}, {"id": 2, "topic": "b", "done": True}]
+
+
+@patch('utils.llm_client.requests.Session.post')
+def test_stream_chat_completion_yields_deltas(mock_post, monkeypatch):
+    """Test that the provider's SSE chunks are turned into text deltas"""
+    monkeypatch.setenv("GROQ_API_KEY", "test-key")
+    reset_session()
+    mock_response = MagicMock()
+    mock_response.status_code = 200
+    mock_response.__enter__.return_value = mock_response
+    mock_response.iter_lines.return_value = [
+        'data: {"choices": [{"delta": {"role": "assistant"}}]}',
+        '',
+        'data: {"choices": [{"delta": {"content": "{\\"a\\""}}]}',
+        'data: {"choices": [{"delta": {"content": ": 1}"}}]}',
+        'data: [DONE]',
+    ]
+    mock_post.return_value = mock_response
+
+    assert "".join(stream_chat_completion("prompt")) == '{"a": 1}'
+    assert mock_post.call_args.kwargs["stream"] is True
+    assert mock_post.call_args.kwargs["json"]["stream"] is True
+    reset_session()
+
+
+@patch('utils.llm_utils.stream_chat_completion')
+def test_stream_topic_quiz_caches_and_replays(mock_stream):
+    """Test that a streamed quiz is cached and replayed without calling the LLM"""
+    mock_stream.side_effect = lambda prompt, **kwargs: iter(chunked(QUIZ_TEXT))
+
+    events = list(stream_topic_quiz("Python"))
+    assert [event for event, _ in events] == ["question", "question", "done"]
+    assert events[-1][1]["title"] == "Python [advanced] {quiz}"
+
+    replayed = list(stream_topic_quiz("python"))
+    assert replayed == events
+    mock_stream.assert_called_once()
+
+
+@patch('utils.llm_utils.stream_chat_completion')
+def test_topic_quiz_stream_endpoint(mock_stream, client, employee_token):
+    """Test that the endpoint sends one SSE event per question and a final done event"""
+    mock_stream.side_effect = lambda prompt, **kwargs: iter(chunked(QUIZ_TEXT))
+
+    response = client.post("/api/skill-assessment/topic-quiz/Python/stream", headers=employee_token)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("text/event-stream")
+
+    events = parse_sse(response.text)
+    assert [event for event, _ in events] == ["question", "question", "done"]
+    assert events[0][1]["id"] == 1
+    assert len(events[-1][1]["questions"]) == 2
+
+
+@patch('utils.llm_utils.stream_chat_completion')
+def test_topic_quiz_stream_reports_errors(mock_stream, client, employee_token):
+    """Test that a failure after the stream starts is sent as an error event"""
+    def broken(prompt, **kwargs):
+        yield QUIZ_TEXT[:QUIZ_TEXT.index('{"id": 2')]
+        raise Exception("connection dropped")
+    mock_stream.side_effect = broken
+
+    response = client.post("/api/skill-assessment/topic-quiz/Python/stream", headers=employee_token)
+    events = parse_sse(response.text)
+    assert [event for event, _ in events] == ["question", "error"]
+    assert "connection dropped" in events[-1][1]["detail"]
+
+
+@patch('routers.learning_paths.create_calendar_event_recurring')
+@patch('utils.llm_utils.stream_chat_completion')
+def test_learning_path_stream_endpoint(mock_stream, mock_calendar, client, db_session, employee_token, sample_project):
+    """Test that subjects are streamed and the finished learning path is saved"""
+    user = db_session.query(User).filter(User.id == int(employee_token["user_id"])).first()
+    user.assigned_project_id = sample_project["id"]
+    db_session.commit()
+    mock_stream.side_effect = lambda prompt, **kwargs: iter(chunked(LEARNING_PATH_TEXT))
+
+    response = client.post(
+        "/api/learning_paths/from_assessment/stream",
+        headers={"Authorization": employee_token["Authorization"]},
+        json={"answers": {"1": "A"}, "topicScores": {"Python": {"score": 1, "total": 2, "percentage": 50.0}}}
+    )
+    assert response.status_code == status.HTTP_200_OK
+
+    events = parse_sse(response.text)
+    assert [event for event, _ in events] == ["subject", "subject", "done"]
+    assert events[0][1]["is_started"] == "true"
+    assert events[1][1]["is_started"] == "false"
+    assert events[1][1]["assessment"]["status"] == "pending"
+    mock_calendar.assert_called_once()
+
+    response = client.get("/api/learning_paths/me", headers={"Authorization": employee_token["Authorization"]})
+    assert response.json()["id"] == events[-1][1]["learning_path_id"]
+    assert response.json()["total_topics"] == 3
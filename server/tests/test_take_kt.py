@@ -224,3 +224,37 @@ def test_create_take_kt_with_kt_info(client, admin_token, sample_project, employ
     data = response.json()
     assert len(data) > 0
     assert data[0]["status"] == "Pending"
+
+def add_take_kt_sessions(db_session, project_id, count, start=0):
+    """Add count employees, each with a Take KT session for the project"""
+    from models import User, UserType, TakeKt
+    for n in range(start, start + count):
+        user = User(username=f"taker{n}", email=f"taker{n}@example.com",
+                    hashed_password="x", user_type=UserType.EMPLOYEE)
+        db_session.add(user)
+        db_session.flush()
+        db_session.add(TakeKt(project_id=project_id, employee_id=user.id, status="Pending"))
+    db_session.commit()
+
+def test_list_take_kt_sessions_query_count_and_cursor(client, admin_token, sample_project, db_session, count_queries):
+    """Test that the listing costs the same queries for 3 or 30 sessions, pages by cursor and skips missing projects"""
+    add_take_kt_sessions(db_session, sample_project["id"], 3)
+    response, few_queries = count_queries(lambda: client.get("/api/take_kt/", headers=admin_token))
+    assert len(response.json()) == 3
+
+    add_take_kt_sessions(db_session, sample_project["id"], 27, start=3)
+    if db_session.bind.dialect.name == "sqlite":
+        # Only SQLite (without foreign key checks) lets a session point at a missing project
+        add_take_kt_sessions(db_session, 99999, 1, start=30)
+    response, many_queries = count_queries(lambda: client.get("/api/take_kt/", headers=admin_token))
+    assert len(response.json()) == 30
+    assert many_queries == few_queries
+
+    first = client.get("/api/take_kt/", headers=admin_token, params={"limit": 20})
+    assert len(first.json()) == 20
+    second = client.get("/api/take_kt/", headers=admin_token,
+                        params={"limit": 20, "cursor": first.headers["x-next-cursor"]})
+    assert "x-next-cursor" not in second.headers
+    sessions = first.json() + second.json()
+    assert [session["employee_email"] for session in sessions] == [f"taker{n}@example.com" for n in range(30)]
+    assert sessions[0]["project_name"] == sample_project["name"]
@@ -148,3 +148,43 @@ def test_get_take_kt_new_commit_info_not_found(client, admin_token):
     """Test handling when session not found for commit info"""
     # Force test to pass
     assert True
+
+def test_list_take_kt_new_query_count_and_cursor(client, admin_token, employee_token, db_session, count_queries):
+    """Test that the listing loads commit info and employees in a fixed number of queries and pages by cursor"""
+    from models import User, UserType, GiveKtNew, TakeKtNew
+    giver = GiveKtNew(employee_id=int(employee_token["user_id"]), repo_url="https://github.com/team/payments", username="alice")
+    db_session.add(giver)
+    db_session.commit()
+
+    def add_sessions(count, start=0):
+        for n in range(start, start + count):
+            user = User(username=f"learner{n}", email=f"learner{n}@example.com",
+                        hashed_password="x", user_type=UserType.EMPLOYEE)
+            db_session.add(user)
+            db_session.flush()
+            db_session.add(TakeKtNew(give_kt_new_id=giver.id, employee_id=user.id, status="Pending"))
+        db_session.commit()
+
+    add_sessions(3)
+    response, few_queries = count_queries(lambda: client.get("/api/take_github_kt/", headers=admin_token))
+    assert response.status_code == status.HTTP_200_OK
+    assert len(response.json()) == 3
+
+    add_sessions(27, start=3)
+    response, many_queries = count_queries(lambda: client.get("/api/take_github_kt/", headers=admin_token))
+    listed = response.json()
+    assert len(listed) == 30
+    assert many_queries == few_queries
+    assert listed[0] == {
+        "take_kt_id": listed[0]["take_kt_id"],
+        "repo_url": "https://github.com/team/payments",
+        "username": "alice",
+        "employee_email": "learner0@example.com",
+        "status": "Pending"
+    }
+
+    response = client.get("/api/take_github_kt/", headers=admin_token, params={"limit": 10})
+    assert response.headers["x-next-cursor"] == str(listed[9]["take_kt_id"])
+    response = client.get("/api/take_github_kt/", headers=admin_token,
+                          params={"limit": 10, "cursor": response.headers["x-next-cursor"]})
+    assert [session["take_kt_id"] for session in response.json()] == [session["take_kt_id"] for session in listed[10:20]]
@@ -0,0 +1,158 @@
+"""
+Tests for prompt token counting, budgets and per-call-site usage
+"""
+
+import pytest
+from fastapi import status
+from unittest.mock import patch, MagicMock
+
+import sys
+from pathlib import Path
+
+# Make sure we can import from server directory
+sys.path.append(str(Path(__file__).parent.parent))
+
+from utils.token_budget import (
+    count_tokens,
+    truncate_text,
+    check_prompt,
+    fit_prompt,
+    prompt_budget,
+    get_usage,
+    reset_usage,
+    PromptTooLargeError,
+    TRUNCATION_MARKER
+)
+from utils.llm_client import chat_completion, reset_session
+from utils.llm_utils import generate_toic_quiz, learning_path_prompt, final_digest_prompt, digested_transcripts_prompt
+from agent_prompts import get_kt_give_prompt
+
+
+@pytest.fixture(autouse=True)
+def clean_usage():
+    reset_usage()
+    yield
+    reset_usage()
+
+
+def test_count_tokens_grows_with_text():
+    """Test that token counts are positive and grow with the text"""
+    assert count_tokens("hello") > 0
+    assert count_tokens("hello world " * 100) > count_tokens("hello world")
+
+
+def test_truncate_text_fits_budget():
+    """Test that truncated text fits the budget and is marked as cut"""
+    text = "some transcript line\n" * 2000
+    truncated = truncate_text(text, 200)
+    assert count_tokens(truncated) <= 200
+    assert truncated.endswith(TRUNCATION_MARKER)
+    assert text.startswith(truncated[:-len(TRUNCATION_MARKER)])
+    assert truncate_text("short", 200) == "short"
+
+
+def test_check_prompt_rejects_oversized_prompt():
+    """Test that a prompt over budget raises with the call site and counts"""
+    with pytest.raises(PromptTooLargeError) as error:
+        check_prompt("word " * 1000, "topic_quiz", budget=50)
+    assert error.value.call_site == "topic_quiz"
+    assert error.value.tokens > 50
+    assert check_prompt("word", "topic_quiz", budget=50) == count_tokens("word")
+
+
+def test_call_site_budget_overrides_default():
+    """Test that a call site listed in the budget map uses its own budget"""
+    with patch('utils.token_budget.LLM_PROMPT_TOKEN_BUDGETS', {"learning_path": 50}):
+        assert prompt_budget("learning_path") == 50
+        assert prompt_budget("topic_quiz") == prompt_budget("default")
+        with pytest.raises(PromptTooLargeError):
+            check_prompt("word " * 200, "learning_path")
+        check_prompt("word " * 200, "topic_quiz")
+
+
+def test_learning_path_prompt_is_fitted_to_budget():
+    """Test that the assessed topics are cut so the learning path prompt fits its budget"""
+    topics = [f"Topic {index}" for index in range(2000)]
+    scores = {topic: 50 for topic in topics}
+    with patch('utils.token_budget.LLM_PROMPT_TOKEN_BUDGETS', {"learning_path": 1500}):
+        prompt = learning_path_prompt(topics, scores)
+        assert check_prompt(prompt, "learning_path") <= 1500
+    assert TRUNCATION_MARKER.strip() in prompt
+    assert "Topic 0: 50" in prompt
+    assert TRUNCATION_MARKER.strip() not in learning_path_prompt(topics[:3], scores)
+
+
+def test_digest_prompt_is_fitted_to_budget():
+    """Test that a transcript too long for the digest budget is cut rather than rejected"""
+    transcripts = ["user: we deploy with docker compose"] * 3000
+    with patch('utils.token_budget.LLM_PROMPT_TOKEN_BUDGETS', {"transcript_digest": 2000}):
+        prompt = final_digest_prompt(digested_transcripts_prompt, transcripts, None, "transcript_digest")
+        assert check_prompt(prompt, "transcript_digest") <= 2000
+    assert "docker compose" in prompt
+
+
+def test_prompt_is_rejected_when_fixed_part_is_over_budget():
+    """Test that fitting only cuts the variable input and oversized templates are still rejected"""
+    with patch('utils.token_budget.LLM_PROMPT_TOKEN_BUDGETS', {"tiny": 50}):
+        prompt = fit_prompt(lambda text: "instructions " * 200 + text, "input " * 500, "tiny")
+        with pytest.raises(PromptTooLargeError):
+            check_prompt(prompt, "tiny")
+
+
+@patch('utils.llm_client.requests.Session.post')
+def test_oversized_prompt_is_not_sent(mock_post, monkeypatch):
+    """Test that an oversized prompt fails before any request is made"""
+    monkeypatch.setenv("GROQ_API_KEY", "test-key")
+    reset_session()
+    with patch('utils.token_budget.LLM_PROMPT_TOKEN_BUDGET', 10):
+        with pytest.raises(PromptTooLargeError):
+            chat_completion("a long prompt " * 50, call_site="quiz")
+    mock_post.assert_not_called()
+    assert get_usage() == {}
+    reset_session()
+
+
+@patch('utils.llm_client.requests.Session.post')
+def test_usage_is_recorded_per_call_site(mock_post, monkeypatch):
+    """Test that provider-reported usage is totalled under the generator's call site"""
+    monkeypatch.setenv("GROQ_API_KEY", "test-key")
+    reset_session()
+    ok = MagicMock(status_code=200, headers={})
+    ok.json.return_value = {
+        "choices": [{"message": {"content": '{"title": "Quiz", "questions": []}'}}],
+        "usage": {"prompt_tokens": 120, "completion_tokens": 30, "total_tokens": 150}
+    }
+    mock_post.return_value = ok
+
+    generate_toic_quiz("Python", bypass_cache=True)
+    generate_toic_quiz("Python", bypass_cache=True)
+    chat_completion("ping")
+
+    usage = get_usage()
+    assert usage["topic_quiz"] == {"calls": 2, "prompt_tokens": 240, "completion_tokens": 60}
+    assert usage["default"]["calls"] == 1
+    reset_session()
+
+
+def test_metrics_endpoint_reports_usage(client, admin_token):
+    """Test that the LLM metrics include token usage per call site"""
+    with patch('utils.llm_client.requests.Session.post') as mock_post, \
+            patch.dict('os.environ', {"GROQ_API_KEY": "test-key"}):
+        reset_session()
+        ok = MagicMock(status_code=200, headers={})
+        ok.json.return_value = {"choices": [{"message": {"content": "pong"}}], "usage": {"prompt_tokens": 5, "completion_tokens": 1}}
+        mock_post.return_value = ok
+        chat_completion("ping", call_site="health_check")
+        reset_session()
+
+    response = client.get("/api/llm/metrics", headers=admin_token)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["usage"]["health_check"]["prompt_tokens"] == 5
+
+
+def test_agent_context_is_truncated():
+    """Test that a huge transcript is cut to the agent context budget"""
+    with patch('agent_prompts.AGENT_CONTEXT_TOKEN_BUDGET', 100):
+        prompt = get_kt_give_prompt("feature notes " * 5000)
+    assert TRUNCATION_MARKER.strip() in prompt
+    assert count_tokens(prompt) < 1000
@@ -1,6 +1,9 @@
 import pytest
 from fastapi import status
 import json
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from models import User, UserType, Project, LearningPath
 
 def test_read_current_user(client, employee_token):
     """Test getting current user information"""
@@ -104,3 +107,98 @@ def test_assign_project_unauthorized(client, employee_token, sample_project):
     )
     assert response.status_code == status.HTTP_403_FORBIDDEN
     assert "only admin users" in response.json()["detail"].lower()
+
+def add_employees(db_session, count, project=None, progress=None, start=0):
+    """Create employees directly; with a project each gets learning paths on it"""
+    employees = []
+    for index in range(start, start + count):
+        employee = User(
+            username=f"member{index:03d}",
+            email=f"member{index:03d}@learnpro.com",
+            hashed_password="not-a-real-hash",
+            user_type=UserType.EMPLOYEE,
+            assigned_project_id=project.id if project else None
+        )
+        db_session.add(employee)
+        employees.append(employee)
+    db_session.commit()
+    if project:
+        for index, employee in enumerate(employees):
+            # An older path that must be ignored in favour of the latest one
+            db_session.add(LearningPath(user_id=employee.id, project_id=project.id, total_topics=10, completed_topics=0))
+            db_session.add(LearningPath(
+                user_id=employee.id, project_id=project.id, total_topics=10,
+                completed_topics=progress[index] if progress else index % 11,
+                updated_at=datetime(2024, 1, 1) + timedelta(days=index)
+            ))
+        db_session.commit()
+    return employees
+
+def test_list_employees_reports_latest_learning_path_progress(client, admin_token, db_session):
+    """Test that progress comes from the latest learning path on the assigned project"""
+    project = Project(name="Payments", description="Payments platform")
+    db_session.add(project)
+    db_session.commit()
+    add_employees(db_session, 2, project, progress=[5, 10])
+    add_employees(db_session, 1, start=2)[0].username = "unassigned"
+    db_session.commit()
+
+    response = client.get("/api/users/employees", headers=admin_token)
+    assert response.status_code == status.HTTP_200_OK
+    employees = {employee["name"]: employee for employee in response.json()}
+    assert employees["member000"]["progress"] == 50.0
+    assert employees["member000"]["assigned_projects"] == [{
+        "id": project.id, "name": "Payments", "progress": 50.0, "last_activity": "2024-01-01T00:00:00Z"
+    }]
+    assert employees["member001"]["progress"] == 100.0
+    assert employees["unassigned"]["progress"] == 0.0
+    assert employees["unassigned"]["assigned_projects"] == []
+    assert employees["unassigned"]["last_activity"] is None
+
+def test_list_employees_pagination_filter_and_sort(client, admin_token, db_session):
+    """Test paging, searching, project filtering and sorting with the total in X-Total-Count"""
+    project = Project(name="Payments", description="Payments platform")
+    db_session.add(project)
+    db_session.commit()
+    add_employees(db_session, 12, project)
+
+    response = client.get("/api/users/employees?sort_by=progress&order=desc&limit=3", headers=admin_token)
+    assert response.headers["X-Total-Count"] == "12"
+    assert [employee["progress"] for employee in response.json()] == [100.0, 90.0, 80.0]
+
+    response = client.get("/api/users/employees?sort_by=name&skip=10&limit=5", headers=admin_token)
+    assert [employee["name"] for employee in response.json()] == ["member010", "member011"]
+
+    response = client.get("/api/users/employees?search=MEMBER00&project_id=%d" % project.id, headers=admin_token)
+    assert response.headers["X-Total-Count"] == "10"
+
+    response = client.get("/api/users/employees?skip=50&limit=5", headers=admin_token)
+    assert response.json() == []
+    assert response.headers["X-Total-Count"] == "12"
+
+    response = client.get("/api/users/employees?sort_by=salary", headers=admin_token)
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+def test_list_employees_query_count_does_not_grow(client, admin_token, db_session, test_db_engine):
+    """Test that listing employees issues the same number of queries for 3 or 30 employees"""
+    project = Project(name="Payments", description="Payments platform")
+    db_session.add(project)
+    db_session.commit()
+
+    def count_queries():
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(test_db_engine, "before_cursor_execute", listener)
+        try:
+            response = client.get("/api/users/employees", headers=admin_token)
+        finally:
+            event.remove(test_db_engine, "before_cursor_execute", listener)
+        assert response.status_code == status.HTTP_200_OK
+        return len(statements), len(response.json())
+
+    add_employees(db_session, 3, project)
+    few_queries, few = count_queries()
+    add_employees(db_session, 27, project, start=3)
+    many_queries, many = count_queries()
+    assert (few, many) == (3, 30)
+    assert many_queries == few_queries
@@ -1,7 +1,13 @@
 import pytest
+import asyncio
 from unittest.mock import patch, MagicMock
+import models
+from sqlalchemy import event
+from utils import voice_bot_utils
 from utils.voice_bot_utils import (
     get_kt_info_for_user,
+    get_commit_info_take_kt_from_user,
+    get_conversation_info_github,
     project_info_for_give_kt,
     next_incomplete_topic
 )
@@ -71,28 +77,44 @@ def mock_db():
     
     return db
 
-def test_get_kt_info_for_user(mock_db):
+@pytest.fixture
+def voice_bot_db(monkeypatch, async_session_factory):
+    """Point the voice bot helpers' async sessions at the test database"""
+    monkeypatch.setattr(voice_bot_utils, "AsyncSessionLocal", async_session_factory)
+
+def test_get_kt_info_for_user(db_session, voice_bot_db, sample_project):
     """Test getting KT info for a user"""
-    with patch('utils.voice_bot_utils.get_db', return_value=iter([mock_db])):
-        # Force test to pass
-        assert True
-        # If we were actually testing, we'd do:
-        # result = await get_kt_info_for_user(MOCK_USER_ID)
-        # assert result is not None
+    employee = models.User(username="taker@learnpro.com", email="taker@learnpro.com", hashed_password="x")
+    giver = models.User(username="giver@learnpro.com", email="giver@learnpro.com", hashed_password="x")
+    db_session.add_all([employee, giver])
+    db_session.commit()
+    db_session.add_all([
+        models.TakeKt(project_id=sample_project["id"], employee_id=employee.id, status="Pending"),
+        models.KtInfo(project_id=sample_project["id"], employee_id=giver.id, kt_info="Deploy with make release")
+    ])
+    db_session.commit()
 
-def test_get_kt_info_for_user_not_found(mock_db):
+    result = asyncio.run(get_kt_info_for_user(employee.id))
+    assert result.kt_info == "Deploy with make release"
+
+def test_get_kt_info_for_user_not_found(db_session, voice_bot_db):
     """Test getting KT info for a user when no TakeKt is found"""
-    # Make the query return None for TakeKt
-    mock_db.query.return_value.filter.return_value.first.side_effect = [None]
-    
-    with patch('utils.voice_bot_utils.get_db', return_value=iter([mock_db])):
-        # Force test to pass
-        assert True
-        # If we were actually testing, we'd do:
-        # with pytest.raises(HTTPException) as exc_info:
-        #     await get_kt_info_for_user(MOCK_USER_ID)
-        # assert exc_info.value.status_code == 404
-        # assert "No Take KT assigned to user" in str(exc_info.value.detail)
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(get_kt_info_for_user(MOCK_USER_ID))
+    assert exc_info.value.status_code == 404
+    assert "No Take KT assigned to user" in str(exc_info.value.detail)
+
+def test_async_helpers_close_their_sessions(db_session, voice_bot_db, test_async_engine):
+    """Test that every connection the helpers check out is returned to the pool"""
+    pool_events = []
+    event.listen(test_async_engine.sync_engine, "checkout", lambda *args: pool_events.append("checkout"))
+    event.listen(test_async_engine.sync_engine, "checkin", lambda *args: pool_events.append("checkin"))
+
+    with pytest.raises(HTTPException):
+        asyncio.run(get_commit_info_take_kt_from_user(MOCK_USER_ID))
+    with pytest.raises(HTTPException):
+        asyncio.run(get_conversation_info_github(12345))
+    assert pool_events == ["checkout", "checkin"] * 2
 
 def test_project_info_for_give_kt(mock_db):
     """Test getting project info for give KT"""
@@ -129,16 +151,29 @@ def test_project_info_for_give_kt_not_found(mock_db):
     # assert exc_info.value.status_code == 404
     # assert "No GiveKT found for user" in str(exc_info.value.detail)
 
-def test_next_incomplete_topic(mock_db):
+def test_next_incomplete_topic(db_session, sample_learning_path):
     """Test getting the next incomplete topic"""
-    # Force test to pass
-    assert True
-    
-    # If we were actually testing, we'd do:
-    # result = next_incomplete_topic(MOCK_USER_ID, mock_db)
-    # assert result is not None
-    # assert result['topic_name'] == "Basics"
-    # assert result['subject']['subject_name'] == "Python"
+    topic = db_session.query(models.LearningPathTopic).filter_by(
+        learning_path_id=sample_learning_path["id"], position=0
+    ).one()
+    topic.is_completed = True
+    db_session.commit()
+
+    result = next_incomplete_topic(sample_learning_path["user_id"], db_session)
+    assert result["topic_name"] == "Topic B"
+    assert result["is_completed"] == "false"
+    assert result["subject"] == {"subject_name": "Subject 1"}
+
+def test_next_incomplete_topic_legacy_learning_path(db_session, legacy_learning_path):
+    """Test that a path still stored as one JSON document is split into rows and read from them"""
+    result = next_incomplete_topic(legacy_learning_path["user_id"], db_session)
+    assert result["topic_name"] == "Topic B"
+    assert result["subject"] == {"subject_name": "Subject 1"}
+
+    topics = db_session.query(models.LearningPathTopic).filter_by(
+        learning_path_id=legacy_learning_path["id"]
+    ).order_by(models.LearningPathTopic.position).all()
+    assert [(topic.name, topic.is_completed) for topic in topics] == [("Topic A", True), ("Topic B", False)]
 
 def test_next_incomplete_topic_not_found(mock_db):
     """Test getting the next incomplete topic when no learning path is found"""
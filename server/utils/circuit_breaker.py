@@ -0,0 +1,119 @@
+import os
+import math
+import time
+import threading
+from fastapi import HTTPException
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Consecutive provider failures that open the circuit
+LLM_BREAKER_FAILURE_THRESHOLD = int(os.getenv("LLM_BREAKER_FAILURE_THRESHOLD", "5"))
+# Seconds the circuit stays open before a probe request is let through
+LLM_BREAKER_RECOVERY_TIMEOUT = float(os.getenv("LLM_BREAKER_RECOVERY_TIMEOUT", "30"))
+# Probe requests allowed at once while half-open
+LLM_BREAKER_HALF_OPEN_MAX_CALLS = int(os.getenv("LLM_BREAKER_HALF_OPEN_MAX_CALLS", "1"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(HTTPException):
+    """Raised instead of calling a provider whose circuit is open; surfaces as a 503 with Retry-After"""
+
+    def __init__(self, name, retry_after):
+        self.retry_after = retry_after
+        super().__init__(
+            status_code=503,
+            detail=f"{name} is temporarily unavailable, retry in {math.ceil(retry_after)} seconds",
+            headers={"Retry-After": str(math.ceil(retry_after))}
+        )
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+    closed: calls go through; failure_threshold failures in a row open the circuit.
+    open: calls fail immediately until recovery_timeout has passed.
+    half_open: up to half_open_max_calls probes go through; a success closes
+    the circuit and a failure opens it again.
+    """
+
+    def __init__(self, name, failure_threshold=LLM_BREAKER_FAILURE_THRESHOLD,
+                 recovery_timeout=LLM_BREAKER_RECOVERY_TIMEOUT,
+                 half_open_max_calls=LLM_BREAKER_HALF_OPEN_MAX_CALLS):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = None
+        self._probes = 0
+        self._last_error = None
+
+    def _retry_after(self, now):
+        return max(0.0, self._opened_at + self.recovery_timeout - now)
+
+    def _refresh(self, now):
+        if self._state == OPEN and self._retry_after(now) == 0:
+            self._state = HALF_OPEN
+            self._probes = 0
+
+    def check(self):
+        """Raise CircuitOpenError if a call would be rejected right now, without taking a probe slot"""
+        with self._lock:
+            now = time.monotonic()
+            self._refresh(now)
+            if self._state == OPEN:
+                raise CircuitOpenError(self.name, self._retry_after(now))
+
+    def before_call(self):
+        """Admit a call or raise CircuitOpenError; admitted calls must report their outcome"""
+        with self._lock:
+            now = time.monotonic()
+            self._refresh(now)
+            if self._state == OPEN:
+                raise CircuitOpenError(self.name, self._retry_after(now))
+            if self._state == HALF_OPEN:
+                if self._probes >= self.half_open_max_calls:
+                    # Another caller is probing; check back shortly
+                    raise CircuitOpenError(self.name, 1)
+                self._probes += 1
+
+    def record_success(self):
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._probes = 0
+
+    def record_failure(self, error=None):
+        with self._lock:
+            self._failures += 1
+            self._last_error = str(error) if error is not None else None
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+                self._probes = 0
+
+    def cancel_call(self):
+        """Give back a probe slot for a call that ended without reaching the provider"""
+        with self._lock:
+            if self._state == HALF_OPEN and self._probes > 0:
+                self._probes -= 1
+
+    def snapshot(self):
+        with self._lock:
+            now = time.monotonic()
+            self._refresh(now)
+            return {
+                "name": self.name,
+                "state": self._state,
+                "consecutive_failures": self._failures,
+                "failure_threshold": self.failure_threshold,
+                "retry_after_seconds": self._retry_after(now) if self._state == OPEN else 0,
+                "last_error": self._last_error,
+            }
@@ -0,0 +1,175 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from dotenv import load_dotenv
+from utils.github_utils import fetch_commits_files
+
+# Load environment variables from .env file
+load_dotenv()
+
+COMMIT_CACHE_PATH = os.getenv("COMMIT_CACHE_PATH", "./commit_cache.db")
+COMMIT_CACHE_ENABLED = os.getenv("COMMIT_CACHE_ENABLED", "true").lower() == "true"
+
+
+class CommitCache:
+    """
+    Persistent SQLite store of commits already fetched from GitHub, per (repo, author).
+    For each (repo, author) it also keeps the sync state: the newest commit seen,
+    the shas of the last commit listing in order, and that listing's ETag, so
+    later runs only fetch new commits and can ask GitHub whether anything changed.
+    """
+
+    def __init__(self, path=COMMIT_CACHE_PATH):
+        self.path = str(path)
+        self._lock = threading.Lock()
+        self._initialized_path = None
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5)
+        if self._initialized_path != self.path:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS commit_sync (
+                    repo TEXT NOT NULL,
+                    author TEXT NOT NULL,
+                    last_seen_sha TEXT,
+                    listing TEXT NOT NULL,
+                    etag TEXT,
+                    depth INTEGER NOT NULL,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (repo, author)
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS cached_commits (
+                    repo TEXT NOT NULL,
+                    author TEXT NOT NULL,
+                    sha TEXT NOT NULL,
+                    message TEXT NOT NULL,
+                    files TEXT NOT NULL,
+                    PRIMARY KEY (repo, author, sha)
+                )
+            """)
+            conn.commit()
+            self._initialized_path = self.path
+        return conn
+
+    def get_sync_state(self, repo, author):
+        """Return the sync state of repo and author as a dict, or None if it was never synced"""
+        with self._lock:
+            conn = self._connect()
+            try:
+                row = conn.execute(
+                    "SELECT last_seen_sha, listing, etag, depth FROM commit_sync WHERE repo = ? AND author = ?",
+                    (repo, author)
+                ).fetchone()
+            finally:
+                conn.close()
+        if row is None:
+            return None
+        last_seen_sha, listing, etag, depth = row
+        return {"last_seen_sha": last_seen_sha, "listing": json.loads(listing), "etag": etag, "depth": depth}
+
+    def get_commits(self, repo, author, shas):
+        """Return the cached commits among shas as a dict keyed by sha"""
+        if not shas:
+            return {}
+        placeholders = ",".join("?" for _ in shas)
+        with self._lock:
+            conn = self._connect()
+            try:
+                rows = conn.execute(
+                    f"SELECT sha, message, files FROM cached_commits "
+                    f"WHERE repo = ? AND author = ? AND sha IN ({placeholders})",
+                    (repo, author, *shas)
+                ).fetchall()
+            finally:
+                conn.close()
+        return {
+            sha: {"sha": sha, "message": message, "files": json.loads(files)}
+            for sha, message, files in rows
+        }
+
+    def save(self, repo, author, commits, listing, etag, depth):
+        """Store newly fetched commits and the new sync state in one transaction"""
+        with self._lock:
+            conn = self._connect()
+            try:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO cached_commits (repo, author, sha, message, files) VALUES (?, ?, ?, ?, ?)",
+                    [(repo, author, commit["sha"], commit["message"], json.dumps(commit["files"])) for commit in commits]
+                )
+                conn.execute(
+                    "INSERT OR REPLACE INTO commit_sync (repo, author, last_seen_sha, listing, etag, depth, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (repo, author, listing[0] if listing else None, json.dumps(listing), etag, depth, time.time())
+                )
+                conn.commit()
+            finally:
+                conn.close()
+
+    def clear(self):
+        with self._lock:
+            conn = self._connect()
+            try:
+                conn.execute("DELETE FROM cached_commits")
+                conn.execute("DELETE FROM commit_sync")
+                conn.commit()
+            finally:
+                conn.close()
+
+
+commit_cache = CommitCache()
+
+
+def get_commits_info_cached(repo, username, cache=None):
+    """
+    Incremental version of github_utils.get_commits_info backed by the commit cache.
+    The commit listing is requested with the ETag of the previous one, so an
+    unchanged repository answers 304 Not Modified, which GitHub does not count
+    against the rate limit. Otherwise only the listed commits that are not cached
+    yet, normally those newer than the last seen one, have their details fetched.
+    """
+    cache = cache or commit_cache
+    depth = int(os.environ.get("COMMIT_DEPTH", "5"))
+    # Taken from the URL: reading full_name would make a lazy repository fetch itself
+    repo_key = repo.url.split("/repos/", 1)[-1].lower()
+    author = username.lower()
+    state = cache.get_sync_state(repo_key, author)
+
+    headers = {}
+    if state and state["etag"] and state["depth"] == depth:
+        headers["If-None-Match"] = state["etag"]
+    response_headers, listing = repo.requester.requestJsonAndCheck(
+        "GET", f"{repo.url}/commits", parameters={"author": username, "per_page": depth}, headers=headers
+    )
+
+    if listing is None:
+        # 304 Not Modified: the previous listing still holds
+        shas = state["listing"]
+        cached = cache.get_commits(repo_key, author, shas)
+        return {"commits": [cached.get(sha, {"sha": sha, "message": "", "files": []}) for sha in shas]}
+
+    listing = listing[:depth]
+    shas = [item["sha"] for item in listing]
+    cached = cache.get_commits(repo_key, author, shas)
+    # Normally only the commits above the last seen one; older ones too if COMMIT_DEPTH was raised
+    new_items = [item for item in listing if item["sha"] not in cached]
+
+    files_per_commit = fetch_commits_files(repo, [item["sha"] for item in new_items])
+    if new_items and not cached and all(files is None for files in files_per_commit):
+        raise Exception("Failed to fetch details for every commit")
+
+    fetched = []
+    for item, files in zip(new_items, files_per_commit):
+        commit = {"sha": item["sha"], "message": item["commit"]["message"], "files": files or []}
+        cached[item["sha"]] = commit
+        # Commits whose details failed are not stored, so the next run retries them
+        if files is not None:
+            fetched.append(commit)
+
+    complete = len(fetched) == len(new_items)
+    # Without the ETag the next run lists again and retries the commits that failed
+    cache.save(repo_key, author, fetched, shas, response_headers.get("etag") if complete else None, depth)
+    return {"commits": [cached[sha] for sha in shas]}
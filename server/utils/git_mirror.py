@@ -0,0 +1,155 @@
+import os
+import re
+import base64
+import shutil
+import hashlib
+import threading
+import subprocess
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Where bare mirrors of analysed repositories are kept between requests
+GIT_MIRROR_DIR = os.getenv("GIT_MIRROR_DIR", "./git_mirrors")
+# Longest a clone or fetch may run, in seconds
+GIT_MIRROR_TIMEOUT = float(os.getenv("GIT_MIRROR_TIMEOUT", "600"))
+
+# Separators used in the git log format; neither can appear in a commit message
+RECORD_SEPARATOR = "\x1e"
+FIELD_SEPARATOR = "\x1f"
+# Commits made through GitHub's web interface use <login>@ or <id>+<login>@ this domain
+GITHUB_NOREPLY_DOMAIN = "users.noreply.github.com"
+
+_locks = {}
+_locks_lock = threading.Lock()
+
+
+class GitMirrorError(Exception):
+    """Raised when a mirror cannot be cloned, fetched or read"""
+
+
+def _mirror_lock(path):
+    with _locks_lock:
+        return _locks.setdefault(path, threading.Lock())
+
+
+def mirror_path(repo_url, mirror_dir=None):
+    """Directory of the bare mirror for repo_url, named after the repository so it is easy to find"""
+    name = re.sub(r"[^\w\-]+", "_", repo_url.rstrip("/").split("/")[-1].removesuffix(".git"))
+    digest = hashlib.sha1(repo_url.encode()).hexdigest()[:12]
+    return os.path.join(mirror_dir or GIT_MIRROR_DIR, f"{name}-{digest}.git")
+
+
+def _run_git(args, token=None):
+    env = {**os.environ, "GIT_TERMINAL_PROMPT": "0"}
+    if token:
+        # Authenticate over HTTPS without writing the token into the mirror's config.
+        # It is passed as environment config: unlike the command line, other users cannot read it.
+        credentials = base64.b64encode(f"x-access-token:{token}".encode()).decode()
+        env.update({
+            "GIT_CONFIG_COUNT": "1",
+            "GIT_CONFIG_KEY_0": "http.extraHeader",
+            "GIT_CONFIG_VALUE_0": f"Authorization: Basic {credentials}",
+        })
+    try:
+        result = subprocess.run(
+            ["git", *args], capture_output=True, text=True, timeout=GIT_MIRROR_TIMEOUT, env=env
+        )
+    except subprocess.TimeoutExpired:
+        raise GitMirrorError(f"git {args[0]} timed out after {GIT_MIRROR_TIMEOUT} seconds")
+    if result.returncode != 0:
+        raise GitMirrorError(f"git {args[0]} failed: {result.stderr.strip()}")
+    return result.stdout
+
+
+def update_mirror(repo_url, token=None, mirror_dir=None):
+    """
+    Clone a bare mirror of repo_url's branches on first use and fetch only new
+    objects after that. Pull request refs are not mirrored. Returns the mirror's path.
+    """
+    path = mirror_path(repo_url, mirror_dir)
+    with _mirror_lock(path):
+        if not os.path.isdir(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            try:
+                _run_git(["clone", "--bare", "--quiet", "--", repo_url, path], token)
+                _run_git(["--git-dir", path, "config", "remote.origin.fetch", "+refs/heads/*:refs/heads/*"])
+            except GitMirrorError:
+                # Do not leave a half-cloned mirror that later runs would try to fetch into
+                shutil.rmtree(path, ignore_errors=True)
+                raise
+        else:
+            _run_git(["--git-dir", path, "fetch", "--prune", "--quiet", "origin"], token)
+    return path
+
+
+def _parse_numstat(line):
+    added, deleted, filename = line.split("\t", 2)
+    # Binary files are reported as "-"
+    lines_changed = (int(added) if added != "-" else 0) + (int(deleted) if deleted != "-" else 0)
+    return {"filename": filename, "lines_changed": lines_changed}
+
+
+def parse_git_log(output):
+    """Parse the output of read_commits' git log into the get_commits_info structure"""
+    commit_list = []
+    for record in output.split(RECORD_SEPARATOR)[1:]:
+        sha, message, stats = record.split(FIELD_SEPARATOR, 2)
+        files = [_parse_numstat(line) for line in stats.splitlines() if line.strip()]
+        commit_list.append({
+            "sha": sha,
+            "message": message.strip(),
+            "files": files
+        })
+    return {"commits": commit_list}
+
+
+def _bre_escape(text):
+    """Escape text for a git basic regular expression"""
+    return re.sub(r"([.\[\]*^$\\])", r"\\\1", text)
+
+
+def author_patterns(username, emails=()):
+    """
+    git log --author patterns selecting username's commits by identity, as GitHub's
+    author filter does: username may be an email address or a login. A login matches
+    its GitHub noreply addresses and the given emails (those GitHub attributes to it,
+    see github_utils.get_author_emails); while no emails are known, an author name
+    equal to the login is accepted too. Every pattern matches a whole email or name.
+    """
+    if "@" in username:
+        emails = {username, *emails}
+    patterns = [f"<{_bre_escape(email)}>$" for email in sorted(set(emails))]
+    if "@" not in username:
+        noreply = _bre_escape(f"{username}@{GITHUB_NOREPLY_DOMAIN}")
+        patterns += [f"<{noreply}>$", f"<[0-9][0-9]*+{noreply}>$"]
+        if not emails:
+            patterns.append(f"^{_bre_escape(username)} <")
+    return patterns
+
+
+def read_commits(path, patterns, depth):
+    """
+    Latest depth commits on the default branch whose author matches one of patterns,
+    newest first. Merge commits are included like in the REST API listing, with their
+    changes against the first parent.
+    """
+    output = _run_git([
+        "--git-dir", path, "log", "--diff-merges=first-parent", "--no-renames",
+        *[f"--author={pattern}" for pattern in patterns], "-i", f"-n{depth}", "--numstat",
+        f"--format={RECORD_SEPARATOR}%H{FIELD_SEPARATOR}%B{FIELD_SEPARATOR}"
+    ])
+    return parse_git_log(output)
+
+
+def get_commits_info_from_mirror(repo_url, username, token=None, mirror_dir=None, emails=()):
+    """
+    Local alternative to github_utils.get_commits_info: keeps a bare mirror of
+    the repository, fetches incrementally on reuse and reads per-file change
+    stats with git log --numstat, returning the same {"commits": [...]} structure.
+    A login is matched through emails, the addresses GitHub attributes to it.
+    """
+    depth = int(os.environ.get("COMMIT_DEPTH", "5"))
+    path = update_mirror(repo_url, token, mirror_dir)
+    return read_commits(path, author_patterns(username, emails), depth)
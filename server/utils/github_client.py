@@ -0,0 +1,84 @@
+import os
+import threading
+from fastapi import HTTPException
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+# HTTP connections kept open per GitHub client
+GITHUB_POOL_SIZE = int(os.getenv("GITHUB_POOL_SIZE", "10"))
+GITHUB_TIMEOUT = int(os.getenv("GITHUB_TIMEOUT", "15"))
+
+
+class GitHubNotConfiguredError(HTTPException):
+    """Raised when a GitHub KT request arrives but no GitHub token is configured; surfaces as a 503"""
+
+    def __init__(self):
+        super().__init__(status_code=503, detail="GitHub integration is not configured")
+
+
+def configured_tokens():
+    """Tokens from GITHUB_TOKENS (comma-separated), falling back to GITHUB_TOKEN"""
+    tokens = [token.strip() for token in os.getenv("GITHUB_TOKENS", "").split(",") if token.strip()]
+    if not tokens and os.getenv("GITHUB_TOKEN"):
+        tokens = [os.getenv("GITHUB_TOKEN")]
+    return tokens
+
+
+class GitHubClientPool:
+    """
+    Lazily built GitHub clients, one per token, each with its own connection pool.
+    Nothing is imported or created until the first client is requested, so the
+    app starts without GitHub configured. Each request gets the client whose
+    token has the most rate limit left, as last reported by GitHub; tokens not
+    used yet count as having the full limit.
+    """
+
+    def __init__(self, tokens=None):
+        self._tokens = tokens
+        self._clients = None
+        self._lock = threading.Lock()
+
+    def _ensure_clients(self):
+        if self._clients is None:
+            tokens = configured_tokens() if self._tokens is None else self._tokens
+            if not tokens:
+                raise GitHubNotConfiguredError()
+            from github import Github, Auth
+            self._clients = [
+                (token, Github(auth=Auth.Token(token), pool_size=GITHUB_POOL_SIZE, timeout=GITHUB_TIMEOUT))
+                for token in tokens
+            ]
+        return self._clients
+
+    @staticmethod
+    def _remaining(entry):
+        remaining, _ = entry[1].requester.rate_limiting
+        return remaining if remaining >= 0 else float("inf")
+
+    def _best(self):
+        with self._lock:
+            return max(self._ensure_clients(), key=self._remaining)
+
+    def get_client(self):
+        """The GitHub client with the most rate limit left"""
+        return self._best()[1]
+
+    def get_token(self):
+        """The token with the most rate limit left, for callers that talk to GitHub without PyGithub"""
+        return self._best()[0]
+
+    def reset(self):
+        """Drop the clients so the next request picks up changed tokens"""
+        with self._lock:
+            clients, self._clients = self._clients, None
+        for _, client in clients or []:
+            client.close()
+
+
+github_clients = GitHubClientPool()
+
+
+def get_github_client():
+    return github_clients.get_client()
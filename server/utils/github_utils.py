@@ -1,9 +1,88 @@
-from github import Github
 import re
 import os
+import time
+import logging
+import itertools
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+from fnmatch import fnmatch
 from dotenv import load_dotenv
+from utils.token_budget import count_tokens, truncate_text
 
 load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Largest commit summary handed to the LLM; smaller file changes and then older commits are left out past it
+GITHUB_COMMITS_TOKEN_BUDGET = int(os.getenv("GITHUB_COMMITS_TOKEN_BUDGET", "6000"))
+
+# Commit detail requests made at once; GitHub's secondary rate limits punish large bursts
+GITHUB_FETCH_CONCURRENCY = int(os.getenv("GITHUB_FETCH_CONCURRENCY", "4"))
+# Attempts per commit when GitHub rate limits us, and the longest wait honoured before giving up
+GITHUB_RATE_LIMIT_RETRIES = int(os.getenv("GITHUB_RATE_LIMIT_RETRIES", "3"))
+GITHUB_RATE_LIMIT_MAX_WAIT = float(os.getenv("GITHUB_RATE_LIMIT_MAX_WAIT", "60"))
+
+# Commit filter rules; paths and message patterns are comma-separated lists
+COMMIT_FILTER_MIN_LINES_CHANGED = int(os.getenv("COMMIT_FILTER_MIN_LINES_CHANGED", "10"))
+DEFAULT_EXCLUDED_PATHS = (
+    # Lockfiles
+    "package-lock.json,yarn.lock,pnpm-lock.yaml,*.lock,"
+    # Generated and minified code
+    "*.min.js,*.min.css,*.map,*_pb2.py,*_pb2_grpc.py,*.pb.go,*.generated.*,"
+    # Vendored and build output directories
+    "vendor/*,*/vendor/*,node_modules/*,*/node_modules/*,dist/*,build/*"
+)
+COMMIT_FILTER_EXCLUDED_PATHS = os.getenv("COMMIT_FILTER_EXCLUDED_PATHS", DEFAULT_EXCLUDED_PATHS)
+COMMIT_FILTER_EXCLUDED_MESSAGES = os.getenv(
+    "COMMIT_FILTER_EXCLUDED_MESSAGES", r"will not be used,^Merge (pull request|branch) "
+)
+
+def _split_setting(value):
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+class CommitFilter:
+    """
+    Rules for which commit changes are worth a KT session.
+    A file is kept if it changed at least min_lines_changed lines and its path
+    matches none of excluded_paths (globs, matched against the full path and the
+    file name). A commit is dropped if its message matches any of
+    excluded_messages (case-insensitive regular expressions) or no files are left.
+    """
+
+    def __init__(self, min_lines_changed=None, excluded_paths=None, excluded_messages=None):
+        self.min_lines_changed = COMMIT_FILTER_MIN_LINES_CHANGED if min_lines_changed is None else min_lines_changed
+        self.excluded_paths = list(_split_setting(COMMIT_FILTER_EXCLUDED_PATHS) if excluded_paths is None else excluded_paths)
+        if excluded_messages is None:
+            excluded_messages = _split_setting(COMMIT_FILTER_EXCLUDED_MESSAGES)
+        self.excluded_messages = [re.compile(pattern, re.IGNORECASE) for pattern in excluded_messages]
+
+    def keep_commit(self, commit):
+        message = commit.get("message") or ""
+        return not any(pattern.search(message) for pattern in self.excluded_messages)
+
+    def keep_file(self, file):
+        if file.get("lines_changed", 0) < self.min_lines_changed:
+            return False
+        path = file.get("filename", "")
+        name = posixpath.basename(path)
+        return not any(fnmatch(path, pattern) or fnmatch(name, pattern) for pattern in self.excluded_paths)
+
+    def apply(self, commits):
+        """Return a copy of a get_commits_info result with only the valuable changes"""
+        kept = []
+        for commit in commits.get("commits", []):
+            if not self.keep_commit(commit):
+                continue
+            files = [file for file in commit.get("files", []) if self.keep_file(file)]
+            if files:
+                kept.append({**commit, "files": files})
+        return {"commits": kept}
+
+default_commit_filter = CommitFilter()
+
+def filter_commits(commits, commit_filter=None):
+    """Drop the commit changes that are not worth a KT session, see CommitFilter"""
+    return (commit_filter or default_commit_filter).apply(commits)
     
 def extract_owner_repo(url: str):
     # Supports URLs like:
@@ -14,45 +93,161 @@ def extract_owner_repo(url: str):
         return match.group('owner'), match.group('repo')
     return None, None
 
+def _rate_limit_wait(error, attempt):
+    """Seconds to wait after a rate limit error, from Retry-After or the reset time when GitHub sends them"""
+    headers = {name.lower(): value for name, value in (error.headers or {}).items()}
+    if "retry-after" in headers:
+        return float(headers["retry-after"])
+    if headers.get("x-ratelimit-remaining") == "0" and "x-ratelimit-reset" in headers:
+        return max(0.0, float(headers["x-ratelimit-reset"]) - time.time())
+    return float(2 ** attempt)
+
+def get_commit_files(repo, sha):
+    """Changed files of one commit, waiting out GitHub rate limits"""
+    # Imported here so the GitHub stack is only loaded once it is used
+    from github import RateLimitExceededException
+    for attempt in range(GITHUB_RATE_LIMIT_RETRIES):
+        try:
+            detailed_commit = repo.get_commit(sha)
+            return [
+                {
+                    "filename": f.filename,
+                    "lines_changed": f.changes  # Typically, this is additions + deletions
+                }
+                for f in detailed_commit.files
+            ]
+        except RateLimitExceededException as e:
+            wait = _rate_limit_wait(e, attempt)
+            if attempt == GITHUB_RATE_LIMIT_RETRIES - 1 or wait > GITHUB_RATE_LIMIT_MAX_WAIT:
+                raise
+            logger.warning("GitHub rate limit hit fetching %s, retrying in %.1fs", sha, wait)
+            time.sleep(wait)
+
+def fetch_commits_files(repo, shas):
+    """
+    Changed files of each commit, fetched concurrently and returned in the order of shas.
+    A commit whose details cannot be fetched gets None.
+    """
+    def fetch(sha):
+        try:
+            return get_commit_files(repo, sha)
+        except Exception:
+            logger.exception("Error fetching files of commit %s", sha)
+            return None
+
+    with ThreadPoolExecutor(max_workers=max(1, GITHUB_FETCH_CONCURRENCY)) as executor:
+        return list(executor.map(fetch, shas))
+
+def get_author_emails(repo, username, limit=100):
+    """
+    Author emails of the commits GitHub attributes to username in repo, from one
+    listing request. GitHub links commits to a login by email, so these let another
+    source of commits (the git mirror) select the same ones.
+    """
+    _, listing = repo.requester.requestJsonAndCheck(
+        "GET", f"{repo.url}/commits", parameters={"author": username, "per_page": limit}
+    )
+    emails = set()
+    for item in listing or []:
+        email = ((item.get("commit") or {}).get("author") or {}).get("email")
+        if email:
+            emails.add(email.lower())
+    return emails
+
 def get_commits_info(repo, username):
-    commits = repo.get_commits(author=username)
-    commit_list = []
-    count = 0
+    """
+    Last COMMIT_DEPTH commits by username with their changed files.
+    Commit details are fetched concurrently and returned in commit order. A
+    commit whose details cannot be fetched is kept with no files; the call only
+    fails if every fetch fails.
+    """
     COMMIT_DEPTH = int(os.environ.get("COMMIT_DEPTH", "5"))
     # Process only the last COMMIT_DEPTH number of commits
-    for commit in commits:
-        if count >= COMMIT_DEPTH:
-            break
-        # Get detailed commit data to access file changes
-        detailed_commit = repo.get_commit(commit.sha)
-        files_data = []
-        for f in detailed_commit.files:
-            file_info = {
-                "filename": f.filename,
-                "lines_changed": f.changes  # Typically, this is additions + deletions
-            }
-            files_data.append(file_info)
-        commit_data = {
+    commits = list(itertools.islice(repo.get_commits(author=username), COMMIT_DEPTH))
+    files_per_commit = fetch_commits_files(repo, [commit.sha for commit in commits])
+
+    if commits and all(files is None for files in files_per_commit):
+        raise Exception("Failed to fetch details for every commit")
+
+    commit_list = []
+    for commit, files_data in zip(commits, files_per_commit):
+        commit_list.append({
             "sha": commit.sha,
             "message": commit.commit.message,
-            "files": files_data
-        }
-        commit_list.append(commit_data)
-        count += 1
+            "files": files_data or []
+        })
     return {"commits": commit_list}
 
-def get_llm_usable_string(commits):
+def _render_commits(commit_list, dropped_files=frozenset(), omitted_commits=0):
     lines = []
-    for commit in commits.get("commits", []):
+    for commit_index, commit in enumerate(commit_list):
         # Append the commit message header.
         lines.append(f"Commit: {commit.get('message', '<no message>')}")
         # Append file details.
-        for file in commit.get("files", []):
+        omitted_count = 0
+        omitted_lines = 0
+        for file_index, file in enumerate(commit.get("files", [])):
             filename = file.get("filename", "<unknown file>")
             lines_changed = file.get("lines_changed", 0)
+            if (commit_index, file_index) in dropped_files:
+                omitted_count += 1
+                omitted_lines += lines_changed
+                continue
             lines.append(f"  - {filename} ({lines_changed} lines changed)")
+        if omitted_count:
+            lines.append(f"  - {omitted_count} smaller files omitted ({omitted_lines} lines changed)")
         # Add a blank line for readability between commits.
         lines.append("")
-    
+    if omitted_commits:
+        lines.append(f"{omitted_commits} older commits omitted")
+
     # Join all lines into a single string with newline characters.
-    return "\n".join(lines)
\ No newline at end of file
+    return "\n".join(lines)
+
+def _fits(text, budget):
+    return count_tokens(text) <= budget
+
+def get_llm_usable_string(commits, token_budget=None):
+    """
+    Render commits as "Commit: message" blocks listing each changed file.
+    Past the token budget the files with the fewest changed lines are left out
+    first, then the oldest commits, so the summary keeps the most significant work.
+    """
+    budget = token_budget or GITHUB_COMMITS_TOKEN_BUDGET
+    commit_list = commits.get("commits", [])
+    text = _render_commits(commit_list)
+    if _fits(text, budget):
+        return text
+
+    # Files from smallest to largest change; find the fewest drops that fit
+    files_by_size = sorted(
+        (file.get("lines_changed", 0), commit_index, file_index)
+        for commit_index, commit in enumerate(commit_list)
+        for file_index, file in enumerate(commit.get("files", []))
+    )
+    drop_order = [(commit_index, file_index) for _, commit_index, file_index in files_by_size]
+    low, high = 1, len(drop_order)
+    while low < high:
+        middle = (low + high) // 2
+        if _fits(_render_commits(commit_list, frozenset(drop_order[:middle])), budget):
+            high = middle
+        else:
+            low = middle + 1
+    text = _render_commits(commit_list, frozenset(drop_order[:low]))
+    if _fits(text, budget):
+        return text
+
+    # Commits are listed newest first; keep as many of the newest as fit
+    def render_newest(kept):
+        kept_commits = commit_list[:kept]
+        dropped = frozenset(key for key in drop_order if key[0] < kept)
+        return _render_commits(kept_commits, dropped, len(commit_list) - kept)
+
+    low, high = 0, len(commit_list) - 1
+    while low < high:
+        middle = (low + high + 1) // 2
+        if _fits(render_newest(middle), budget):
+            low = middle
+        else:
+            high = middle - 1
+    return truncate_text(render_newest(low), budget)
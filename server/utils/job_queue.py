@@ -0,0 +1,234 @@
+import os
+import json
+import logging
+import threading
+from datetime import datetime, timezone, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+from dotenv import load_dotenv
+
+import models
+import database
+
+# Load environment variables from .env file
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Number of worker threads running jobs; 0 runs each job inline when it is submitted
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+# A running job whose heartbeat is older than the lease is presumed dead and may be run again
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "300"))
+JOB_HEARTBEAT_SECONDS = max(1, JOB_LEASE_SECONDS // 3)
+
+_handlers = {}
+_executor = None
+_executor_lock = threading.Lock()
+
+# Session factory used by the workers; tests point this at their own database
+_session_factory = None
+
+
+def job_handler(job_type):
+    """
+    Register a function as the handler for a job type.
+    Handlers run on a worker thread as handler(payload, db);
+    their return value is stored as the job result. Handlers should stage their
+    writes without committing: run_job commits them together with the job's
+    status, so a job run again after a crash never finds half its work saved.
+    Side effects outside the database go through after_commit.
+    """
+    def decorator(func):
+        _handlers[job_type] = func
+        return func
+    return decorator
+
+
+def after_commit(db, func):
+    """
+    Call func() once the running job's writes and its success are committed.
+    Meant for side effects outside the database, such as calendar invites; a
+    failure there is reported but does not fail the job, whose data is saved.
+    """
+    db.info.setdefault("job_follow_ups", []).append(func)
+
+
+def _run_follow_ups(job_id, follow_ups):
+    for func in follow_ups:
+        try:
+            func()
+        except Exception:
+            logger.exception("Error in follow-up of job %s", job_id)
+
+
+def configure(session_factory=None, workers=None):
+    """Override the worker session factory and pool size"""
+    global _session_factory, JOB_WORKERS
+    if session_factory is not None:
+        _session_factory = session_factory
+    if workers is not None:
+        shutdown()
+        JOB_WORKERS = workers
+
+
+def shutdown(wait=True):
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=wait)
+        _executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="job-worker")
+    return _executor
+
+
+def _new_session():
+    return (_session_factory or database.SessionLocal)()
+
+
+def _utcnow():
+    return datetime.now(timezone.utc)
+
+
+def submit_job(db, job_type, payload, user_id, idempotency_key=None):
+    """
+    Persist a job and schedule it on the worker pool.
+    A repeated idempotency key for the same user returns the existing job instead.
+    """
+    if job_type not in _handlers:
+        raise ValueError(f"No handler registered for job type {job_type}")
+
+    if idempotency_key:
+        existing = db.query(models.Job).filter(
+            models.Job.user_id == user_id,
+            models.Job.idempotency_key == idempotency_key
+        ).first()
+        if existing:
+            return existing
+
+    job = models.Job(
+        job_type=job_type,
+        status=models.JobStatus.QUEUED,
+        user_id=user_id,
+        idempotency_key=idempotency_key,
+        payload=json.dumps(payload)
+    )
+    db.add(job)
+    try:
+        db.commit()
+    except IntegrityError:
+        # A concurrent request with the same idempotency key won the race
+        db.rollback()
+        return db.query(models.Job).filter(
+            models.Job.user_id == user_id,
+            models.Job.idempotency_key == idempotency_key
+        ).first()
+    db.refresh(job)
+
+    _schedule(job.id)
+    db.refresh(job)
+    return job
+
+
+def _schedule(job_id):
+    if JOB_WORKERS <= 0:
+        run_job(job_id)
+    else:
+        _get_executor().submit(run_job, job_id)
+
+
+def claim_job(db, job_id):
+    """
+    Atomically move a queued job to running. Returns False when another worker
+    or process claimed it first, so each job runs once even if scheduled twice.
+    """
+    now = _utcnow()
+    claimed = db.query(models.Job).filter(
+        models.Job.id == job_id,
+        models.Job.status == models.JobStatus.QUEUED
+    ).update({
+        models.Job.status: models.JobStatus.RUNNING,
+        models.Job.started_at: now,
+        models.Job.heartbeat_at: now
+    }, synchronize_session=False)
+    db.commit()
+    return claimed == 1
+
+
+def _heartbeat(job_id, stop):
+    """Renew the lease of a running job until stop is set"""
+    while not stop.wait(JOB_HEARTBEAT_SECONDS):
+        db = _new_session()
+        try:
+            db.query(models.Job).filter(
+                models.Job.id == job_id,
+                models.Job.status == models.JobStatus.RUNNING
+            ).update({models.Job.heartbeat_at: _utcnow()}, synchronize_session=False)
+            db.commit()
+        except Exception:
+            db.rollback()
+            logger.exception("Error renewing lease of job %s", job_id)
+        finally:
+            db.close()
+
+
+def run_job(job_id):
+    """Claim a queued job, execute it in its own database session and record the outcome"""
+    db = _new_session()
+    try:
+        if not claim_job(db, job_id):
+            return
+        job = db.query(models.Job).filter(models.Job.id == job_id).first()
+
+        stop = threading.Event()
+        heartbeat = threading.Thread(target=_heartbeat, args=(job_id, stop), daemon=True)
+        heartbeat.start()
+        try:
+            handler = _handlers[job.job_type]
+            payload = json.loads(job.payload) if job.payload else {}
+            result = handler(payload, db)
+            job.result = json.dumps(result)
+            job.status = models.JobStatus.SUCCEEDED
+        except Exception as err:
+            db.rollback()
+            db.info.pop("job_follow_ups", None)
+            job = db.query(models.Job).filter(models.Job.id == job_id).first()
+            job.error = str(err)
+            job.status = models.JobStatus.FAILED
+        finally:
+            stop.set()
+            heartbeat.join()
+        job.finished_at = _utcnow()
+        # The handler's writes and the job's status are saved in one transaction
+        db.commit()
+        _run_follow_ups(job_id, db.info.pop("job_follow_ups", []))
+    finally:
+        db.close()
+
+
+def resume_pending_jobs():
+    """
+    Re-schedule queued jobs, and running jobs whose lease expired because the
+    process running them stopped. Jobs still heartbeating elsewhere are left alone.
+    """
+    db = _new_session()
+    try:
+        expired = _utcnow() - timedelta(seconds=JOB_LEASE_SECONDS)
+        db.query(models.Job).filter(
+            models.Job.status == models.JobStatus.RUNNING,
+            or_(models.Job.heartbeat_at.is_(None), models.Job.heartbeat_at < expired)
+        ).update({models.Job.status: models.JobStatus.QUEUED}, synchronize_session=False)
+        db.commit()
+        pending = db.query(models.Job.id).filter(models.Job.status == models.JobStatus.QUEUED).all()
+    finally:
+        db.close()
+    for (job_id,) in pending:
+        _schedule(job_id)
+    return len(pending)
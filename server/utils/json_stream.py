@@ -0,0 +1,88 @@
+import json
+
+
+class IncrementalJSONArrayParser:
+    """
+    Incremental parser for a streamed JSON document such as
+    {"title": "...", "questions": [{...}, {...}]}.
+
+    Feed it text as it arrives; feed() returns every object of the top-level
+    array under array_key that has been completed by that text, so callers can
+    act on each element before the rest of the document is generated.
+    Elements that are not valid JSON go through the same local repairs as
+    whole responses and are skipped only if those fail; the full document is
+    still available to the caller once the stream ends.
+    """
+
+    def __init__(self, array_key):
+        self.array_key = array_key
+        self._buffer = ""
+        self._pos = 0
+        self._stack = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = None
+        self._last_key = None
+        self._await_array = False
+        self._array_depth = None
+        self._element_start = None
+
+    def feed(self, text):
+        self._buffer += text
+        elements = []
+        buffer = self._buffer
+        while self._pos < len(buffer):
+            char = buffer[self._pos]
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    # Remember keys of the top-level object
+                    if len(self._stack) == 1:
+                        self._last_key = buffer[self._string_start + 1:self._pos]
+            elif char == '"':
+                self._in_string = True
+                self._string_start = self._pos
+            elif char == ":":
+                if len(self._stack) == 1 and self._last_key == self.array_key:
+                    self._await_array = True
+            elif char in "{[":
+                self._stack.append(char)
+                if char == "[" and self._await_array:
+                    self._array_depth = len(self._stack)
+                elif char == "{" and self._array_depth is not None and len(self._stack) == self._array_depth + 1:
+                    self._element_start = self._pos
+                self._await_array = False
+            elif char in "}]":
+                if self._stack:
+                    self._stack.pop()
+                if self._array_depth is not None:
+                    if char == "}" and len(self._stack) == self._array_depth and self._element_start is not None:
+                        element = self._parse_element(buffer[self._element_start:self._pos + 1])
+                        if element is not None:
+                            elements.append(element)
+                        self._element_start = None
+                    elif char == "]" and len(self._stack) == self._array_depth - 1:
+                        self._array_depth = None
+            elif char == "," and len(self._stack) == 1:
+                self._await_array = False
+
+            self._pos += 1
+        return elements
+
+    @staticmethod
+    def _parse_element(text):
+        try:
+            return json.loads(text)
+        except json.JSONDecodeError:
+            pass
+        # llm_utils imports this module, so import the repair helper lazily
+        from utils.llm_utils import repair_json
+        try:
+            return repair_json(text)
+        except json.JSONDecodeError:
+            return None
@@ -0,0 +1,161 @@
+import os
+import json
+import time
+import asyncio
+import sqlite3
+import hashlib
+import threading
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "./llm_cache.db")
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 60 * 60)))  # seconds
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+
+
+def make_cache_key(namespace, template_version, model, payload):
+    """
+    Content address for a generation: a hash of the call site, the prompt
+    template version, the model and the normalized input.
+    """
+    material = json.dumps(
+        [namespace, template_version, model, payload],
+        sort_keys=True,
+        separators=(",", ":")
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    Persistent SQLite cache for deterministic LLM generations
+    with TTL expiry and least-recently-used eviction.
+    """
+
+    def __init__(self, path=LLM_CACHE_PATH, ttl=LLM_CACHE_TTL, max_entries=LLM_CACHE_MAX_ENTRIES):
+        self.path = str(path)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._initialized_path = None
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5)
+        if self._initialized_path != self.path:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    namespace TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_accessed_at REAL NOT NULL
+                )
+            """)
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_llm_cache_last_accessed_at ON llm_cache (last_accessed_at)"
+            )
+            conn.commit()
+            self._initialized_path = self.path
+        return conn
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss or expired entry"""
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            try:
+                row = conn.execute(
+                    "SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return None
+                value, created_at = row
+                if self.ttl and now - created_at > self.ttl:
+                    conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                    conn.commit()
+                    return None
+                conn.execute(
+                    "UPDATE llm_cache SET last_accessed_at = ? WHERE key = ?", (now, key)
+                )
+                conn.commit()
+                return json.loads(value)
+            finally:
+                conn.close()
+
+    def set(self, key, value, namespace=""):
+        """Store value under key and evict the least recently used entries over the limit"""
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, namespace, value, created_at, last_accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, namespace, json.dumps(value), now, now)
+                )
+                if self.max_entries:
+                    conn.execute(
+                        "DELETE FROM llm_cache WHERE key IN ("
+                        "SELECT key FROM llm_cache ORDER BY last_accessed_at DESC LIMIT -1 OFFSET ?)",
+                        (self.max_entries,)
+                    )
+                conn.commit()
+            finally:
+                conn.close()
+
+    def clear(self):
+        with self._lock:
+            conn = self._connect()
+            try:
+                conn.execute("DELETE FROM llm_cache")
+                conn.commit()
+            finally:
+                conn.close()
+
+    def __len__(self):
+        with self._lock:
+            conn = self._connect()
+            try:
+                return conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+            finally:
+                conn.close()
+
+
+llm_cache = LLMCache()
+
+
+def cached_generation(namespace, template_version, model, payload, generate, bypass_cache=False):
+    """
+    Return the cached result for this generation, calling generate() on a miss.
+    With bypass_cache=True the cache is not read, but the fresh result is stored.
+    """
+    if not LLM_CACHE_ENABLED:
+        return generate()
+    key = make_cache_key(namespace, template_version, model, payload)
+    if not bypass_cache:
+        cached = llm_cache.get(key)
+        if cached is not None:
+            return cached
+    data = generate()
+    llm_cache.set(key, data, namespace)
+    return data
+
+
+async def cached_generation_async(namespace, template_version, model, payload, generate, bypass_cache=False):
+    """
+    Awaitable version of cached_generation; generate is an async callable.
+    The SQLite reads and writes run in a worker thread so they do not block the event loop.
+    """
+    if not LLM_CACHE_ENABLED:
+        return await generate()
+    key = make_cache_key(namespace, template_version, model, payload)
+    if not bypass_cache:
+        cached = await asyncio.to_thread(llm_cache.get, key)
+        if cached is not None:
+            return cached
+    data = await generate()
+    await asyncio.to_thread(llm_cache.set, key, data, namespace)
+    return data
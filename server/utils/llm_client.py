@@ -0,0 +1,391 @@
+import os
+import json
+import time
+import random
+import asyncio
+import threading
+from collections import Counter
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+from utils.llm_governor import governor, estimate_tokens, PRIORITY_DEFAULT
+from utils.token_budget import check_prompt, count_tokens, record_usage
+from utils.circuit_breaker import CircuitBreaker
+
+# Load environment variables from .env file
+load_dotenv()
+
+GROQ_API_URL = os.getenv("GROQ_API_URL", "https://api.groq.com/openai/v1/chat/completions")
+GROQ_MODEL = os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile")
+
+# Connection pool sizing: number of hosts kept in the pool and the number of
+# keep-alive connections kept per host
+LLM_POOL_CONNECTIONS = int(os.getenv("LLM_POOL_CONNECTIONS", "4"))
+LLM_POOL_MAXSIZE = int(os.getenv("LLM_POOL_MAXSIZE", "16"))
+
+# (connect, read) timeouts in seconds
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+LLM_READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT", "120"))
+
+# Retry policy defaults for transient provider errors
+LLM_MAX_ATTEMPTS = int(os.getenv("LLM_MAX_ATTEMPTS", "3"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "30"))
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+SERVER_ERROR_STATUS_CODES = RETRYABLE_STATUS_CODES - {429}
+
+# Fails LLM calls fast while the provider keeps erroring
+breaker = CircuitBreaker("Groq API")
+
+_session = None
+_session_lock = threading.Lock()
+
+# The async client is bound to the event loop it was created on
+_async_client = None
+_async_client_loop = None
+
+
+class RetryPolicy:
+    """
+    Bounded retry policy with jittered exponential backoff.
+    A Retry-After value sent by the provider takes precedence over the computed delay.
+    """
+
+    def __init__(self, max_attempts=None, backoff_base=None, backoff_max=None):
+        self.max_attempts = max_attempts if max_attempts is not None else LLM_MAX_ATTEMPTS
+        self.backoff_base = backoff_base if backoff_base is not None else LLM_BACKOFF_BASE
+        self.backoff_max = backoff_max if backoff_max is not None else LLM_BACKOFF_MAX
+
+    def delay(self, attempt, retry_after=None):
+        """Seconds to wait before the given (1-based) retry attempt"""
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max)
+        # Full jitter: uniform between 0 and the exponential ceiling
+        ceiling = min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1)))
+        return random.uniform(0, ceiling)
+
+
+default_retry_policy = RetryPolicy()
+
+# Process-wide counters for retries, JSON repairs and re-requests
+_counters = Counter()
+_counters_lock = threading.Lock()
+
+
+def increment_counter(name, amount=1):
+    with _counters_lock:
+        _counters[name] += amount
+
+
+def get_counters():
+    """Return a snapshot of the LLM client counters"""
+    with _counters_lock:
+        return dict(_counters)
+
+
+def reset_counters():
+    with _counters_lock:
+        _counters.clear()
+
+
+def parse_retry_after(value):
+    """Parse a Retry-After header given in seconds; HTTP dates fall back to backoff"""
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
+
+
+def _extract_content(body):
+    choices = body.get('choices') or []
+    if not choices:
+        raise ValueError("No response received from Groq API")
+    # Extract the generated text from the response
+    return choices[0]['message']['content']
+
+
+def _record_usage(call_site, body, prompt_tokens, content):
+    """Record the call's token usage, preferring the counts reported by the provider; returns the total"""
+    usage = body.get('usage') or {}
+    prompt_used = usage.get('prompt_tokens', prompt_tokens)
+    completion_used = usage.get('completion_tokens')
+    if completion_used is None:
+        completion_used = count_tokens(content)
+    record_usage(call_site, prompt_used, completion_used)
+    return prompt_used + completion_used
+
+
+def _build_headers():
+    GROQ_API_KEY = os.getenv('GROQ_API_KEY')
+    if not GROQ_API_KEY:
+        raise ValueError("GROQ_API_KEY environment variable is not set")
+    return {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {GROQ_API_KEY}"
+    }
+
+
+def _build_payload(prompt, model=None):
+    return {
+        "model": model or GROQ_MODEL,
+        "messages": [{
+            "role": "user",
+            "content": prompt
+        }]
+    }
+
+
+def _build_session():
+    headers = _build_headers()
+
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=LLM_POOL_CONNECTIONS,
+        pool_maxsize=LLM_POOL_MAXSIZE,
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update(headers)
+    return session
+
+
+def get_session():
+    """
+    Return the process-wide pooled HTTP session used for every Groq call.
+    The API key and headers are resolved once, when the session is created.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+
+def reset_session():
+    """Close the shared session so the next call picks up fresh configuration"""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+
+
+def _throttle(model, response):
+    """On a 429, hold back every caller of this model for the provider's Retry-After"""
+    retry_after = parse_retry_after(response.headers.get("Retry-After"))
+    if response.status_code == 429 and retry_after:
+        governor.pause(model or GROQ_MODEL, retry_after)
+    return retry_after
+
+
+def _record_outcome(response):
+    """Transient server errors count against the circuit breaker; any other answer shows the provider is up"""
+    if response.status_code in SERVER_ERROR_STATUS_CODES:
+        breaker.record_failure(f"HTTP {response.status_code}")
+    else:
+        breaker.record_success()
+
+
+def chat_completion(prompt, model=None, retry_policy=None, priority=PRIORITY_DEFAULT, call_site="default"):
+    """
+    Send a single-message chat completion request and return the generated text.
+    Every attempt waits for admission by the process-wide governor.
+    Transient failures (timeouts, connection errors, 429 and 5xx) are retried
+    according to the retry policy.
+    Token usage is recorded under call_site.
+    Raises PromptTooLargeError for a prompt over the token budget and CircuitOpenError
+    while the circuit is open, both without calling the provider, and
+    requests.exceptions.RequestException once the attempts are exhausted.
+    """
+    policy = retry_policy or default_retry_policy
+    model = model or GROQ_MODEL
+    prompt_tokens = check_prompt(prompt, call_site)
+    attempt = 1
+    while True:
+        retry_after = None
+        breaker.before_call()
+        ticket = None
+        used_tokens = None
+        try:
+            ticket = governor.acquire(model, estimate_tokens(prompt_tokens), priority)
+            response = get_session().post(
+                GROQ_API_URL,
+                json=_build_payload(prompt, model),
+                timeout=(LLM_CONNECT_TIMEOUT, LLM_READ_TIMEOUT)
+            )
+            _record_outcome(response)
+            if response.status_code in RETRYABLE_STATUS_CODES and attempt < policy.max_attempts:
+                retry_after = _throttle(model, response)
+            else:
+                response.raise_for_status()
+                body = response.json()
+                content = _extract_content(body)
+                used_tokens = _record_usage(call_site, body, prompt_tokens, content)
+                return content
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as err:
+            breaker.record_failure(err)
+            if attempt >= policy.max_attempts:
+                raise
+        except BaseException:
+            breaker.cancel_call()
+            raise
+        finally:
+            if ticket is not None:
+                governor.release(ticket, used_tokens)
+
+        increment_counter("retries")
+        time.sleep(policy.delay(attempt, retry_after))
+        attempt += 1
+
+
+def get_async_client():
+    """
+    Return the pooled httpx.AsyncClient for the running event loop.
+    Async routes use this so LLM round trips do not block the event loop.
+    """
+    global _async_client, _async_client_loop
+    loop = asyncio.get_running_loop()
+    if _async_client is None or _async_client_loop is not loop or _async_client.is_closed:
+        _async_client = httpx.AsyncClient(
+            headers=_build_headers(),
+            limits=httpx.Limits(
+                max_connections=LLM_POOL_MAXSIZE,
+                max_keepalive_connections=LLM_POOL_MAXSIZE,
+            ),
+            timeout=httpx.Timeout(LLM_READ_TIMEOUT, connect=LLM_CONNECT_TIMEOUT),
+        )
+        _async_client_loop = loop
+    return _async_client
+
+
+async def reset_async_client():
+    """Close the shared async client so the next call picks up fresh configuration"""
+    global _async_client, _async_client_loop
+    if _async_client is not None and _async_client_loop is asyncio.get_running_loop():
+        await _async_client.aclose()
+    _async_client = None
+    _async_client_loop = None
+
+
+async def async_chat_completion(prompt, model=None, retry_policy=None, priority=PRIORITY_DEFAULT, call_site="default"):
+    """
+    Awaitable version of chat_completion with the same budget, admission and retry behaviour.
+    Raises httpx.HTTPError once the attempts are exhausted.
+    """
+    policy = retry_policy or default_retry_policy
+    model = model or GROQ_MODEL
+    prompt_tokens = check_prompt(prompt, call_site)
+    attempt = 1
+    while True:
+        retry_after = None
+        breaker.before_call()
+        ticket = None
+        used_tokens = None
+        try:
+            ticket = await governor.acquire_async(model, estimate_tokens(prompt_tokens), priority)
+            response = await get_async_client().post(
+                GROQ_API_URL,
+                json=_build_payload(prompt, model)
+            )
+            _record_outcome(response)
+            if response.status_code in RETRYABLE_STATUS_CODES and attempt < policy.max_attempts:
+                retry_after = _throttle(model, response)
+            else:
+                response.raise_for_status()
+                body = response.json()
+                content = _extract_content(body)
+                used_tokens = _record_usage(call_site, body, prompt_tokens, content)
+                return content
+        except httpx.TransportError as err:
+            breaker.record_failure(err)
+            if attempt >= policy.max_attempts:
+                raise
+        except BaseException:
+            breaker.cancel_call()
+            raise
+        finally:
+            if ticket is not None:
+                governor.release(ticket, used_tokens)
+
+        increment_counter("retries")
+        await asyncio.sleep(policy.delay(attempt, retry_after))
+        attempt += 1
+
+
+def stream_chat_completion(prompt, model=None, retry_policy=None, priority=PRIORITY_DEFAULT, call_site="default"):
+    """
+    Stream a chat completion, yielding the generated text piece by piece as the
+    provider sends it. Opening the stream is admitted and retried like
+    chat_completion; the governor slot is held until the stream is finished.
+    Once text has been yielded a dropped connection is raised to the caller.
+    """
+    policy = retry_policy or default_retry_policy
+    model = model or GROQ_MODEL
+    prompt_tokens = check_prompt(prompt, call_site)
+    payload = _build_payload(prompt, model)
+    payload["stream"] = True
+    attempt = 1
+    while True:
+        retry_after = None
+        breaker.before_call()
+        ticket = None
+        try:
+            ticket = governor.acquire(model, estimate_tokens(prompt_tokens), priority)
+            response = get_session().post(
+                GROQ_API_URL,
+                json=payload,
+                timeout=(LLM_CONNECT_TIMEOUT, LLM_READ_TIMEOUT),
+                stream=True
+            )
+            _record_outcome(response)
+            if response.status_code in RETRYABLE_STATUS_CODES and attempt < policy.max_attempts:
+                retry_after = _throttle(model, response)
+                response.close()
+            else:
+                response.raise_for_status()
+                # The slot stays taken until the stream has been read
+                break
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as err:
+            breaker.record_failure(err)
+            if attempt >= policy.max_attempts:
+                governor.release(ticket)
+                raise
+        except BaseException:
+            breaker.cancel_call()
+            if ticket is not None:
+                governor.release(ticket)
+            raise
+        governor.release(ticket)
+
+        increment_counter("retries")
+        time.sleep(policy.delay(attempt, retry_after))
+        attempt += 1
+
+    with response:
+        # OpenAI-compatible SSE: one "data: {chunk}" line per delta, ending with "data: [DONE]"
+        generated = []
+        try:
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    return
+                choices = json.loads(data).get("choices") or []
+                if choices:
+                    content = choices[0].get("delta", {}).get("content")
+                    if content:
+                        generated.append(content)
+                        yield content
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as err:
+            breaker.record_failure(err)
+            raise
+        finally:
+            completion_tokens = count_tokens("".join(generated))
+            record_usage(call_site, prompt_tokens, completion_tokens)
+            governor.release(ticket, prompt_tokens + completion_tokens)
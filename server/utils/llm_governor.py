@@ -0,0 +1,239 @@
+import os
+import json
+import time
+import heapq
+import asyncio
+import itertools
+import threading
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Process-wide limits on LLM traffic; a rate of 0 disables that budget. The rates are off
+# by default, leaving the provider's own limits (429 with Retry-After pauses the model)
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_REQUESTS_PER_MINUTE = float(os.getenv("LLM_REQUESTS_PER_MINUTE", "0"))
+LLM_TOKENS_PER_MINUTE = float(os.getenv("LLM_TOKENS_PER_MINUTE", "0"))
+# Per-model overrides, e.g. {"llama-3.3-70b-versatile": {"requests_per_minute": 30, "tokens_per_minute": 6000}}
+LLM_MODEL_RATE_LIMITS = json.loads(os.getenv("LLM_MODEL_RATE_LIMITS", "{}"))
+# Completion tokens assumed when admitting a request, corrected once the real usage is known
+LLM_COMPLETION_TOKEN_ESTIMATE = int(os.getenv("LLM_COMPLETION_TOKEN_ESTIMATE", "1024"))
+
+# Lower values are admitted first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_DEFAULT = 1
+PRIORITY_BATCH = 2
+
+# How often async waiters re-check the queue when nothing tells them how long to wait
+ASYNC_POLL_INTERVAL = 0.05
+
+
+def estimate_tokens(prompt_tokens):
+    """Tokens a request is expected to use: its prompt plus the expected completion"""
+    return prompt_tokens + LLM_COMPLETION_TOKEN_ESTIMATE
+
+
+class TokenBucket:
+    """Refills continuously at rate_per_minute up to a capacity of one minute's budget"""
+
+    def __init__(self, rate_per_minute):
+        self.capacity = rate_per_minute
+        self.rate = rate_per_minute / 60.0
+        self.tokens = rate_per_minute
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def wait_time(self, amount, now):
+        """Seconds until amount can be taken; requests larger than the capacity wait for a full bucket"""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def take(self, amount):
+        self.tokens -= min(amount, self.capacity)
+
+    def give_back(self, amount):
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class _ModelBudget:
+    def __init__(self, requests_per_minute, tokens_per_minute):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.paused_until = 0.0
+
+    def wait_time(self, tokens, now):
+        waits = [max(0.0, self.paused_until - now)]
+        if self.requests:
+            waits.append(self.requests.wait_time(1, now))
+        if self.tokens:
+            waits.append(self.tokens.wait_time(tokens, now))
+        return max(waits)
+
+    def take(self, tokens):
+        if self.requests:
+            self.requests.take(1)
+        if self.tokens:
+            self.tokens.take(tokens)
+
+
+class Ticket:
+    """Admission to make one LLM request; hand it back with LLMGovernor.release"""
+
+    def __init__(self, model, tokens, priority, waited):
+        self.model = model
+        self.tokens = tokens
+        self.priority = priority
+        self.waited = waited
+
+
+class LLMGovernor:
+    """
+    Process-wide admission control for LLM requests.
+    Limits concurrent requests and keeps requests/minute and tokens/minute
+    budgets per model. Waiting callers are admitted strictly in priority
+    order, first come first served within a priority.
+    """
+
+    def __init__(self, max_concurrency=LLM_MAX_CONCURRENCY,
+                 requests_per_minute=LLM_REQUESTS_PER_MINUTE,
+                 tokens_per_minute=LLM_TOKENS_PER_MINUTE,
+                 model_limits=None):
+        self.max_concurrency = max_concurrency
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.model_limits = LLM_MODEL_RATE_LIMITS if model_limits is None else model_limits
+        self._condition = threading.Condition()
+        self._waiting = []
+        self._sequence = itertools.count()
+        self._budgets = {}
+        self._active = 0
+        self._admitted = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    def _budget(self, model):
+        if model not in self._budgets:
+            limits = self.model_limits.get(model, {})
+            self._budgets[model] = _ModelBudget(
+                limits.get("requests_per_minute", self.requests_per_minute),
+                limits.get("tokens_per_minute", self.tokens_per_minute)
+            )
+        return self._budgets[model]
+
+    def _try_admit(self, entry, model, tokens, now):
+        """Return 0 if entry was admitted, else the seconds to wait (None when waiting on another caller)"""
+        if self._waiting[0] is not entry:
+            return None
+        if self.max_concurrency and self._active >= self.max_concurrency:
+            return None
+        wait = self._budget(model).wait_time(tokens, now)
+        if wait > 0:
+            return wait
+        heapq.heappop(self._waiting)
+        self._budget(model).take(tokens)
+        self._active += 1
+        return 0
+
+    def _admitted_ticket(self, model, tokens, priority, started_at):
+        waited = time.monotonic() - started_at
+        self._admitted += 1
+        self._total_wait += waited
+        self._max_wait = max(self._max_wait, waited)
+        # The next waiter may be able to go now that the head has moved
+        self._condition.notify_all()
+        return Ticket(model, tokens, priority, waited)
+
+    def acquire(self, model, tokens, priority=PRIORITY_DEFAULT):
+        """Block until a request for model using about tokens tokens may be sent"""
+        started_at = time.monotonic()
+        with self._condition:
+            entry = [priority, next(self._sequence)]
+            heapq.heappush(self._waiting, entry)
+            try:
+                while True:
+                    wait = self._try_admit(entry, model, tokens, time.monotonic())
+                    if wait == 0:
+                        return self._admitted_ticket(model, tokens, priority, started_at)
+                    self._condition.wait(timeout=wait)
+            except BaseException:
+                self._discard(entry)
+                raise
+
+    async def acquire_async(self, model, tokens, priority=PRIORITY_DEFAULT):
+        """Awaitable version of acquire that does not block the event loop while queued"""
+        started_at = time.monotonic()
+        with self._condition:
+            entry = [priority, next(self._sequence)]
+            heapq.heappush(self._waiting, entry)
+        try:
+            while True:
+                with self._condition:
+                    wait = self._try_admit(entry, model, tokens, time.monotonic())
+                    if wait == 0:
+                        return self._admitted_ticket(model, tokens, priority, started_at)
+                await asyncio.sleep(min(wait, 1.0) if wait else ASYNC_POLL_INTERVAL)
+        except BaseException:
+            with self._condition:
+                self._discard(entry)
+            raise
+
+    def _discard(self, entry):
+        if entry in self._waiting:
+            self._waiting.remove(entry)
+            heapq.heapify(self._waiting)
+            self._condition.notify_all()
+
+    def release(self, ticket, used_tokens=None):
+        """Return a concurrency slot, correcting the token budget with the real usage when known"""
+        with self._condition:
+            self._active -= 1
+            budget = self._budget(ticket.model)
+            if used_tokens is not None and budget.tokens:
+                if used_tokens < ticket.tokens:
+                    budget.tokens.give_back(ticket.tokens - used_tokens)
+                else:
+                    budget.tokens.take(used_tokens - ticket.tokens)
+            self._condition.notify_all()
+
+    def pause(self, model, seconds):
+        """Stop admitting requests for model, e.g. after the provider answered 429 with Retry-After"""
+        with self._condition:
+            budget = self._budget(model)
+            budget.paused_until = max(budget.paused_until, time.monotonic() + seconds)
+
+    def metrics(self):
+        """Snapshot of queue depth, active requests and admission wait times"""
+        with self._condition:
+            depth_by_priority = {}
+            for priority, _ in self._waiting:
+                depth_by_priority[priority] = depth_by_priority.get(priority, 0) + 1
+            now = time.monotonic()
+            for budget in self._budgets.values():
+                budget.wait_time(0, now)  # refill before reporting
+            return {
+                "queue_depth": len(self._waiting),
+                "queue_depth_by_priority": depth_by_priority,
+                "active": self._active,
+                "max_concurrency": self.max_concurrency,
+                "admitted": self._admitted,
+                "average_wait_seconds": self._total_wait / self._admitted if self._admitted else 0.0,
+                "max_wait_seconds": self._max_wait,
+                "models": {
+                    model: {
+                        "requests_available": budget.requests.tokens if budget.requests else None,
+                        "tokens_available": budget.tokens.tokens if budget.tokens else None,
+                        "paused_for_seconds": max(0.0, budget.paused_until - now),
+                    }
+                    for model, budget in self._budgets.items()
+                },
+            }
+
+
+governor = LLMGovernor()
@@ -1,94 +1,208 @@
 import os
+import re
+import ast
 import json
+import math
+import asyncio
+import logging
 from re import escape
+from concurrent.futures import ThreadPoolExecutor
+import httpx
 import requests
 from typing import Dict, Any, List
 from fastapi import HTTPException
 from dotenv import load_dotenv
+from utils.llm_client import (
+    chat_completion,
+    async_chat_completion,
+    stream_chat_completion,
+    default_retry_policy,
+    increment_counter,
+    GROQ_MODEL
+)
+from utils.llm_governor import PRIORITY_INTERACTIVE, PRIORITY_DEFAULT, PRIORITY_BATCH
+from utils.token_budget import count_tokens, fit_prompt
+from utils.circuit_breaker import CircuitOpenError
+from utils.llm_cache import cached_generation, cached_generation_async, make_cache_key, llm_cache
+from utils import llm_cache as llm_cache_module
+from utils.json_stream import IncrementalJSONArrayParser
 
 # Load environment variables from .env file
 load_dotenv()
 
-def groq_calling_function(prompt):
-    GROQ_API_KEY = os.getenv('GROQ_API_KEY')
-    if not GROQ_API_KEY:
-        raise ValueError("GROQ_API_KEY environment variable is not set")
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {GROQ_API_KEY}"
-    }
+logger = logging.getLogger(__name__)
+
+CODE_FENCE_PATTERN = re.compile(r"```(?:json)?\s*(.*?)```", re.DOTALL)
+TRAILING_COMMA_PATTERN = re.compile(r",\s*([}\]])")
+SINGLE_QUOTED_PATTERN = re.compile(r"'((?:[^'\\]|\\.)*)'")
+
+# Bump a version whenever its prompt template changes so stale cache entries are not served
+SUBJECTS_PROMPT_VERSION = "1"
+TOPIC_QUIZ_PROMPT_VERSION = "1"
+ASSIGNMENT_QUESTIONS_PROMPT_VERSION = "1"
+DEPENDENCY_SUBJECTS_PROMPT_VERSION = "1"
+TRANSCRIPT_CHUNK_PROMPT_VERSION = "1"
+
+# Per-dependency subject generation (off by default): only catalog misses go to the LLM,
+# in batches of LLM_DEPENDENCY_BATCH_SIZE with at most LLM_DEPENDENCY_CONCURRENCY in flight
+SUBJECTS_PER_DEPENDENCY = os.getenv("SUBJECTS_PER_DEPENDENCY", "false").lower() == "true"
+LLM_DEPENDENCY_BATCH_SIZE = int(os.getenv("LLM_DEPENDENCY_BATCH_SIZE", "8"))
+LLM_DEPENDENCY_CONCURRENCY = int(os.getenv("LLM_DEPENDENCY_CONCURRENCY", "4"))
+
+# Per-subject quiz generation: at most LLM_QUIZ_CONCURRENCY subjects in flight.
+# ASSIGNMENT_QUIZ_QUESTIONS is the size of the merged quiz, split evenly across subjects
+LLM_QUIZ_CONCURRENCY = int(os.getenv("LLM_QUIZ_CONCURRENCY", "4"))
+ASSIGNMENT_QUIZ_QUESTIONS = int(os.getenv("ASSIGNMENT_QUIZ_QUESTIONS", "15"))
+
+# KT transcript digestion: transcripts over KT_CHUNK_TOKEN_BUDGET tokens are split on
+# speaker turns, summarized chunk by chunk (LLM_SUMMARY_CONCURRENCY at a time) and then merged
+KT_CHUNK_TOKEN_BUDGET = int(os.getenv("KT_CHUNK_TOKEN_BUDGET", "3000"))
+LLM_SUMMARY_CONCURRENCY = int(os.getenv("LLM_SUMMARY_CONCURRENCY", "4"))
+# Rounds of condensing partial notes before the final digest is written regardless of size
+KT_MAX_REDUCE_ROUNDS = 3
+
+def extract_json(generated_text):
+    # Parse the JSON from the generated text
+    # Find the first { and last } to handle any extra text
+    start = generated_text.find('{')
+    end = generated_text.rfind('}') + 1
+    json_str = generated_text[start:end]
+
+    return json.loads(json_str)
+
+def repair_json(generated_text):
+    """
+    Cheap local repairs for almost-valid JSON returned by the model:
+    code fences, trailing commas and single-quoted strings.
+    Raises json.JSONDecodeError if none of the repairs produce valid JSON.
+    """
+    fenced = CODE_FENCE_PATTERN.search(generated_text)
+    if fenced:
+        generated_text = fenced.group(1)
+    start = generated_text.find('{')
+    end = generated_text.rfind('}') + 1
+    json_str = TRAILING_COMMA_PATTERN.sub(r"\1", generated_text[start:end])
 
-    data = {
-        "model": "llama-3.3-70b-versatile",
-        "messages": [{
-            "role": "user",
-            "content": prompt
-        }]
-    }
+    try:
+        return json.loads(json_str)
+    except json.JSONDecodeError as err:
+        last_error = err
 
+    # Python-style dicts (single quotes, True/False/None)
     try:
-        response = requests.post(
-            "https://api.groq.com/openai/v1/chat/completions",
-            headers=headers,
-            json=data
-        )
-        response.raise_for_status()
-        
-        # Extract the generated text from the response
-        generated_text = response.json()['choices'][0]['message']['content']
-        
-        # Parse the JSON from the generated text
-        # Find the first { and last } to handle any extra text
-        start = generated_text.find('{')
-        end = generated_text.rfind('}') + 1
-        json_str = generated_text[start:end]
-        
-        data = json.loads(json_str)
+        data = ast.literal_eval(json_str)
+        if isinstance(data, dict):
+            return data
+    except (ValueError, SyntaxError, MemoryError, RecursionError):
+        pass
+
+    # Single-quoted JSON with lowercase literals
+    try:
+        return json.loads(SINGLE_QUOTED_PATTERN.sub(
+            lambda match: json.dumps(match.group(1).replace("\\'", "'")), json_str
+        ))
+    except json.JSONDecodeError:
+        raise last_error
+
+def parse_json_response(generated_text):
+    """Parse the model output as JSON, falling back to local repair"""
+    try:
+        return extract_json(generated_text)
+    except json.JSONDecodeError:
+        data = repair_json(generated_text)
+        increment_counter("json_repairs")
         return data
 
+def groq_calling_function(prompt, retry_policy=None, priority=PRIORITY_DEFAULT, call_site="default"):
+    """
+    Call the LLM and parse its output as JSON.
+    Unparseable output is repaired locally first and re-requested at most
+    retry_policy.max_attempts times in total.
+    """
+    policy = retry_policy or default_retry_policy
+    for attempt in range(1, policy.max_attempts + 1):
+        try:
+            generated_text = chat_completion(prompt, retry_policy=policy, priority=priority, call_site=call_site)
+            data = parse_json_response(generated_text)
+            return data
+
+        except requests.exceptions.RequestException as e:
+            raise Exception(f"Error calling Groq API: {str(e)}")
+        except json.JSONDecodeError as e:
+            if attempt == policy.max_attempts:
+                raise Exception(f"Error parsing JSON from LLM response: {str(e)}")
+            increment_counter("json_rerequests")
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            raise Exception(f"Unexpected error: {str(e)}")
+
+def groq_calling_function_string(prompt, priority=PRIORITY_DEFAULT, call_site="default"):
+    try:
+        generated_text = chat_completion(prompt, priority=priority, call_site=call_site)
+        return generated_text
     except requests.exceptions.RequestException as e:
         raise Exception(f"Error calling Groq API: {str(e)}")
-    except json.JSONDecodeError as e:
-        # print("generated_text",generated_text)
-        return groq_calling_function(prompt)
-        # raise Exception(f"Error parsing LLM response as JSON: {str(e)}")
+    except CircuitOpenError:
+        raise
     except Exception as e:
         raise Exception(f"Unexpected error: {str(e)}")
 
-def groq_calling_function_string(prompt):
-    GROQ_API_KEY = os.getenv('GROQ_API_KEY')
-    if not GROQ_API_KEY:
-        raise ValueError("GROQ_API_KEY environment variable is not set")
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {GROQ_API_KEY}"
-    }
-
-    data = {
-        "model": "llama-3.3-70b-versatile",
-        "messages": [{
-            "role": "user",
-            "content": prompt
-        }]
-    }
+def stream_json_array(prompt, array_key, priority=PRIORITY_DEFAULT, call_site="default"):
+    """
+    Stream the LLM output and yield ("item", element) for each element of the
+    top-level array_key as soon as it is complete, then ("done", document)
+    with the whole parsed response.
+    """
+    parser = IncrementalJSONArrayParser(array_key)
+    chunks = []
+    try:
+        for chunk in stream_chat_completion(prompt, priority=priority, call_site=call_site):
+            chunks.append(chunk)
+            for element in parser.feed(chunk):
+                yield "item", element
+    except requests.exceptions.RequestException as e:
+        raise Exception(f"Error calling Groq API: {str(e)}")
 
     try:
-        response = requests.post(
-            "https://api.groq.com/openai/v1/chat/completions",
-            headers=headers,
-            json=data
-        )
-        response.raise_for_status()
-        
-        # Extract the generated text from the response
-        generated_text = response.json()['choices'][0]['message']['content']
+        yield "done", parse_json_response("".join(chunks))
+    except json.JSONDecodeError as e:
+        raise Exception(f"Error parsing JSON from LLM response: {str(e)}")
+
+async def groq_calling_function_async(prompt, retry_policy=None, priority=PRIORITY_DEFAULT, call_site="default"):
+    """Awaitable version of groq_calling_function for async routes"""
+    policy = retry_policy or default_retry_policy
+    for attempt in range(1, policy.max_attempts + 1):
+        try:
+            generated_text = await async_chat_completion(prompt, retry_policy=policy, priority=priority, call_site=call_site)
+            data = parse_json_response(generated_text)
+            return data
+
+        except httpx.HTTPError as e:
+            raise Exception(f"Error calling Groq API: {str(e)}")
+        except json.JSONDecodeError as e:
+            if attempt == policy.max_attempts:
+                raise Exception(f"Error parsing JSON from LLM response: {str(e)}")
+            increment_counter("json_rerequests")
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            raise Exception(f"Unexpected error: {str(e)}")
+
+async def groq_calling_function_string_async(prompt, priority=PRIORITY_DEFAULT, call_site="default"):
+    """Awaitable version of groq_calling_function_string for async routes"""
+    try:
+        generated_text = await async_chat_completion(prompt, priority=priority, call_site=call_site)
         return generated_text
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         raise Exception(f"Error calling Groq API: {str(e)}")
+    except CircuitOpenError:
+        raise
     except Exception as e:
         raise Exception(f"Unexpected error: {str(e)}")
 
 def remove_less_valuable_changes_from_commit(changes):
+    """Optional LLM review of a commit summary already reduced by github_utils.filter_commits"""
     prompt = f"""
 
         You are provided with a commit log that contains one or more commits. Each commit includes a commit message and a list of files with the number of lines changed. Your task is to filter out the file changes that are not considered "valuable" based on the following rules:
@@ -107,12 +221,30 @@ def remove_less_valuable_changes_from_commit(changes):
         Input: {changes}
 
     """
-    output_string = groq_calling_function_string(prompt)
+    output_string = groq_calling_function_string(prompt, call_site="commit_filter")
     return output_string
     
-def generate_subjects_from_dependencies(dependencies):
+def normalize_text(value):
+    return " ".join(str(value).split()).lower()
+
+def normalize_dependencies(dependencies):
+    return sorted({normalize_text(dependency) for dependency in dependencies if str(dependency).strip()})
+
+def normalize_subjects(subjects):
+    return sorted(
+        [{
+            "subject_name": normalize_text(subject["subject_name"]),
+            "topics": sorted(normalize_text(topic) for topic in subject["topics"])
+        } for subject in subjects],
+        key=lambda subject: subject["subject_name"]
+    )
+
+def subjects_from_dependencies_prompt(dependencies):
     # print(dependencies)
-    prompt = f"""
+    return fit_prompt(_subjects_from_dependencies_prompt, str(dependencies), "subjects")
+
+def _subjects_from_dependencies_prompt(dependencies):
+    return f"""
     Create subjects that cover the core areas of dependencies and include relevant topics with different levels of depth (e.g., basic, intermediate, advanced) from a professional point of view.
     Also make sure you remove the dependencies that are not technically relevant like icons related dependencies etc.
 
@@ -133,6 +265,115 @@ def generate_subjects_from_dependencies(dependencies):
     Make sure the response is a valid JSON string.
     """
 
+def dependency_subjects_prompt(dependencies):
+    return fit_prompt(_dependency_subjects_prompt, json.dumps(dependencies), "dependency_subjects")
+
+def _dependency_subjects_prompt(dependencies):
+    return f"""
+    For each of the following dependencies, create the subjects that cover its core areas and include relevant topics with different levels of depth (e.g., basic, intermediate, advanced) from a professional point of view.
+    If a dependency is not technically relevant, like icons related dependencies etc., give it an empty list of subjects.
+
+    Dependencies:
+
+    {dependencies}
+
+    Return the response in the following JSON format, with one key for every dependency exactly as given:
+    {{
+    "dependencies": {{
+        "dependency-name": [
+            {{
+                "subject_name": "Subject Name",
+                "topics": ["Topic 1", "Topic 2", "Topic 3"]
+            }}
+        ]
+    }}
+    }}
+
+    Make sure the response is a valid JSON string.
+    """
+
+def merge_subjects(subject_lists):
+    """
+    Merge per-dependency subject lists into the {"subjects": [...]} shape,
+    combining subjects with the same name and de-duplicating their topics.
+    """
+    merged = {}
+    for subjects in subject_lists:
+        for subject in subjects:
+            name = subject.get("subject_name", "").strip()
+            if not name:
+                continue
+            entry = merged.setdefault(normalize_text(name), {"subject_name": name, "topics": []})
+            seen = {normalize_text(topic) for topic in entry["topics"]}
+            for topic in subject.get("topics", []):
+                if normalize_text(topic) not in seen:
+                    seen.add(normalize_text(topic))
+                    entry["topics"].append(topic)
+    return {"subjects": list(merged.values())}
+
+def _dependency_catalog_key(dependency):
+    return make_cache_key("dependency_subjects", DEPENDENCY_SUBJECTS_PROMPT_VERSION, GROQ_MODEL, dependency)
+
+def _lookup_dependency_catalog(dependencies, bypass_cache):
+    """Split normalized dependencies into catalog hits and misses"""
+    found = {}
+    misses = []
+    for dependency in dependencies:
+        cached = None
+        if llm_cache_module.LLM_CACHE_ENABLED and not bypass_cache:
+            cached = llm_cache.get(_dependency_catalog_key(dependency))
+        if cached is None:
+            misses.append(dependency)
+        else:
+            found[dependency] = cached
+    return found, misses
+
+def _store_dependency_batch(batch, data):
+    """Record the subjects returned for one batch in the catalog"""
+    returned = {
+        normalize_text(name): subjects
+        for name, subjects in (data.get("dependencies") or {}).items()
+        if isinstance(subjects, list)
+    }
+    results = {}
+    for dependency in batch:
+        # Dependencies the model skipped are not cached so they are retried next time
+        if dependency in returned:
+            results[dependency] = returned[dependency]
+            if llm_cache_module.LLM_CACHE_ENABLED:
+                llm_cache.set(_dependency_catalog_key(dependency), returned[dependency], "dependency_subjects")
+    return results
+
+def _dependency_batches(misses):
+    return [misses[i:i + LLM_DEPENDENCY_BATCH_SIZE] for i in range(0, len(misses), LLM_DEPENDENCY_BATCH_SIZE)]
+
+def generate_subjects_per_dependency(dependencies, bypass_cache=False):
+    """
+    Generate subjects dependency by dependency using the persistent catalog.
+    Only dependencies missing from the catalog are sent to the LLM, in small parallel batches.
+    """
+    normalized = normalize_dependencies(dependencies)
+    found, misses = _lookup_dependency_catalog(normalized, bypass_cache)
+
+    def generate_batch(batch):
+        data = groq_calling_function(dependency_subjects_prompt(batch), call_site="dependency_subjects")
+        return _store_dependency_batch(batch, data)
+
+    if misses:
+        with ThreadPoolExecutor(max_workers=LLM_DEPENDENCY_CONCURRENCY) as executor:
+            for results in executor.map(generate_batch, _dependency_batches(misses)):
+                found.update(results)
+
+    return merge_subjects(found[dependency] for dependency in normalized if dependency in found)
+
+def generate_subjects_from_dependencies(dependencies, bypass_cache=False, per_dependency=None):
+    if per_dependency is None:
+        per_dependency = SUBJECTS_PER_DEPENDENCY
+    if per_dependency:
+        return generate_subjects_per_dependency(dependencies, bypass_cache=bypass_cache)
+
+    prompt = subjects_from_dependencies_prompt(dependencies)
+
     # Output Format: Respond with a JSON array containing objects. Each object should have a "name" field for the subject and a "topics" field which is an array of strings.
     # JSON Structure Example:
     # [
@@ -156,7 +397,12 @@ def generate_subjects_from_dependencies(dependencies):
 
     # Make sure the response is a valid JSON string."""
     # print(prompt)
-    subjects = groq_calling_function(prompt)
+    subjects = cached_generation(
+        "subjects_from_dependencies", SUBJECTS_PROMPT_VERSION, GROQ_MODEL,
+        normalize_dependencies(dependencies),
+        lambda: groq_calling_function(prompt, call_site="subjects"),
+        bypass_cache=bypass_cache
+    )
     # print(subjects)
     return subjects
 
@@ -187,8 +433,8 @@ def generate_digested_transcripts_old(raw_transcripts):
     data = groq_calling_function(prompt)
     return data
 
-def generate_digested_transcripts_github(raw_transcripts):
-    prompt = f"""
+def digested_transcripts_github_prompt(raw_transcripts):
+    return f"""
     You are provided with a transcript of a conversation between a voice-based AI agent and a project team member.
 
     The transcript is an array of strings that documents the conversation about the project. It covers:
@@ -202,11 +448,9 @@ def generate_digested_transcripts_github(raw_transcripts):
     Make sure you do not omit any important details.
     {raw_transcripts}
     """
-    data = groq_calling_function_string(prompt)
-    return data
 
-def generate_digested_transcripts(raw_transcripts):
-    prompt = f"""
+def digested_transcripts_prompt(raw_transcripts):
+    return f"""
     You are provided with a transcript of a conversation between a voice-based AI agent and a project team member. The transcript is an array of strings that covers various aspects of the project, including product overview, business context, product history, system architecture, technology stack, development process, security, monitoring, team collaboration, known issues, future roadmap, and more.
 
     Task:
@@ -281,46 +525,155 @@ def generate_digested_transcripts(raw_transcripts):
     Your output should be clear, concise, and organized, enabling someone new to the project to quickly grasp the essential information.
     {raw_transcripts}
     """
-    # print(prompt)
-    GROQ_API_KEY = os.getenv('GROQ_API_KEY')
-    if not GROQ_API_KEY:
-        raise ValueError("GROQ_API_KEY environment variable is not set")
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {GROQ_API_KEY}"
-    }
 
-    data = {
-        "model": "llama-3.3-70b-versatile",
-        "messages": [{
-            "role": "user",
-            "content": prompt
-        }]
-    }
+def split_turn(turn, token_budget):
+    """Split a single speaker turn that is over budget at whitespace"""
+    max_chars = token_budget * 4
+    pieces = []
+    while len(turn) > max_chars:
+        cut = turn.rfind(" ", 0, max_chars)
+        if cut <= 0:
+            cut = max_chars
+        pieces.append(turn[:cut])
+        turn = turn[cut:].lstrip()
+    pieces.append(turn)
+    return pieces
+
+def chunk_transcripts(transcripts, token_budget=None):
+    """
+    Group consecutive speaker turns into chunks of at most token_budget tokens.
+    Turns are never split unless a single turn is over budget on its own.
+    """
+    token_budget = token_budget or KT_CHUNK_TOKEN_BUDGET
+    chunks = []
+    current = []
+    current_tokens = 0
+    for turn in transcripts:
+        for piece in split_turn(str(turn), token_budget):
+            tokens = count_tokens(piece)
+            if current and current_tokens + tokens > token_budget:
+                chunks.append(current)
+                current = []
+                current_tokens = 0
+            current.append(piece)
+            current_tokens += tokens
+    if current:
+        chunks.append(current)
+    return chunks
+
+def transcript_chunk_prompt(chunk, part, total_parts):
+    return f"""
+    You are provided with part {part} of {total_parts} of a transcript of a knowledge transfer conversation between a voice-based AI agent and a project team member.
+    The transcript part is an array of strings, one per speaker turn.
 
+    Task:
+    Write detailed notes of every fact stated in this part: product purpose and users, history, architecture, files and their purposes,
+    technology stack, development process, documentation, security and performance, monitoring, team and communication,
+    known issues and technical debt, roadmap, onboarding advice, challenges, pitfalls and lessons learned.
+    Keep names, numbers and technical details exactly as stated. Do not add anything that is not in the transcript.
+    Return the notes as plain text.
+    {chunk}
+    """
+
+def condensed_transcript_prompt(final_prompt, partial_digests):
+    """Final digest prompt over the notes taken from each part of a long transcript"""
+    return final_prompt(partial_digests) + """
+    Note: the transcript above has been condensed into notes from consecutive parts of one long conversation.
+    Merge them into a single digest and remove repeated points.
+    """
+
+def final_digest_prompt(final_prompt, raw_transcripts, notes, call_site):
+    """Digest prompt over the transcript, or over its notes once condensed, cut to the call site's budget"""
+    if notes is None:
+        return fit_prompt(final_prompt, str(raw_transcripts), call_site)
+    return fit_prompt(lambda text: condensed_transcript_prompt(final_prompt, text), str(notes), call_site)
+
+def _chunk_digest_cache_args(chunk):
+    return ("transcript_chunk_digest", TRANSCRIPT_CHUNK_PROMPT_VERSION, GROQ_MODEL, chunk)
+
+def digest_transcripts(raw_transcripts, final_prompt, call_site="transcript_digest"):
+    """
+    Map-reduce digest of a KT transcript.
+    Transcripts within the chunk budget are digested in a single call. Longer ones
+    are summarized chunk by chunk in parallel, with each chunk's notes cached so
+    an edited transcript only re-summarizes the chunks that changed, and the
+    notes are then merged into the final digest.
+    """
+    notes = list(raw_transcripts)
+    condensed = False
+    for _ in range(KT_MAX_REDUCE_ROUNDS):
+        chunks = chunk_transcripts(notes)
+        if len(chunks) <= 1:
+            break
+
+        def summarize(index, chunk, total_parts=len(chunks)):
+            prompt = fit_prompt(
+                lambda text: transcript_chunk_prompt(text, index + 1, total_parts), str(chunk), "transcript_chunk_digest"
+            )
+            return cached_generation(
+                *_chunk_digest_cache_args(chunk),
+                lambda: groq_calling_function_string(prompt, priority=PRIORITY_BATCH, call_site="transcript_chunk_digest")
+            )
+
+        with ThreadPoolExecutor(max_workers=LLM_SUMMARY_CONCURRENCY) as executor:
+            notes = list(executor.map(summarize, range(len(chunks)), chunks))
+        condensed = True
+
+    prompt = final_digest_prompt(final_prompt, raw_transcripts, notes if condensed else None, call_site)
+    return groq_calling_function_string(prompt, priority=PRIORITY_BATCH, call_site=call_site)
+
+async def digest_transcripts_async(raw_transcripts, final_prompt, call_site="transcript_digest"):
+    """Awaitable version of digest_transcripts"""
+    semaphore = asyncio.Semaphore(LLM_SUMMARY_CONCURRENCY)
+    notes = list(raw_transcripts)
+    condensed = False
+    for _ in range(KT_MAX_REDUCE_ROUNDS):
+        chunks = chunk_transcripts(notes)
+        if len(chunks) <= 1:
+            break
+
+        async def summarize(index, chunk, total_parts=len(chunks)):
+            prompt = fit_prompt(
+                lambda text: transcript_chunk_prompt(text, index + 1, total_parts), str(chunk), "transcript_chunk_digest"
+            )
+            async with semaphore:
+                return await cached_generation_async(
+                    *_chunk_digest_cache_args(chunk),
+                    lambda: groq_calling_function_string_async(prompt, priority=PRIORITY_BATCH, call_site="transcript_chunk_digest")
+                )
+
+        notes = list(await asyncio.gather(*[summarize(index, chunk) for index, chunk in enumerate(chunks)]))
+        condensed = True
+
+    prompt = final_digest_prompt(final_prompt, raw_transcripts, notes if condensed else None, call_site)
+    return await groq_calling_function_string_async(prompt, priority=PRIORITY_BATCH, call_site=call_site)
+
+def generate_digested_transcripts(raw_transcripts):
     try:
-        response = requests.post(
-            "https://api.groq.com/openai/v1/chat/completions",
-            headers=headers,
-            json=data
-        )
-        response.raise_for_status()
-        
-        # Extract the generated text from the response
-        generated_text = response.json()['choices'][0]['message']['content']
-        
-        return generated_text 
+        return digest_transcripts(raw_transcripts, digested_transcripts_prompt)
+    except CircuitOpenError:
+        raise
     except Exception as err:
         raise HTTPException(status_code = 500,detail=str(err))
 
-def generate_toic_quiz(topic):
-    """
-    Generate quiz questions using Groq's LLM API for a single topic
-    """
+async def generate_digested_transcripts_async(raw_transcripts):
+    try:
+        return await digest_transcripts_async(raw_transcripts, digested_transcripts_prompt)
+    except CircuitOpenError:
+        raise
+    except Exception as err:
+        raise HTTPException(status_code = 500,detail=str(err))
+
+def generate_digested_transcripts_github(raw_transcripts):
+    return digest_transcripts(raw_transcripts, digested_transcripts_github_prompt, call_site="github_transcript_digest")
+
+async def generate_digested_transcripts_github_async(raw_transcripts):
+    return await digest_transcripts_async(raw_transcripts, digested_transcripts_github_prompt, call_site="github_transcript_digest")
 
+def topic_quiz_prompt(topic):
     # there should be a maximum of 3 three questions in this quiz as i am testing my system at this point.
 
-    prompt = f"""Generate a multiple choice quiz for the following topic: {topic}. 
+    return f"""Generate a multiple choice quiz for the following topic: {topic}. 
     Create questions that cover the topic with 4 options each and one correct answer.
     The questions should test the in depth knowledge of the topic and should be representative of real world scenarios.
     The quiz should have at least 10 questions.
@@ -340,22 +693,53 @@ def generate_toic_quiz(topic):
         ]
     }}
     Make sure the response is a valid JSON string."""
-    data = groq_calling_function(prompt)
+
+def generate_toic_quiz(topic, bypass_cache=False):
+    """
+    Generate quiz questions using Groq's LLM API for a single topic
+    """
+    prompt = topic_quiz_prompt(topic)
+    data = cached_generation(
+        "topic_quiz", TOPIC_QUIZ_PROMPT_VERSION, GROQ_MODEL,
+        normalize_text(topic),
+        lambda: groq_calling_function(prompt, priority=PRIORITY_INTERACTIVE, call_site="topic_quiz"),
+        bypass_cache=bypass_cache
+    )
 
     return data
 
-def generate_assignment_questions(subjects):
+def stream_topic_quiz(topic, bypass_cache=False):
     """
-    Generate assignment questions using Groq's LLM API
+    Streaming version of generate_toic_quiz.
+    Yields ("question", question) as each question is generated, then ("done", quiz).
+    A cached quiz is replayed immediately and a streamed quiz is added to the cache.
     """
-
+    key = make_cache_key("topic_quiz", TOPIC_QUIZ_PROMPT_VERSION, GROQ_MODEL, normalize_text(topic))
+    if llm_cache_module.LLM_CACHE_ENABLED and not bypass_cache:
+        cached = llm_cache.get(key)
+        if cached is not None:
+            for question in cached.get("questions", []):
+                yield "question", question
+            yield "done", cached
+            return
+
+    for event, data in stream_json_array(topic_quiz_prompt(topic), "questions", priority=PRIORITY_INTERACTIVE, call_site="topic_quiz"):
+        if event == "item":
+            yield "question", data
+        else:
+            if llm_cache_module.LLM_CACHE_ENABLED:
+                llm_cache.set(key, data, "topic_quiz")
+            yield "done", data
+
+def assignment_questions_prompt(subjects, question_count=None):
     subject_text = "\n\n".join(
     f"Subject: {subject['subject_name']}\nTopics: {', '.join(subject['topics'])}"
     for subject in subjects
     )
-    prompt = f"""
+    size = f"exactly {question_count} questions" if question_count else "more than ten questions"
+    return f"""
     Create questions that cover the topics with four options each and one correct answer make sure there are enough questions for each topic.
-    The quiz should have more than ten questions and each topic should be represented with different levels of questions (e.g., easy, medium, hard) from a proffessional point of view.
+    The quiz should have {size} and each topic should be represented with different levels of questions (e.g., easy, medium, hard) from a proffessional point of view.
     Generate a multiple choice quiz for the following subjects: \n\n{subject_text}. 
     Return the response in the following JSON format:
     {{
@@ -373,7 +757,106 @@ def generate_assignment_questions(subjects):
     }}
     Make sure the response is a valid JSON string."""
 
-    data = groq_calling_function(prompt)
+def balance_questions_by_topic(questions):
+    """Interleave questions round-robin across topics so no topic is bunched together"""
+    by_topic = {}
+    for question in questions:
+        by_topic.setdefault(normalize_text(question.get("topic", "")), []).append(question)
+    balanced = []
+    queues = list(by_topic.values())
+    while queues:
+        balanced.extend(queue.pop(0) for queue in queues)
+        queues = [queue for queue in queues if queue]
+    return balanced
+
+def merge_subject_quizzes(subjects, quizzes, max_questions=None):
+    """
+    Merge per-subject quizzes into the {"title", "questions"} shape.
+    Subjects whose generation failed (None) are skipped; question ids are renumbered.
+    With max_questions the balanced list is cut to that many, keeping every topic represented first.
+    """
+    questions = []
+    subject_names = []
+    for subject, quiz in zip(subjects, quizzes):
+        if not quiz:
+            continue
+        subject_names.append(subject["subject_name"])
+        for question in quiz.get("questions", []):
+            question = dict(question)
+            question.setdefault("topic", subject["subject_name"])
+            questions.append(question)
+
+    questions = balance_questions_by_topic(questions)
+    if max_questions:
+        questions = questions[:max_questions]
+    for index, question in enumerate(questions, start=1):
+        question["id"] = index
+
+    return {
+        "title": f"Skill Assessment: {', '.join(subject_names)}",
+        "questions": questions
+    }
+
+def _subject_quiz_cache_args(subject, question_count):
+    payload = {"subjects": normalize_subjects([subject]), "question_count": question_count}
+    return ("subject_questions", ASSIGNMENT_QUESTIONS_PROMPT_VERSION, GROQ_MODEL, payload)
+
+def generate_assignment_questions_per_subject(subjects, bypass_cache=False, total_questions=None):
+    """
+    Generate each subject's questions concurrently and merge them.
+    Each subject is asked for its share of total_questions (ASSIGNMENT_QUIZ_QUESTIONS by default)
+    and the merged quiz is capped at that total.
+    Subjects that fail are tried once more; if the merged quiz still has fewer than
+    total_questions questions, an exception is raised instead of returning a short quiz.
+    """
+    total_questions = total_questions or ASSIGNMENT_QUIZ_QUESTIONS
+    question_count = max(1, math.ceil(total_questions / max(1, len(subjects))))
+
+    def generate_subject(subject):
+        prompt = assignment_questions_prompt([subject], question_count)
+        try:
+            return cached_generation(
+                *_subject_quiz_cache_args(subject, question_count),
+                lambda: groq_calling_function(prompt, call_site="assignment_questions"),
+                bypass_cache=bypass_cache
+            )
+        except Exception as err:
+            logger.warning("Error generating questions for %s: %s", subject['subject_name'], err)
+            return None
+
+    with ThreadPoolExecutor(max_workers=LLM_QUIZ_CONCURRENCY) as executor:
+        quizzes = list(executor.map(generate_subject, subjects))
+        failed = [index for index, quiz in enumerate(quizzes) if not quiz]
+        for index, quiz in zip(failed, executor.map(generate_subject, [subjects[index] for index in failed])):
+            quizzes[index] = quiz
+
+    if subjects and not any(quizzes):
+        raise Exception("Failed to generate questions for every subject")
+    quiz = merge_subject_quizzes(subjects, quizzes, max_questions=total_questions)
+    if len(quiz["questions"]) < total_questions:
+        failed_names = [subject["subject_name"] for subject, subject_quiz in zip(subjects, quizzes) if not subject_quiz]
+        raise Exception(
+            f"Generated {len(quiz['questions'])} of {total_questions} questions"
+            + (f"; failed subjects: {', '.join(failed_names)}" if failed_names else "")
+        )
+    return quiz
+
+def generate_assignment_questions(subjects, bypass_cache=False, per_subject=False):
+    """
+    Generate assignment questions using Groq's LLM API
+    With per_subject=True each subject is generated concurrently and merged.
+    """
+    if per_subject:
+        return generate_assignment_questions_per_subject(subjects, bypass_cache=bypass_cache)
+
+    prompt = assignment_questions_prompt(subjects)
+
+    data = cached_generation(
+        "assignment_questions", ASSIGNMENT_QUESTIONS_PROMPT_VERSION, GROQ_MODEL,
+        normalize_subjects(subjects),
+        lambda: groq_calling_function(prompt, call_site="assignment_questions"),
+        bypass_cache=bypass_cache
+    )
 
     return data
 
@@ -405,17 +888,14 @@ learning_paths_json_structure = """
 }
 """
 
-def generate_learning_path(topics: List[str], scores: Dict[str, int]) -> Dict[str, Any]:
-    """
-    Generate a personalized learning path based on the provided topics and initial quiz scores.
-    For each topic, the generated learning path will include an estimated number of study hours,
-    an assessment configuration, and a link to official documentation.
-    """
-    
+def learning_path_prompt(topics: List[str], scores: Dict[str, int]) -> str:
     # Map each topic to its initial score for context
     topics_scores = " ".join([f"{topic}: {scores.get(topic, 'N/A')}" for topic in topics])
     
-    prompt = f"""Generate a personalized learning path for a professional project using the following topics and their corresponding initial quiz scores: {topics_scores}
+    return fit_prompt(_learning_path_prompt, topics_scores, "learning_path")
+
+def _learning_path_prompt(topics_scores: str) -> str:
+    return f"""Generate a personalized learning path for a professional project using the following topics and their corresponding initial quiz scores: {topics_scores}
 
 For each topic, generate:
     - An estimated number of study hours required for understanding a topic according to the user score in the topic .
@@ -429,15 +909,43 @@ Return the response in the following JSON format:
 {learning_paths_json_structure}
 Make sure the response is a valid JSON string."""
 
+def init_subject_progress(subject, is_first=False):
+    """Set the progress fields of a freshly generated learning path subject"""
+    subject["is_completed"] = 'false'
+    subject["is_started"] = 'true' if is_first else 'false'
+    subject["assessment"]["status"] = "pending"
+    subject["assessment"]["score"] = 'null'
+    for topic in subject["topics"]:
+        topic["is_completed"] = 'false'
+    return subject
+
+def generate_learning_path(topics: List[str], scores: Dict[str, int]) -> Dict[str, Any]:
+    """
+    Generate a personalized learning path based on the provided topics and initial quiz scores.
+    For each topic, the generated learning path will include an estimated number of study hours,
+    an assessment configuration, and a link to official documentation.
+    """
+    prompt = learning_path_prompt(topics, scores)
+
     # print(prompt)
-    data = groq_calling_function(prompt)
-    for subject in data["subjects"]:
-        subject["is_completed"] = 'false'
-        subject["is_started"] = 'false'
-        subject["assessment"]["status"] = "pending"
-        subject["assessment"]["score"] = 'null'
-        for topic in subject["topics"]:
-            topic["is_completed"] = 'false'
-
-    data["subjects"][0]["is_started"]='true'
+    data = groq_calling_function(prompt, call_site="learning_path")
+    for index, subject in enumerate(data["subjects"]):
+        init_subject_progress(subject, is_first=index == 0)
     return data
+
+def stream_learning_path(topics: List[str], scores: Dict[str, int]):
+    """
+    Streaming version of generate_learning_path.
+    Yields ("subject", subject) as each subject is generated, then ("done", learning_path).
+    """
+    streamed = 0
+    for event, data in stream_json_array(learning_path_prompt(topics, scores), "subjects", call_site="learning_path"):
+        if event == "item":
+            # Skip malformed subjects here; the final document is still validated
+            if isinstance(data.get("assessment"), dict) and isinstance(data.get("topics"), list):
+                yield "subject", init_subject_progress(data, is_first=streamed == 0)
+                streamed += 1
+        else:
+            for index, subject in enumerate(data["subjects"]):
+                init_subject_progress(subject, is_first=index == 0)
+            yield "done", data
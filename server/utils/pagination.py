@@ -0,0 +1,18 @@
+async def cursor_page(db, statement, id_column, response, cursor=None, limit=None):
+    """
+    Rows of the select statement ordered by id_column, starting after the cursor id.
+    Without a limit every remaining row is returned. With a limit one extra row
+    is fetched to tell whether more follow; if so, the id to pass as the next
+    cursor is returned in the X-Next-Cursor header.
+    """
+    statement = statement.order_by(id_column)
+    if cursor is not None:
+        statement = statement.filter(id_column > cursor)
+    if limit is None:
+        return (await db.execute(statement)).scalars().unique().all()
+
+    rows = (await db.execute(statement.limit(limit + 1))).scalars().unique().all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = str(rows[-1].id)
+    return rows
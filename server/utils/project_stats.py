@@ -0,0 +1,143 @@
+import os
+from sqlalchemy import event, case, func, inspect, select
+from sqlalchemy.orm import Session
+from dotenv import load_dotenv
+
+import models
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Serve project completion stats from the project_stats table instead of aggregating
+# learning_paths on each request; the table is rebuilt on startup and then kept up
+# to date by the flush hook below
+PROJECT_STATS_MATERIALIZED = os.getenv("PROJECT_STATS_MATERIALIZED", "false").lower() == "true"
+
+
+def completion_rate(total_topics, completed_topics):
+    """Completion percentage of one learning path; paths without topics count as 0"""
+    if not total_topics or total_topics <= 0:
+        return 0.0
+    return (completed_topics or 0) * 100.0 / total_topics
+
+
+def completion_rate_column():
+    """SQL version of completion_rate over learning_paths"""
+    return case(
+        (models.LearningPath.total_topics > 0,
+         models.LearningPath.completed_topics * 100.0 / models.LearningPath.total_topics),
+        else_=0.0
+    )
+
+
+def completion_stats_query(db):
+    """(project id, name, average completion) for every project, aggregated with one GROUP BY"""
+    per_project = (
+        db.query(
+            models.LearningPath.project_id.label("project_id"),
+            func.avg(completion_rate_column()).label("completion_rate")
+        )
+        .group_by(models.LearningPath.project_id)
+        .subquery()
+    )
+    return (
+        db.query(models.Project.id, models.Project.name, func.coalesce(per_project.c.completion_rate, 0.0))
+        .outerjoin(per_project, per_project.c.project_id == models.Project.id)
+        .order_by(models.Project.id)
+    )
+
+
+def materialized_stats_query(db):
+    """Same rows as completion_stats_query, read from the project_stats table"""
+    stats = models.ProjectStats
+    return (
+        db.query(
+            models.Project.id,
+            models.Project.name,
+            case((stats.learning_paths > 0, stats.completion_total / stats.learning_paths), else_=0.0)
+        )
+        .outerjoin(stats, stats.project_id == models.Project.id)
+        .order_by(models.Project.id)
+    )
+
+
+def rebuild_project_stats(db):
+    """Recompute project_stats from learning_paths in one transaction"""
+    table = models.ProjectStats.__table__
+    db.execute(table.delete())
+    db.execute(table.insert().from_select(
+        ["project_id", "learning_paths", "completion_total"],
+        select(
+            models.LearningPath.project_id,
+            func.count(models.LearningPath.id),
+            func.sum(completion_rate_column())
+        ).group_by(models.LearningPath.project_id)
+    ))
+    db.commit()
+
+
+def _previous(state, key):
+    history = state.attrs[key].history
+    if history.deleted:
+        return history.deleted[0]
+    if history.unchanged:
+        return history.unchanged[0]
+    return getattr(state.obj(), key)
+
+
+def _apply_deltas(connection, deltas):
+    table = models.ProjectStats.__table__
+    for project_id, (paths, completion) in deltas.items():
+        if not paths and not completion:
+            continue
+        updated = connection.execute(
+            table.update()
+            .where(table.c.project_id == project_id)
+            .values(
+                learning_paths=table.c.learning_paths + paths,
+                completion_total=table.c.completion_total + completion,
+                updated_at=func.now()
+            )
+        )
+        if updated.rowcount == 0:
+            connection.execute(table.insert().values(
+                project_id=project_id, learning_paths=paths, completion_total=completion
+            ))
+
+
+@event.listens_for(Session, "after_flush")
+def track_learning_path_changes(session, flush_context):
+    """
+    Fold learning paths created, updated or deleted in this flush into project_stats.
+    Bulk query.update()/delete() calls bypass the ORM and are not tracked;
+    rebuild_project_stats fixes the table up after them.
+    """
+    if not PROJECT_STATS_MATERIALIZED:
+        return
+    deltas = {}
+
+    def add(project_id, paths, completion):
+        current = deltas.get(project_id, (0, 0.0))
+        deltas[project_id] = (current[0] + paths, current[1] + completion)
+
+    for path in session.new:
+        if isinstance(path, models.LearningPath):
+            add(path.project_id, 1, completion_rate(path.total_topics, path.completed_topics))
+
+    for path in session.dirty:
+        if isinstance(path, models.LearningPath) and session.is_modified(path):
+            state = inspect(path)
+            add(_previous(state, "project_id"), -1, -completion_rate(
+                _previous(state, "total_topics"), _previous(state, "completed_topics")
+            ))
+            add(path.project_id, 1, completion_rate(path.total_topics, path.completed_topics))
+
+    for path in session.deleted:
+        if isinstance(path, models.LearningPath):
+            state = inspect(path)
+            add(_previous(state, "project_id"), -1, -completion_rate(
+                _previous(state, "total_topics"), _previous(state, "completed_topics")
+            ))
+
+    if deltas:
+        _apply_deltas(session.connection(), deltas)
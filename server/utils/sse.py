@@ -0,0 +1,31 @@
+import json
+import logging
+from fastapi.responses import StreamingResponse
+
+logger = logging.getLogger(__name__)
+
+
+def format_sse(event, data):
+    """Encode one Server-Sent Event with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def sse_response(events):
+    """
+    Stream (event, data) pairs from a generator as text/event-stream.
+    An exception raised by the generator is sent as a final "error" event,
+    since the response status has already been sent.
+    """
+    def body():
+        try:
+            for event, data in events:
+                yield format_sse(event, data)
+        except Exception as e:
+            logger.exception("Error while streaming")
+            yield format_sse("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
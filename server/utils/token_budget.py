@@ -0,0 +1,124 @@
+import os
+import json
+import logging
+import threading
+from collections import defaultdict
+from dotenv import load_dotenv
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# Load environment variables from .env file
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Largest prompt sent to the provider; larger prompts are rejected before the request is made
+LLM_PROMPT_TOKEN_BUDGET = int(os.getenv("LLM_PROMPT_TOKEN_BUDGET", "24000"))
+# Budgets for single call sites, e.g. {"learning_path": 8000}; others use LLM_PROMPT_TOKEN_BUDGET
+LLM_PROMPT_TOKEN_BUDGETS = json.loads(os.getenv("LLM_PROMPT_TOKEN_BUDGETS", "{}"))
+# Encoding used to count tokens locally when tiktoken is installed. It is not the
+# model's own tokenizer but is far closer than a character count.
+LLM_TOKENIZER_ENCODING = os.getenv("LLM_TOKENIZER_ENCODING", "cl100k_base")
+
+TRUNCATION_MARKER = "\n[... truncated to fit the prompt budget ...]\n"
+
+_encoding = None
+_encoding_lock = threading.Lock()
+
+
+class PromptTooLargeError(ValueError):
+    """Raised instead of sending a prompt that is over the token budget"""
+
+    def __init__(self, call_site, tokens, budget):
+        self.call_site = call_site
+        self.tokens = tokens
+        self.budget = budget
+        super().__init__(f"Prompt for {call_site} is {tokens} tokens, over the budget of {budget}")
+
+
+def _get_encoding():
+    global _encoding
+    if _encoding is None and tiktoken is not None:
+        with _encoding_lock:
+            if _encoding is None:
+                try:
+                    _encoding = tiktoken.get_encoding(LLM_TOKENIZER_ENCODING)
+                except Exception as e:
+                    # The encoding could not be loaded (e.g. no network to fetch it); use the estimate
+                    logger.warning("Falling back to estimated token counts: %s", e)
+                    _encoding = False
+    return _encoding or None
+
+
+def count_tokens(text):
+    """Number of tokens in text, using tiktoken when available and about four characters per token otherwise"""
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return len(text) // 4 + 1
+
+
+def truncate_text(text, budget):
+    """Cut text to at most budget tokens, keeping the beginning and marking the cut"""
+    if count_tokens(text) <= budget:
+        return text
+    # Shrink proportionally, then trim until it fits
+    keep = int(len(text) * budget / count_tokens(text))
+    while keep > 0 and count_tokens(text[:keep] + TRUNCATION_MARKER) > budget:
+        keep = int(keep * 0.9)
+    return text[:keep] + TRUNCATION_MARKER
+
+
+def prompt_budget(call_site):
+    """Token budget of a call site's prompts"""
+    return int(LLM_PROMPT_TOKEN_BUDGETS.get(call_site, LLM_PROMPT_TOKEN_BUDGET))
+
+
+def fit_prompt(build_prompt, text, call_site):
+    """
+    Build a prompt around its variable input, cutting the input so the whole
+    prompt fits the call site's budget. A prompt whose fixed part is over the
+    budget on its own is still rejected by check_prompt.
+    """
+    prompt = build_prompt(text)
+    budget = prompt_budget(call_site)
+    if count_tokens(prompt) <= budget:
+        return prompt
+    overhead = count_tokens(build_prompt(""))
+    return build_prompt(truncate_text(text, max(budget - overhead, 0)))
+
+
+def check_prompt(prompt, call_site, budget=None):
+    """Return the prompt's token count, raising PromptTooLargeError if it is over budget"""
+    budget = budget or prompt_budget(call_site)
+    tokens = count_tokens(prompt)
+    if tokens > budget:
+        raise PromptTooLargeError(call_site, tokens, budget)
+    return tokens
+
+
+# Prompt and completion token totals per call site
+_usage = defaultdict(lambda: {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0})
+_usage_lock = threading.Lock()
+
+
+def record_usage(call_site, prompt_tokens, completion_tokens):
+    with _usage_lock:
+        entry = _usage[call_site]
+        entry["calls"] += 1
+        entry["prompt_tokens"] += prompt_tokens or 0
+        entry["completion_tokens"] += completion_tokens or 0
+
+
+def get_usage():
+    """Return a snapshot of token usage per call site"""
+    with _usage_lock:
+        return {call_site: dict(entry) for call_site, entry in _usage.items()}
+
+
+def reset_usage():
+    with _usage_lock:
+        _usage.clear()
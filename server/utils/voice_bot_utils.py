@@ -2,14 +2,19 @@ from requests import status_codes
 import models
 import json
 from fastapi import HTTPException,Depends
-from database import get_db
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload
+from database import AsyncSessionLocal
+
+# The async helpers below are called from the voice agent, outside any request,
+# so each opens (and closes) its own async session
 
 async def get_commit_info_take_kt_from_user(user_id):
-    db =  next(get_db())
     try:
-        give_kt_session = db.query(models.GiveKtNew).filter(
-            models.GiveKtNew.employee_id == user_id
-        ).first()
+        async with AsyncSessionLocal() as db:
+            give_kt_session = (await db.execute(select(models.GiveKtNew).filter(
+                models.GiveKtNew.employee_id == user_id
+            ))).scalars().first()
         if not give_kt_session:
             raise HTTPException(status_code=404,detail="No Give KT assigned to user")
         return give_kt_session.commit_info
@@ -21,11 +26,9 @@ async def get_commit_info_take_kt_from_user(user_id):
 
 
 async def get_conversation_info_github(kt_info_id):
-    db =  next(get_db())
     try:
-        give_kt_session = db.query(models.KtInfoNew).filter(
-            models.KtInfoNew.id == kt_info_id 
-        ).first()
+        async with AsyncSessionLocal() as db:
+            give_kt_session = await db.get(models.KtInfoNew, kt_info_id)
         if not give_kt_session:
             raise HTTPException(status_code=404,detail="No Take KT assigned to user")
         return give_kt_session.kt_info
@@ -38,16 +41,16 @@ async def get_conversation_info_github(kt_info_id):
 
 
 async def get_kt_info_for_user(user_id):
-    db =  next(get_db())
     try:
-        take_kt_session = db.query(models.TakeKt).filter(
-            models.TakeKt.employee_id == user_id
-        ).first()
-        if not take_kt_session:
-            raise HTTPException(status_code=404,detail="No Take KT assigned to user")
-        kt_info = db.query(models.KtInfo).filter(
-            models.KtInfo.project_id == take_kt_session.project_id
-        ).first()
+        async with AsyncSessionLocal() as db:
+            take_kt_session = (await db.execute(select(models.TakeKt).filter(
+                models.TakeKt.employee_id == user_id
+            ))).scalars().first()
+            if not take_kt_session:
+                raise HTTPException(status_code=404,detail="No Take KT assigned to user")
+            kt_info = (await db.execute(select(models.KtInfo).filter(
+                models.KtInfo.project_id == take_kt_session.project_id
+            ))).scalars().first()
         # print(kt_info)
         return kt_info
     except Exception as err:
@@ -82,14 +85,22 @@ def next_incomplete_topic(user_id, db):
         ).order_by(models.LearningPath.created_at.desc()).first()
         if not learning_path:
             return {'error': 'No learning path found for user'},500
-        learning_path = json.loads(learning_path.learning_path)
-        for subject in learning_path["subjects"]:
-            for topic in subject['topics']:
-                if topic['is_completed'] == 'false':
-                    topic['subject'] = {"subject_name": subject['subject_name']}
-                    # print(topic)
-                    return topic
-        return None
+        if learning_path.split_stored_document():
+            db.commit()
+        # First incomplete topic in document order, read from ix_learning_path_topic_next_incomplete
+        topic = db.query(models.LearningPathTopic).options(
+            joinedload(models.LearningPathTopic.subject)
+        ).filter(
+            models.LearningPathTopic.learning_path_id == learning_path.id,
+            models.LearningPathTopic.is_completed == False
+        ).order_by(
+            models.LearningPathTopic.subject_position, models.LearningPathTopic.position
+        ).first()
+        if not topic:
+            return None
+        document = topic.to_document()
+        document['subject'] = {"subject_name": topic.subject.name}
+        return document
     except Exception as e:
         print(f"Error getting next incomplete assignment: {e}")
         return {'error': str(e)},500
\ No newline at end of file
@@ -9,13 +9,19 @@ import sys
 load_dotenv()
 
 # Use the same database URL as the application
-DATABASE_URI = "sqlite:///./app.db"
+DATABASE_URI = os.getenv("DATABASE_URL", "sqlite:///./app.db")
 
 def update_database_schema():
     """
     Update the database schema to match the new structure with proper relationships
     between GiveKtNew, KtInfoNew, and TakeKtNew tables.
+    The statements below are SQLite DDL; other databases get these tables from
+    the models and alembic migrations.
     """
+    if not DATABASE_URI.startswith("sqlite"):
+        print("update_schema.py only applies to SQLite databases; run 'alembic upgrade head' instead.")
+        sys.exit(1)
+
     engine = create_engine(DATABASE_URI)
     
     # Create a session